@@ -282,7 +282,7 @@ class DhcpAgent(manager.Manager):
     @utils.synchronized('dhcp-agent')
     def port_update_end(self, context, payload):
         """Handle the port.update.end notification event."""
-        updated_port = dhcp.DictModel(payload['port'])
+        updated_port = dhcp.PortModel(payload['port'])
         network = self.cache.get_network_by_id(updated_port.network_id)
         if network:
             prev_port = self.cache.get_port_by_id(updated_port.id)
@@ -88,10 +88,92 @@ class DictModel(object):
             setattr(self, key, value)
 
 
+def _intern(value):
+    """Return a shared str for ASCII identifiers such as UUIDs and MACs.
+
+    RPC payloads are decoded as unicode, which intern() does not accept.
+    """
+    if isinstance(value, unicode):
+        try:
+            value = value.encode('ascii')
+        except UnicodeEncodeError:
+            return value
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
+
+class SlotsModel(object):
+    """Compact, attribute based view over the known keys of a dict.
+
+    Unlike DictModel, instances have no __dict__: keys which are not listed
+    in __slots__ are dropped and missing ones read as None.
+    """
+    __slots__ = ()
+    # Keys whose values are identifiers worth interning.
+    _interned = ()
+    # Keys holding a list of dicts, mapped to the model of their items.
+    _submodels = {}
+
+    def __init__(self, d):
+        for key in self.__slots__:
+            value = d.get(key)
+            if key in self._submodels:
+                value = _make_models(self._submodels[key], value or [])
+            elif key in self._interned:
+                value = _intern(value)
+            setattr(self, key, value)
+
+
+def _make_models(model, items):
+    return [model(item) if isinstance(item, dict) else item
+            for item in items]
+
+
+class FixedIpModel(SlotsModel):
+    __slots__ = ('subnet_id', 'ip_address')
+    _interned = ('subnet_id',)
+
+
+class DhcpOptModel(SlotsModel):
+    __slots__ = ('opt_name', 'opt_value')
+    _interned = ('opt_name',)
+
+
+class HostRouteModel(SlotsModel):
+    __slots__ = ('destination', 'nexthop')
+
+
+class PortModel(SlotsModel):
+    __slots__ = ('id', 'network_id', 'mac_address', 'device_id',
+                 'device_owner', 'fixed_ips', 'extra_dhcp_opts')
+    _interned = ('id', 'network_id', 'mac_address', 'device_owner')
+    _submodels = {'fixed_ips': FixedIpModel,
+                  'extra_dhcp_opts': DhcpOptModel}
+
+
+class SubnetModel(SlotsModel):
+    __slots__ = ('id', 'network_id', 'cidr', 'ip_version', 'enable_dhcp',
+                 'gateway_ip', 'dns_nameservers', 'host_routes')
+    _interned = ('id', 'network_id')
+    _submodels = {'host_routes': HostRouteModel}
+
+
 class NetModel(DictModel):
 
     def __init__(self, use_namespaces, d):
+        # Subnets and ports make up most of the agent's memory, so they are
+        # kept as slotted records instead of generic DictModels.
+        d = d.copy()
+        if 'id' in d:
+            d['id'] = _intern(d['id'])
+        records = {}
+        for key, model in (('subnets', SubnetModel), ('ports', PortModel)):
+            if key in d:
+                records[key] = _make_models(model, d.pop(key))
         super(NetModel, self).__init__(d)
+        for key, value in records.iteritems():
+            setattr(self, key, value)
 
         self._ns_name = (use_namespaces and
                          "%s%s" % (NS_PREFIX, self.id) or None)
@@ -265,6 +265,37 @@ class OVSBridge(BaseOVS):
                               "flow")
         return self.get_port_ofport(port_name)
 
+    def add_tunnel_ports(self, tunnels, local_ip,
+                         tunnel_type=constants.TYPE_GRE,
+                         vxlan_udp_port=constants.VXLAN_UDP_PORT):
+        """Add several tunnel ports in one OVSDB transaction.
+
+        :param tunnels: dict of remote IP by port name
+        :returns: dict of ofport by port name
+        """
+        port_names = sorted(tunnels)
+        if not port_names:
+            return {}
+        args = []
+        for port_name in port_names:
+            args += ["--", "--may-exist", "add-port", self.br_name, port_name,
+                     "--", "set", "Interface", port_name,
+                     "type=%s" % tunnel_type]
+            if (tunnel_type == constants.TYPE_VXLAN and
+                vxlan_udp_port != constants.VXLAN_UDP_PORT):
+                args.append("options:dst_port=%s" % vxlan_udp_port)
+            args += ["options:remote_ip=%s" % tunnels[port_name],
+                     "options:local_ip=%s" % local_ip,
+                     "options:in_key=flow", "options:out_key=flow"]
+        self.run_vsctl(args)
+        args = []
+        for port_name in port_names:
+            args += ["--", "get", "Interface", port_name, "ofport"]
+        output = self.run_vsctl(args)
+        if not output:
+            return {}
+        return dict(zip(port_names, output.splitlines()))
+
     def add_patch_port(self, local_name, remote_name):
         self.run_vsctl(["add-port", self.br_name, local_name])
         self.set_db_attribute("Interface", local_name, "type", "patch")
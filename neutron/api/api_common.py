@@ -174,6 +174,8 @@ def get_pagination_links(request, items, limit,
 
 class PaginationHelper(object):
 
+    limit = None
+
     def __init__(self, request, primary_key='id'):
         self.request = request
         self.primary_key = primary_key
@@ -33,6 +33,19 @@ SHARED = 'shared'
 # Used by range check to indicate no limit for a bound.
 UNLIMITED = None
 
+# Canonical forms of values accepted by validators without parsing them,
+# which is much slower
+_CANONICAL_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                                r'[0-9a-f]{4}-[0-9a-f]{12}\Z')
+_CANONICAL_MAC_RE = re.compile(r'[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){5}\Z')
+_IPV4_OCTET = '(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])'
+_CANONICAL_IPV4_RE = re.compile(r'(%s\.){3}%s\Z' %
+                                (_IPV4_OCTET, _IPV4_OCTET))
+
+
+def _is_canonical(regex, data):
+    return isinstance(data, basestring) and regex.match(data) is not None
+
 
 def _verify_dict_keys(expected_keys, target_dict, strict=True):
     """Allows to verify keys in a dictionary.
@@ -135,6 +148,8 @@ def _validate_no_whitespace(data):
 
 
 def _validate_mac_address(data, valid_values=None):
+    if _is_canonical(_CANONICAL_MAC_RE, data):
+        return
     try:
         netaddr.EUI(_validate_no_whitespace(data))
     except Exception:
@@ -144,6 +159,8 @@ def _validate_mac_address(data, valid_values=None):
 
 
 def _validate_ip_address(data, valid_values=None):
+    if _is_canonical(_CANONICAL_IPV4_RE, data):
+        return
     try:
         netaddr.IPAddress(_validate_no_whitespace(data))
     except Exception:
@@ -310,6 +327,8 @@ def _validate_regex(data, valid_values=None):
 
 
 def _validate_uuid(data, valid_values=None):
+    if _is_canonical(_CANONICAL_UUID_RE, data):
+        return
     if not uuidutils.is_uuid_like(data):
         msg = _("'%s' is not a valid UUID") % data
         LOG.debug(msg)
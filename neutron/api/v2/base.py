@@ -15,6 +15,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+
 import netaddr
 import webob.exc
 
@@ -62,9 +64,27 @@ class Controller(object):
         self._allow_bulk = allow_bulk
         self._allow_pagination = allow_pagination
         self._allow_sorting = allow_sorting
+        if parent:
+            self._parent_id_name = '%s_id' % parent['member_name']
+            parent_part = '_%s' % parent['member_name']
+        else:
+            self._parent_id_name = None
+            parent_part = ''
+        self._plugin_handlers = {
+            self.LIST: 'get%s_%s' % (parent_part, self._collection),
+            self.SHOW: 'get%s_%s' % (parent_part, self._resource)
+        }
+        for action in [self.CREATE, self.UPDATE, self.DELETE]:
+            self._plugin_handlers[action] = '%s%s_%s' % (action, parent_part,
+                                                         self._resource)
         self._native_bulk = self._is_native_bulk_supported()
         self._native_pagination = self._is_native_pagination_supported()
         self._native_sorting = self._is_native_sorting_supported()
+        self._revision_getter = self._get_revision_getter()
+        # Request bodies are checked with functions compiled once for the
+        # attributes of the resource
+        self._body_checks = {True: compile_body_checks(attr_info, True),
+                             False: compile_body_checks(attr_info, False)}
         self._policy_attrs = [name for (name, info) in self._attr_info.items()
                               if info.get('required_by_policy')]
         self._publisher_id = notifier_api.publisher_id('network')
@@ -82,20 +102,6 @@ class Controller(object):
                            "pagination requires native sorting"))
                 self._allow_sorting = True
 
-        if parent:
-            self._parent_id_name = '%s_id' % parent['member_name']
-            parent_part = '_%s' % parent['member_name']
-        else:
-            self._parent_id_name = None
-            parent_part = ''
-        self._plugin_handlers = {
-            self.LIST: 'get%s_%s' % (parent_part, self._collection),
-            self.SHOW: 'get%s_%s' % (parent_part, self._resource)
-        }
-        for action in [self.CREATE, self.UPDATE, self.DELETE]:
-            self._plugin_handlers[action] = '%s%s_%s' % (action, parent_part,
-                                                         self._resource)
-
     def _get_primary_key(self, default_primary_key='id'):
         for key, value in self._attr_info.iteritems():
             if value.get('primary_key', False):
@@ -107,15 +113,74 @@ class Controller(object):
                                  % self._plugin.__class__.__name__)
         return getattr(self._plugin, native_bulk_attr_name, False)
 
+    def _is_native_list_feature_supported(self, feature):
+        """Return True if the plugin lists the collection with feature.
+
+        The support is declared by the class of the plugin or, failing that,
+        by the class implementing the list method of the collection. Plugins
+        based on NeutronDbPluginV2 thus paginate and sort natively the
+        collections they do not list themselves.
+        """
+        attr_name = "_%s__native_%s_support"
+        supported = getattr(self._plugin,
+                            attr_name % (self._plugin.__class__.__name__,
+                                         feature), None)
+        if supported is not None:
+            return supported
+        cls = self._get_defining_class(self._plugin_handlers[self.LIST])
+        if cls is None:
+            return False
+        return vars(cls).get(attr_name % (cls.__name__, feature), False)
+
+    def _get_defining_class(self, name):
+        """Return the class of the plugin defining the method name."""
+        for cls in type(self._plugin).__mro__:
+            if name in vars(cls):
+                return cls
+
+    def _get_revision_getter(self):
+        """Return the plugin method reading the revision of the collection.
+
+        The method is only used when it is defined by the class defining the
+        list and show methods of the collection, as a plugin overriding them
+        may return data which is not tracked by revisions.
+        """
+        if self._parent_id_name:
+            return None
+        name = 'get_%s_revision' % self._collection
+        cls = self._get_defining_class(name)
+        if cls is None:
+            return None
+        for action in (self.LIST, self.SHOW):
+            if self._get_defining_class(self._plugin_handlers[action]) != cls:
+                return None
+        return getattr(self._plugin, name)
+
+    def _set_etag(self, request, revision):
+        """Set the ETag of the response to a request.
+
+        The ETag depends on the revision of the objects, on the requested
+        URL and representation, and on the credentials of the request as
+        the representation depends on the policy.
+        """
+        context = request.context
+        etag = hashlib.sha1(repr((revision, request.path_qs,
+                                  request.headers.get('Accept'),
+                                  context.user_id, context.tenant_id,
+                                  context.is_admin,
+                                  sorted(context.roles)))).hexdigest()
+        request.environ[wsgi_resource.ETAG_ENVIRON_KEY] = etag
+
+    def _check_not_modified(self, request):
+        etag = request.environ.get(wsgi_resource.ETAG_ENVIRON_KEY)
+        if etag and etag in request.if_none_match:
+            raise webob.exc.HTTPNotModified(etag=etag)
+
     def _is_native_pagination_supported(self):
-        native_pagination_attr_name = ("_%s__native_pagination_support"
-                                       % self._plugin.__class__.__name__)
-        return getattr(self._plugin, native_pagination_attr_name, False)
+        return self._is_native_list_feature_supported('pagination')
 
     def _is_native_sorting_supported(self):
-        native_sorting_attr_name = ("_%s__native_sorting_support"
-                                    % self._plugin.__class__.__name__)
-        return getattr(self._plugin, native_sorting_attr_name, False)
+        return self._is_native_list_feature_supported('sorting')
 
     def _is_visible(self, context, attr_name, data):
         action = "%s:%s" % (self._plugin_handlers[self.SHOW], attr_name)
@@ -144,13 +209,53 @@ class Controller(object):
         attr_val = self._attr_info.get(attr_name)
         return attr_val and attr_val['is_visible'] and authz_check
 
-    def _view(self, context, data, fields_to_strip=None):
+    def _get_attribute_visibility(self, context):
+        """Work out which attributes can be shown in this context.
+
+        Return the set of attributes visible whatever the item being shown,
+        and the set of attributes whose policy depends on the item itself
+        and must be checked with _is_visible.
+        """
+        visible, per_item = set(), set()
+        res_map = attributes.RESOURCE_ATTRIBUTE_MAP.get(self._collection)
+        if res_map is None:
+            # The extension was not configured for adding its resources
+            # to the global resource attribute map. Policy check should
+            # not be performed
+            LOG.debug(_("The resource %s was not found in the "
+                        "RESOURCE_ATTRIBUTE_MAP; unable to perform authZ "
+                        "check for its attributes"), self._collection)
+            res_map = {}
+        for attr_name, attr_val in self._attr_info.iteritems():
+            if not attr_val['is_visible']:
+                continue
+            attr = res_map.get(attr_name)
+            if not (attr and attr.get('enforce_policy')):
+                visible.add(attr_name)
+                continue
+            action = "%s:%s" % (self._plugin_handlers[self.SHOW], attr_name)
+            try:
+                authz_check = policy.check_credentials_only(context, action)
+            except exceptions.PolicyRuleNotFound:
+                authz_check = True
+            if authz_check is None:
+                per_item.add(attr_name)
+            elif authz_check:
+                visible.add(attr_name)
+        return visible, per_item
+
+    def _view(self, context, data, fields_to_strip=None, visibility=None):
         # make sure fields_to_strip is iterable
         if not fields_to_strip:
             fields_to_strip = []
+        if visibility is None:
+            visibility = self._get_attribute_visibility(context)
+        visible, per_item = visibility
 
         return dict(item for item in data.iteritems()
-                    if (self._is_visible(context, item[0], data) and
+                    if ((item[0] in visible or
+                         (item[0] in per_item and
+                          self._is_visible(context, item[0], data))) and
                         item[0] not in fields_to_strip))
 
     def _do_field_list(self, original_fields):
@@ -223,6 +328,12 @@ class Controller(object):
         pagination_helper.update_fields(original_fields, fields_to_add)
         if parent_id:
             kwargs[self._parent_id_name] = parent_id
+        if self._revision_getter:
+            # The revision is read before the objects, so that the ETag
+            # never claims changes which are not in the response
+            self._set_etag(request, self._revision_getter(
+                request.context, filters=dict(filters)))
+            self._check_not_modified(request)
         obj_getter = getattr(self._plugin, self._plugin_handlers[self.LIST])
         obj_list = obj_getter(request.context, **kwargs)
         obj_list = sorting_helper.sort(obj_list)
@@ -237,11 +348,20 @@ class Controller(object):
                                         self._plugin_handlers[self.SHOW],
                                         obj,
                                         plugin=self._plugin)]
-        collection = {self._collection:
-                      [self._view(request.context, obj,
-                                  fields_to_strip=fields_to_add)
-                       for obj in obj_list]}
+        else:
+            obj_list = list(obj_list)
         pagination_links = pagination_helper.get_links(obj_list)
+        visibility = self._get_attribute_visibility(request.context)
+        # Objects are replaced by their views one at a time, so that the
+        # collection is not copied in memory
+        for index, obj in enumerate(obj_list):
+            obj_list[index] = self._view(request.context, obj,
+                                         fields_to_strip=fields_to_add,
+                                         visibility=visibility)
+        if not pagination_helper.limit:
+            # Only the serialization is left for when the response is sent
+            return {self._collection: (item for item in obj_list)}
+        collection = {self._collection: obj_list}
         if pagination_links:
             collection[self._collection + "_links"] = pagination_links
 
@@ -269,11 +389,13 @@ class Controller(object):
 
     def index(self, request, **kwargs):
         """Returns a list of the requested entity."""
+        request.context.use_replica()
         parent_id = kwargs.get(self._parent_id_name)
         return self._items(request, True, parent_id)
 
     def show(self, request, id, **kwargs):
         """Returns detailed information about the requested entity."""
+        request.context.use_replica()
         try:
             # NOTE(salvatore-orlando): The following ensures that fields
             # which are needed for authZ policy validation are not stripped
@@ -281,13 +403,20 @@ class Controller(object):
             field_list, added_fields = self._do_field_list(
                 api_common.list_args(request, "fields"))
             parent_id = kwargs.get(self._parent_id_name)
+            if self._revision_getter:
+                self._set_etag(request, self._revision_getter(
+                    request.context, filters={'id': [id]}))
+            obj = self._item(request,
+                             id,
+                             do_authz=True,
+                             field_list=field_list,
+                             parent_id=parent_id)
+            # The client may only be told it has the object once it is
+            # authorized to see it
+            self._check_not_modified(request)
             return {self._resource:
                     self._view(request.context,
-                               self._item(request,
-                                          id,
-                                          do_authz=True,
-                                          field_list=field_list,
-                                          parent_id=parent_id),
+                               obj,
                                fields_to_strip=added_fields)}
         except exceptions.PolicyNotAuthorized:
             # To avoid giving away information, pretend that it
@@ -336,9 +465,10 @@ class Controller(object):
                             self._resource + '.create.start',
                             notifier_api.CONF.default_notification_level,
                             body)
-        body = Controller.prepare_request_body(request.context, body, True,
-                                               self._resource, self._attr_info,
-                                               allow_bulk=self._allow_bulk)
+        body = Controller.prepare_request_body(
+            request.context, body, True, self._resource, self._attr_info,
+            allow_bulk=self._allow_bulk,
+            body_checks=self._body_checks[True])
         action = self._plugin_handlers[self.CREATE]
         # Check authz
         if self._collection in body:
@@ -455,9 +585,10 @@ class Controller(object):
                             self._resource + '.update.start',
                             notifier_api.CONF.default_notification_level,
                             payload)
-        body = Controller.prepare_request_body(request.context, body, False,
-                                               self._resource, self._attr_info,
-                                               allow_bulk=self._allow_bulk)
+        body = Controller.prepare_request_body(
+            request.context, body, False, self._resource, self._attr_info,
+            allow_bulk=self._allow_bulk,
+            body_checks=self._body_checks[False])
         action = self._plugin_handlers[self.UPDATE]
         # Load object to check authz
         # but pass only attributes in the original body and required
@@ -516,7 +647,7 @@ class Controller(object):
 
     @staticmethod
     def prepare_request_body(context, body, is_create, resource, attr_info,
-                             allow_bulk=False):
+                             allow_bulk=False, body_checks=None):
         """Verifies required attributes are in request body.
 
         Also checking that an attribute is only specified if it is allowed
@@ -524,36 +655,45 @@ class Controller(object):
 
         Attribute with default values are considered to be optional.
 
-        body argument must be the deserialized body.
+        body argument must be the deserialized body. body_checks is the
+        function returned by compile_body_checks() for attr_info and
+        is_create, which is compiled for the call if not given.
         """
         collection = resource + "s"
         if not body:
             raise webob.exc.HTTPBadRequest(_("Resource body required"))
 
-        prep_req_body = lambda x: Controller.prepare_request_body(
-            context,
-            x if resource in x else {resource: x},
-            is_create,
-            resource,
-            attr_info,
-            allow_bulk)
+        if body_checks is None:
+            body_checks = compile_body_checks(attr_info, is_create)
         if collection in body:
             if not allow_bulk:
                 raise webob.exc.HTTPBadRequest(_("Bulk operation "
                                                  "not supported"))
-            bulk_body = [prep_req_body(item) for item in body[collection]]
+            bulk_body = [Controller._prepare_resource_body(
+                context, item if resource in item else {resource: item},
+                is_create, resource, body_checks)
+                for item in body[collection]]
             if not bulk_body:
                 raise webob.exc.HTTPBadRequest(_("Resources required"))
             return {collection: bulk_body}
 
+        return Controller._prepare_resource_body(context, body, is_create,
+                                                 resource, body_checks)
+
+    @staticmethod
+    def _prepare_resource_body(context, body, is_create, resource,
+                               body_checks):
         res_dict = body.get(resource)
         if res_dict is None:
             msg = _("Unable to find '%s' in request body") % resource
             raise webob.exc.HTTPBadRequest(msg)
 
         Controller._populate_tenant_id(context, res_dict, is_create)
-        Controller._verify_attributes(res_dict, attr_info)
+        body_checks(res_dict)
+        return body
 
+    @staticmethod
+    def _check_allowed_attributes(res_dict, attr_info, is_create):
         if is_create:  # POST
             for attr, attr_vals in attr_info.iteritems():
                 if attr_vals['allow_post']:
@@ -562,8 +702,6 @@ class Controller(object):
                         msg = _("Failed to parse request. Required "
                                 "attribute '%s' not specified") % attr
                         raise webob.exc.HTTPBadRequest(msg)
-                    res_dict[attr] = res_dict.get(attr,
-                                                  attr_vals.get('default'))
                 else:
                     if attr in res_dict:
                         msg = _("Attribute '%s' not allowed in POST") % attr
@@ -574,26 +712,6 @@ class Controller(object):
                     msg = _("Cannot update read-only attribute %s") % attr
                     raise webob.exc.HTTPBadRequest(msg)
 
-        for attr, attr_vals in attr_info.iteritems():
-            if (attr not in res_dict or
-                res_dict[attr] is attributes.ATTR_NOT_SPECIFIED):
-                continue
-            # Convert values if necessary
-            if 'convert_to' in attr_vals:
-                res_dict[attr] = attr_vals['convert_to'](res_dict[attr])
-            # Check that configured values are correct
-            if 'validate' not in attr_vals:
-                continue
-            for rule in attr_vals['validate']:
-                res = attributes.validators[rule](res_dict[attr],
-                                                  attr_vals['validate'][rule])
-                if res:
-                    msg_dict = dict(attr=attr, reason=res)
-                    msg = _("Invalid input for %(attr)s. "
-                            "Reason: %(reason)s.") % msg_dict
-                    raise webob.exc.HTTPBadRequest(msg)
-        return body
-
     @staticmethod
     def _verify_attributes(res_dict, attr_info):
         extra_keys = set(res_dict.keys()) - set(attr_info.keys())
@@ -625,6 +743,68 @@ class Controller(object):
             })
 
 
+def compile_body_checks(attr_info, is_create):
+    """Return a function checking and converting resource dicts.
+
+    The function applies the checks of Controller.prepare_request_body for
+    attr_info to a resource dict. The attributes, defaults, converters and
+    validators are looked up once, rather than for every resource dict.
+    """
+    known = frozenset(attr_info)
+    if is_create:
+        required = frozenset(attr for attr, attr_vals in attr_info.iteritems()
+                             if attr_vals['allow_post'] and
+                             'default' not in attr_vals)
+        forbidden = frozenset(attr for attr, attr_vals in attr_info.iteritems()
+                              if not attr_vals['allow_post'])
+        defaults = [(attr, attr_vals['default'])
+                    for attr, attr_vals in attr_info.iteritems()
+                    if attr_vals['allow_post'] and 'default' in attr_vals]
+    else:
+        required = frozenset()
+        forbidden = frozenset(attr for attr, attr_vals in attr_info.iteritems()
+                              if not attr_vals['allow_put'])
+        defaults = []
+    conversions = []
+    for attr, attr_vals in attr_info.iteritems():
+        # Validators registered later are looked up when used
+        rules = [(rule, attributes.validators.get(rule), rule_values)
+                 for rule, rule_values in
+                 attr_vals.get('validate', {}).iteritems()]
+        if 'convert_to' in attr_vals or rules:
+            conversions.append((attr, attr_vals.get('convert_to'), rules))
+
+    def check_body(res_dict):
+        if not known.issuperset(res_dict):
+            Controller._verify_attributes(res_dict, attr_info)
+        if not required.issubset(res_dict) or not forbidden.isdisjoint(
+                res_dict):
+            # Report the first attribute in error
+            Controller._check_allowed_attributes(res_dict, attr_info,
+                                                 is_create)
+        for attr, default in defaults:
+            if attr not in res_dict:
+                res_dict[attr] = default
+        for attr, convert_to, rules in conversions:
+            value = res_dict.get(attr, attributes.ATTR_NOT_SPECIFIED)
+            if value is attributes.ATTR_NOT_SPECIFIED:
+                continue
+            # Convert values if necessary
+            if convert_to:
+                value = res_dict[attr] = convert_to(value)
+            # Check that configured values are correct
+            for rule, validator, rule_values in rules:
+                res = (validator or attributes.validators[rule])(value,
+                                                                 rule_values)
+                if res:
+                    msg_dict = dict(attr=attr, reason=res)
+                    msg = _("Invalid input for %(attr)s. "
+                            "Reason: %(reason)s.") % msg_dict
+                    raise webob.exc.HTTPBadRequest(msg)
+
+    return check_body
+
+
 def create_resource(collection, resource, plugin, params, allow_bulk=False,
                     member_actions=None, parent=None, allow_pagination=False,
                     allow_sorting=False):
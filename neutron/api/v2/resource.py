@@ -23,6 +23,7 @@ import webob.exc
 
 from neutron.api.v2 import attributes
 from neutron.common import exceptions
+from neutron.db import api as db_api
 from neutron.openstack.common import gettextutils
 from neutron.openstack.common import log as logging
 from neutron import wsgi
@@ -30,6 +31,10 @@ from neutron import wsgi
 
 LOG = logging.getLogger(__name__)
 
+# Key of the request environment holding the ETag of the response, set by
+# controllers supporting conditional requests
+ETAG_ENVIRON_KEY = 'neutron.etag'
+
 
 class Request(wsgi.Request):
     pass
@@ -58,6 +63,11 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
 
     @webob.dec.wsgify(RequestClass=Request)
     def resource(request):
+        with db_api.collect_sql_stats('%s %s' % (request.method,
+                                                 request.path)):
+            return _resource(request)
+
+    def _resource(request):
         route_args = request.environ.get('wsgiorg.routing_args')
         if route_args:
             args = route_args[1].copy()
@@ -82,6 +92,9 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
             method = getattr(controller, action)
 
             result = method(request=request, **args)
+        except webob.exc.HTTPNotModified:
+            # The client already has the representation, send no body
+            raise
         except (exceptions.NeutronException,
                 netaddr.AddrFormatError) as e:
             LOG.exception(_('%s failed'), action)
@@ -125,15 +138,24 @@ def Resource(controller, faults=None, deserializers=None, serializers=None):
             raise webob.exc.HTTPInternalServerError(**kwargs)
 
         status = action_status.get(action, 200)
-        body = serializer.serialize(result)
+        etag = request.environ.get(ETAG_ENVIRON_KEY)
         # NOTE(jkoelker) Comply with RFC2616 section 9.7
         if status == 204:
             content_type = ''
             body = None
+        elif wsgi.is_streamed(result):
+            # The body is sent as it is serialized, with chunked transfer
+            # encoding as its length is unknown
+            return webob.Response(request=request, status=status,
+                                  content_type=content_type,
+                                  app_iter=serializer.serialize_iter(result),
+                                  etag=etag)
+        else:
+            body = serializer.serialize(result)
 
         return webob.Response(request=request, status=status,
                               content_type=content_type,
-                              body=body)
+                              body=body, etag=etag)
     return resource
 
 
@@ -55,6 +55,9 @@ core_opts = [
                help=_("The base MAC address Neutron will use for VIFs")),
     cfg.IntOpt('mac_generation_retries', default=16,
                help=_("How many times Neutron will retry MAC generation")),
+    cfg.IntOpt('ip_allocation_retries', default=3,
+               help=_("How many times Neutron will retry an IP allocation "
+                      "whose availability range was concurrently modified")),
     cfg.BoolOpt('allow_bulk', default=True,
                 help=_("Allow the usage of the bulk API")),
     cfg.BoolOpt('allow_pagination', default=False,
@@ -223,6 +223,11 @@ class IpAddressGenerationFailure(Conflict):
     message = _("No more IP addresses available on network %(net_id)s.")
 
 
+class IpAddressAllocationConflict(Conflict):
+    message = _("IP address allocation on subnet %(subnet_id)s kept "
+                "conflicting with concurrent requests, please retry.")
+
+
 class BridgeDoesNotExist(NeutronException):
     message = _("Bridge %(bridge)s does not exist.")
 
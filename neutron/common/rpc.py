@@ -16,6 +16,7 @@
 #    under the License.
 
 from neutron import context
+from neutron.db import api as db_api
 from neutron.openstack.common import log as logging
 from neutron.openstack.common.rpc import dispatcher
 
@@ -40,5 +41,6 @@ class PluginRpcDispatcher(dispatcher.RpcDispatcher):
         if not tenant_id:
             tenant_id = rpc_ctxt_dict.pop('project_id', None)
         neutron_ctxt = context.Context(user_id, tenant_id, **rpc_ctxt_dict)
-        return super(PluginRpcDispatcher, self).dispatch(
-            neutron_ctxt, version, method, namespace, **kwargs)
+        with db_api.collect_sql_stats(_('RPC %s') % method):
+            return super(PluginRpcDispatcher, self).dispatch(
+                neutron_ctxt, version, method, namespace, **kwargs)
@@ -55,6 +55,7 @@ class ContextBase(common_context.RequestContext):
             timestamp = datetime.utcnow()
         self.timestamp = timestamp
         self._session = None
+        self._use_replica = False
         self.roles = roles or []
         if self.is_admin is None:
             self.is_admin = policy.check_is_admin(self)
@@ -125,12 +126,21 @@ class ContextBase(common_context.RequestContext):
 
         return context
 
+    def use_replica(self):
+        """Read from the replica database, if any, with this context.
+
+        Statements run in transactions, and all the statements following a
+        write, are still sent to the primary database. There is no effect
+        once the session of the context has been created.
+        """
+        self._use_replica = True
+
 
 class Context(ContextBase):
     @property
     def session(self):
         if self._session is None:
-            self._session = db_api.get_session()
+            self._session = db_api.get_session(use_replica=self._use_replica)
         return self._session
 
 
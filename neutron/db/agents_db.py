@@ -15,24 +15,38 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import time
+
 from eventlet import greenthread
 
 from oslo.config import cfg
 import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
 from sqlalchemy.orm import exc
 
+from neutron.db import api as db_api
 from neutron.db import model_base
 from neutron.db import models_v2
 from neutron.extensions import agent as ext_agent
 from neutron import manager
 from neutron.openstack.common import jsonutils
 from neutron.openstack.common import log as logging
+from neutron.openstack.common import loopingcall
 from neutron.openstack.common import timeutils
 
 LOG = logging.getLogger(__name__)
 cfg.CONF.register_opt(
     cfg.IntOpt('agent_down_time', default=5,
                help=_("Seconds to regard the agent is down.")))
+cfg.CONF.register_opt(
+    cfg.IntOpt('agent_heartbeat_flush_interval', default=0,
+               help=_("Seconds between writes to the database of the agent "
+                      "heartbeats received by this server, 0 to write each "
+                      "heartbeat when it is received. When several servers "
+                      "receive heartbeats, agent_down_time must exceed the "
+                      "report_interval of the agents plus this interval.")))
 
 
 class Agent(model_base.BASEV2, models_v2.HasId):
@@ -59,9 +73,174 @@ class Agent(model_base.BASEV2, models_v2.HasId):
     configurations = sa.Column(sa.String(4095), nullable=False)
 
 
+class HeartbeatStore(object):
+    """Agent heartbeats received by this server, written in batches.
+
+    The heartbeats are kept by agent id until the next flush, which writes
+    them with one UPDATE statement per batch. The latest heartbeat of each
+    agent is also kept, so that the Agent rows loaded from the database
+    have it before it is written. The agents found deleted by a flush are
+    remembered for agent_down_time, their next report being written.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self._latest = {}
+        self._pending = {}
+        # Ids of the agents found deleted when flushing -> time found
+        self._deleted = {}
+        self._flush_loop = None
+
+    def record(self, agent_id, timestamp):
+        self._latest[agent_id] = timestamp
+        self._pending[agent_id] = timestamp
+        if not self._flush_loop:
+            self._flush_loop = loopingcall.FixedIntervalLoopingCall(
+                self.flush)
+            self._flush_loop.start(
+                interval=cfg.CONF.agent_heartbeat_flush_interval)
+
+    def get(self, agent_id):
+        return self._latest.get(agent_id)
+
+    def is_deleted(self, agent_id):
+        return agent_id in self._deleted
+
+    def remove(self, agent_id):
+        """Forget an agent, when it is deleted or registered again."""
+        self._latest.pop(agent_id, None)
+        self._pending.pop(agent_id, None)
+        self._deleted.pop(agent_id, None)
+
+    def flush(self):
+        expiry = time.time() - cfg.CONF.agent_down_time
+        for agent_id, found in self._deleted.items():
+            if found < expiry:
+                del self._deleted[agent_id]
+        pending, self._pending = self._pending, {}
+        agent_ids = pending.keys()
+        session = db_api.get_session()
+        for start in xrange(0, len(agent_ids), self.BATCH_SIZE):
+            batch = agent_ids[start:start + self.BATCH_SIZE]
+            try:
+                self._flush_batch(session, batch, pending)
+            except Exception:
+                LOG.exception(_("Failed to write agent heartbeats"))
+                for agent_id in batch:
+                    self._pending.setdefault(agent_id, pending[agent_id])
+
+    def _flush_batch(self, session, batch, pending):
+        with session.begin():
+            query = session.query(Agent).filter(Agent.id.in_(batch))
+            timestamp = sa.case(dict((agent_id, pending[agent_id])
+                                     for agent_id in batch),
+                                value=Agent.id)
+            count = query.update({'heartbeat_timestamp': timestamp},
+                                 synchronize_session=False)
+            if count < len(batch):
+                deleted = set(batch) - set(
+                    agent_id for agent_id, in session.query(Agent.id).
+                    filter(Agent.id.in_(batch)))
+                for agent_id in deleted:
+                    self._latest.pop(agent_id, None)
+                    self._deleted[agent_id] = time.time()
+
+
+HEARTBEATS = HeartbeatStore()
+
+
+@event.listens_for(Agent, 'load')
+def _load_heartbeat(agent, context):
+    timestamp = HEARTBEATS.get(agent.id)
+    if timestamp and timestamp > agent.heartbeat_timestamp:
+        attributes.set_committed_value(agent, 'heartbeat_timestamp',
+                                       timestamp)
+
+
+class AgentCache(object):
+    """Agent dicts by agent type and host, with parsed configurations.
+
+    The agents of a type and host are reloaded from the database after
+    half of agent_down_time, so that the heartbeats recorded by other
+    servers are seen, or as soon as one of them looks down. Their liveness
+    is computed from their heartbeat timestamp each time they are read.
+    Everything is kept by agent type and host, so the agents registered
+    again on a host replace the entries of the deleted ones.
+    """
+
+    def __init__(self):
+        # (agent_type, host) -> (expiry time, list of agent dicts)
+        self._agents = {}
+        # (agent_type, host) -> (agent id, configurations JSON, parsed
+        # configurations)
+        self._configurations = {}
+        # (agent_type, host) -> (agent id, last report written)
+        self._reports = {}
+
+    def get(self, agent_type, host):
+        """Return copies of the cached agents, or None if not cached."""
+        entry = self._agents.get((agent_type, host))
+        if not entry or entry[0] < time.time():
+            return
+        agents = []
+        for agent in entry[1]:
+            agent = dict(agent)
+            timestamp = HEARTBEATS.get(agent['id'])
+            if timestamp and timestamp > agent['heartbeat_timestamp']:
+                agent['heartbeat_timestamp'] = timestamp
+            agent['alive'] = not AgentDbMixin.is_agent_down(
+                agent['heartbeat_timestamp'])
+            if not agent['alive']:
+                return
+            agents.append(agent)
+        return agents
+
+    def set(self, agent_type, host, agents):
+        self._agents[(agent_type, host)] = (
+            time.time() + cfg.CONF.agent_down_time / 2.0, agents)
+
+    def invalidate(self, agent_type, host):
+        self._agents.pop((agent_type, host), None)
+
+    def get_report(self, agent_type, host):
+        """Return the agent id and last report written, or None."""
+        return self._reports.get((agent_type, host))
+
+    def set_report(self, agent_type, host, agent_id, report):
+        if agent_id:
+            self._reports[(agent_type, host)] = (agent_id, report)
+        else:
+            self._reports.pop((agent_type, host), None)
+
+    def get_configurations(self, agent):
+        """Return the parsed configurations JSON of an agent, or None."""
+        entry = self._configurations.get((agent.agent_type, agent.host))
+        if entry and entry[:2] == (agent.id, agent.configurations):
+            return entry[2]
+
+    def set_configurations(self, agent, parsed):
+        self._configurations[(agent.agent_type, agent.host)] = (
+            agent.id, agent.configurations, parsed)
+
+    def remove(self, agent_type, host):
+        """Forget everything about the agents of a type on a host."""
+        self._agents.pop((agent_type, host), None)
+        self._configurations.pop((agent_type, host), None)
+        self._reports.pop((agent_type, host), None)
+
+
 class AgentDbMixin(ext_agent.AgentPluginBase):
     """Mixin class to add agent extension to db_plugin_base_v2."""
 
+    @property
+    def agent_cache(self):
+        try:
+            return self._agent_cache
+        except AttributeError:
+            self._agent_cache = AgentCache()
+            return self._agent_cache
+
     def _get_agent(self, context, id):
         try:
             agent = self._get_by_id(context, Agent, id)
@@ -75,6 +254,13 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
                                        cfg.CONF.agent_down_time)
 
     def get_configuration_dict(self, agent_db):
+        """Return the parsed configurations of an agent.
+
+        The dict is shared by the callers and must not be modified.
+        """
+        conf = self.agent_cache.get_configurations(agent_db)
+        if conf is not None:
+            return conf
         try:
             conf = jsonutils.loads(agent_db.configurations)
         except Exception:
@@ -83,6 +269,7 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
             LOG.warn(msg, {'agent_type': agent_db.agent_type,
                            'host': agent_db.host})
             conf = {}
+        self.agent_cache.set_configurations(agent_db, conf)
         return conf
 
     def _make_agent_dict(self, agent, fields=None):
@@ -99,12 +286,15 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
         with context.session.begin(subtransactions=True):
             agent = self._get_agent(context, id)
             context.session.delete(agent)
+        self.agent_cache.remove(agent.agent_type, agent.host)
+        HEARTBEATS.remove(id)
 
     def update_agent(self, context, id, agent):
         agent_data = agent['agent']
         with context.session.begin(subtransactions=True):
             agent = self._get_agent(context, id)
             agent.update(agent_data)
+        self.agent_cache.invalidate(agent.agent_type, agent.host)
         return self._make_agent_dict(agent)
 
     def get_agents_db(self, context, filters=None):
@@ -112,10 +302,26 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
         return query.all()
 
     def get_agents(self, context, filters=None, fields=None):
+        if (filters and set(filters) == set(['agent_type', 'host']) and
+            len(filters['agent_type']) == 1 and len(filters['host']) == 1):
+            return self._get_host_agents(context, filters['agent_type'][0],
+                                         filters['host'][0], fields)
         return self._get_collection(context, Agent,
                                     self._make_agent_dict,
                                     filters=filters, fields=fields)
 
+    def _get_host_agents(self, context, agent_type, host, fields=None):
+        """Get the agents of a type on a host through the agent cache."""
+        agents = self.agent_cache.get(agent_type, host)
+        if agents is None:
+            agents = self._get_collection(context, Agent,
+                                          self._make_agent_dict,
+                                          filters={'agent_type': [agent_type],
+                                                   'host': [host]})
+            self.agent_cache.set(agent_type, host,
+                                 [dict(agent) for agent in agents])
+        return [self._fields(agent, fields) for agent in agents]
+
     def _get_agent_by_type_and_host(self, context, agent_type, host):
         query = self._model_query(context, Agent)
         try:
@@ -133,8 +339,39 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
         agent = self._get_agent(context, id)
         return self._make_agent_dict(agent, fields)
 
+    def _record_heartbeat(self, agent):
+        """Keep the heartbeat of a report which changes nothing else.
+
+        Return False if the report must be written to the database.
+        """
+        report = self.agent_cache.get_report(agent['agent_type'],
+                                             agent['host'])
+        if not report:
+            return False
+        if HEARTBEATS.is_deleted(report[0]):
+            # The report is written, registering the agent again
+            HEARTBEATS.remove(report[0])
+            return False
+        if (agent.get('start_flag') or
+            report[1] != self._get_report_state(agent)):
+            return False
+        HEARTBEATS.record(report[0], timeutils.utcnow())
+        return True
+
+    @staticmethod
+    def _get_report_state(agent):
+        return (agent['binary'], agent['topic'],
+                agent.get('configurations', {}))
+
     def create_or_update_agent(self, context, agent):
-        """Create or update agent according to report."""
+        """Create or update agent according to report.
+
+        With agent_heartbeat_flush_interval, a report which only renews
+        the heartbeat of a known agent is kept in memory.
+        """
+        if (cfg.CONF.agent_heartbeat_flush_interval and
+            self._record_heartbeat(agent)):
+            return
         with context.session.begin(subtransactions=True):
             res_keys = ['agent_type', 'binary', 'host', 'topic']
             res = dict((k, agent[k]) for k in res_keys)
@@ -160,6 +397,11 @@ class AgentDbMixin(ext_agent.AgentPluginBase):
                 greenthread.sleep(0)
                 context.session.add(agent_db)
             greenthread.sleep(0)
+        self.agent_cache.invalidate(agent['agent_type'], agent['host'])
+        if cfg.CONF.agent_heartbeat_flush_interval:
+            self.agent_cache.set_report(
+                agent['agent_type'], agent['host'], agent_db.id,
+                copy.deepcopy(self._get_report_state(agent)))
 
 
 class AgentExtRpcCallback(object):
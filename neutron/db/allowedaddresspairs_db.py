@@ -39,6 +39,10 @@ class AllowedAddressPair(model_base.BASEV2):
                             lazy="joined", cascade="delete"))
 
 
+models_v2.register_revision_parent(AllowedAddressPair, models_v2.Port,
+                                   'port_id')
+
+
 class AllowedAddressPairsMixin(object):
     """Mixin class for allowed address pairs."""
 
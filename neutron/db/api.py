@@ -17,16 +17,167 @@
 # @author: Brad Hall, Nicira Networks, Inc.
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
+import contextlib
+import os
+import time
+import traceback
+
+from oslo.config import cfg
 import sqlalchemy as sql
+from sqlalchemy import engine
+from sqlalchemy import event
+from sqlalchemy import orm
+from sqlalchemy.sql import expression
 
 from neutron.db import model_base
 from neutron.openstack.common.db.sqlalchemy import session
+from neutron.openstack.common import local
 from neutron.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
 
+sql_stats_opts = [
+    cfg.FloatOpt('slow_query_threshold', default=0,
+                 help=_('Log the SQL statements taking more than this '
+                        'number of seconds, with their caller. 0 disables '
+                        'the log')),
+]
+
+cfg.CONF.register_opts(sql_stats_opts, 'database')
+
 BASE = model_base.BASEV2
 
+_REPLICA_MAKER = None
+
+# Directories of the modules which are skipped when looking for the caller
+# of a SQL statement
+_DB_LAYER_DIRS = (os.path.dirname(sql.__file__),
+                  os.path.dirname(session.__file__),
+                  os.path.dirname(__file__))
+
+
+class SqlStats(object):
+    """Totals of the SQL statements run while handling a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.checkout_wait = 0.0
+
+    def __str__(self):
+        return (_('%(count)d SQL statements in %(time).3f s, '
+                  '%(checkout_wait).3f s waiting for connections') %
+                {'count': self.count, 'time': self.time,
+                 'checkout_wait': self.checkout_wait})
+
+
+@contextlib.contextmanager
+def collect_sql_stats(description):
+    """Total the SQL statements run by the current greenthread.
+
+    The totals are logged with description at the end of the block.
+    """
+    previous = getattr(local.store, 'sql_stats', None)
+    stats = SqlStats()
+    local.store.sql_stats = stats
+    try:
+        yield stats
+    finally:
+        if previous is None:
+            del local.store.sql_stats
+        else:
+            local.store.sql_stats = previous
+        if stats.count:
+            LOG.debug(_('%(description)s: %(stats)s'),
+                      {'description': description, 'stats': stats})
+
+
+def _get_sql_caller():
+    for filename, line, function, text in reversed(traceback.extract_stack()):
+        if not filename.startswith(_DB_LAYER_DIRS):
+            return '%s:%d %s' % (filename, line, function)
+
+
+@event.listens_for(engine.Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    context.neutron_start_time = time.time()
+
+
+@event.listens_for(engine.Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.time() - context.neutron_start_time
+    stats = getattr(local.store, 'sql_stats', None)
+    if stats is not None:
+        stats.count += 1
+        stats.time += elapsed
+    threshold = cfg.CONF.database.slow_query_threshold
+    if threshold and elapsed >= threshold:
+        LOG.warning(_('Slow SQL statement (%(time).3f s) from %(caller)s: '
+                      '%(statement)s'),
+                    {'time': elapsed, 'caller': _get_sql_caller(),
+                     'statement': statement})
+
+
+@event.listens_for(engine.Engine, 'begin')
+def _begin(conn):
+    if conn.dialect.name == 'sqlite':
+        # pysqlite starts its own transactions before DML statements only,
+        # which breaks savepoints. Transactions are started explicitly.
+        conn.connection.connection.isolation_level = None
+        conn.execute('BEGIN')
+
+
+def _time_checkouts(db_engine):
+    """Add the time waited for connections of db_engine to the totals."""
+    pool = db_engine.pool
+    if getattr(pool, 'neutron_timed', False):
+        return db_engine
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.time()
+        try:
+            return connect()
+        finally:
+            stats = getattr(local.store, 'sql_stats', None)
+            if stats is not None:
+                stats.checkout_wait += time.time() - start
+
+    pool.connect = timed_connect
+    pool.neutron_timed = True
+    return db_engine
+
+
+class ReplicaSession(session.Session):
+    """Session reading from the replica database outside transactions.
+
+    Statements run in transactions are sent to the primary database, as
+    well as all the statements following a write, so that the session reads
+    its own writes.
+    """
+
+    def __init__(self, primary_bind=None, **kwargs):
+        super(ReplicaSession, self).__init__(**kwargs)
+        self._primary_bind = primary_bind
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._wrote or self.transaction is not None:
+            return self._primary_bind
+        return super(ReplicaSession, self).get_bind(mapper, clause)
+
+    def flush(self, *args, **kwargs):
+        if self.new or self.dirty or self.deleted:
+            self._wrote = True
+        return super(ReplicaSession, self).flush(*args, **kwargs)
+
+    def execute(self, clause, *args, **kwargs):
+        if isinstance(clause, expression.UpdateBase):
+            self._wrote = True
+        return super(ReplicaSession, self).execute(clause, *args, **kwargs)
+
 
 def configure_db():
     """Configure database.
@@ -34,22 +185,45 @@ def configure_db():
     Establish the database, create an engine if needed, and register
     the models.
     """
-    session.get_engine(sqlite_fk=True)
+    _time_checkouts(session.get_engine(sqlite_fk=True))
     register_models()
 
 
 def clear_db(base=BASE):
+    global _REPLICA_MAKER
     unregister_models(base)
     session.cleanup()
+    _REPLICA_MAKER = None
 
 
-def get_session(autocommit=True, expire_on_commit=False):
-    """Helper method to grab session."""
+def get_session(autocommit=True, expire_on_commit=False, use_replica=False):
+    """Helper method to grab session.
+
+    With use_replica, the session reads from the database configured with
+    the slave_connection option, if any (see ReplicaSession).
+    """
+    if use_replica and cfg.CONF.database.slave_connection:
+        return _get_replica_session(autocommit, expire_on_commit)
+    _time_checkouts(session.get_engine(sqlite_fk=True))
     return session.get_session(autocommit=autocommit,
                                expire_on_commit=expire_on_commit,
                                sqlite_fk=True)
 
 
+def _get_replica_session(autocommit, expire_on_commit):
+    global _REPLICA_MAKER
+    if _REPLICA_MAKER is None:
+        _REPLICA_MAKER = orm.sessionmaker(
+            bind=_time_checkouts(
+                session.get_engine(sqlite_fk=True, slave_engine=True)),
+            class_=ReplicaSession,
+            autocommit=autocommit,
+            expire_on_commit=expire_on_commit,
+            query_cls=session.Query,
+            primary_bind=_time_checkouts(session.get_engine(sqlite_fk=True)))
+    return _REPLICA_MAKER()
+
+
 def register_models(base=BASE):
     """Register Models and create properties."""
     try:
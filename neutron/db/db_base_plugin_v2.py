@@ -16,11 +16,11 @@
 #    under the License.
 
 import datetime
-import itertools
 import random
 
 import netaddr
 from oslo.config import cfg
+import sqlalchemy as sa
 from sqlalchemy import orm
 from sqlalchemy.orm import exc
 
@@ -50,6 +50,15 @@ AGENT_OWNER_PREFIX = 'network:'
 # IP allocations being cleaned up by cascade.
 AUTO_DELETE_PORT_OWNERS = ['network:dhcp']
 
+# Maximum number of values in a single IN clause
+MAX_IDS_PER_QUERY = 500
+
+
+def _chunks(values, size=MAX_IDS_PER_QUERY):
+    """Split a list of values for IN clauses of at most size values."""
+    for i in xrange(0, len(values), size):
+        yield values[i:i + size]
+
 
 class CommonDbMixin(object):
     """Common methods used in core and service plugins."""
@@ -65,6 +74,12 @@ class CommonDbMixin(object):
     # TODO(salvatore-orlando): Avoid using class-level variables
     _dict_extend_functions = {}
 
+    # This dictionary will store loader options applied when listing the
+    # objects of a model, so that relationships read while building the
+    # resource dicts are not loaded one object at a time. Mixins register
+    # them next to their dict extend functions.
+    _model_eager_loads = {}
+
     @classmethod
     def register_model_query_hook(cls, model, name, query_hook, filter_hook,
                                   result_filters=None):
@@ -90,6 +105,25 @@ class CommonDbMixin(object):
         model_hooks[name] = {'query': query_hook, 'filter': filter_hook,
                              'result_filters': result_filters}
 
+    @classmethod
+    def register_model_eager_loads(cls, model, options):
+        """Register loader options for listing the objects of a model.
+
+        Options are SQLAlchemy loader options such as
+        orm.subqueryload(Model.relationship). They are applied to queries
+        retrieving collections only, and should be used for relationships
+        which are not eagerly loaded by the model itself.
+        """
+        cur_options = cls._model_eager_loads.get(model, [])
+        cur_options.extend(options)
+        cls._model_eager_loads[model] = cur_options
+
+    def _apply_eager_loads(self, query, model):
+        options = self._model_eager_loads.get(model)
+        if options:
+            query = query.options(*options)
+        return query
+
     def _model_query(self, context, model):
         query = context.session.query(model)
         # define basic filter condition for model query
@@ -180,6 +214,9 @@ class CommonDbMixin(object):
         collection = self._apply_filters_to_query(collection, model, filters)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
+        if isinstance(marker_obj, sqlalchemyutils.Marker) and sorts:
+            marker_obj = self._get_marker_values(context, model, sorts,
+                                                 marker_obj)
         collection = sqlalchemyutils.paginate_query(collection, model, limit,
                                                     sorts,
                                                     marker_obj=marker_obj)
@@ -187,25 +224,108 @@ class CommonDbMixin(object):
 
     def _get_collection(self, context, model, dict_func, filters=None,
                         fields=None, sorts=None, limit=None, marker_obj=None,
-                        page_reverse=False):
+                        page_reverse=False, child_fields=None):
         query = self._get_collection_query(context, model, filters=filters,
                                            sorts=sorts,
                                            limit=limit,
                                            marker_obj=marker_obj,
                                            page_reverse=page_reverse)
-        items = [dict_func(c, fields) for c in query]
+        items = None
+        if fields and child_fields is not None:
+            items = self._get_collection_fields(context, query, model,
+                                                fields, child_fields)
+        if items is None:
+            query = self._apply_eager_loads(query, model)
+            items = [dict_func(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
 
+    def _get_collection_fields(self, context, query, model, fields,
+                               child_fields):
+        """Build the items of a collection from the requested fields only.
+
+        Only the columns backing the fields are selected, so that objects,
+        their relationships and dict extend functions are not loaded at
+        all. child_fields maps the fields stored in child tables to
+        (foreign key column, value columns, function building the value
+        from a row) tuples, and these are fetched with one query per field.
+        Return None if a field is backed neither by a column of the model
+        nor by child_fields, in which case full objects must be loaded.
+        """
+        fields = set(fields)
+        children = fields & set(child_fields)
+        columns = fields - children
+        if not columns.issubset(model.__table__.columns.keys()):
+            return
+        columns.add('id')
+        names = list(columns)
+        query = query.with_entities(*[getattr(model, name) for name in names])
+        items = []
+        items_by_id = {}
+        for row in query:
+            item = dict(zip(names, row))
+            # Filters joining other tables might repeat a resource
+            if item['id'] not in items_by_id:
+                items_by_id[item['id']] = item
+                items.append(item)
+        for field in children:
+            for item in items:
+                item[field] = []
+            foreign_key, value_columns, make_value = child_fields[field]
+            for chunk in _chunks(items_by_id.keys()):
+                rows = context.session.query(foreign_key, *value_columns)
+                for row in rows.filter(foreign_key.in_(chunk)):
+                    items_by_id[row[0]][field].append(make_value(row))
+        if 'id' not in fields:
+            for item in items:
+                del item['id']
+        return items
+
     def _get_collection_count(self, context, model, filters=None):
         return self._get_collection_query(context, model, filters).count()
 
+    def _get_collection_revision(self, context, model, filters=None):
+        """Return a value changing whenever the collection changes.
+
+        The value is made of the number of objects and of their highest
+        revision, read with a single aggregate query.
+        """
+        query = self._get_collection_query(context, model, filters)
+        return self._get_query_revision(query, model)
+
+    def _get_query_revision(self, query, model):
+        count, revision = query.with_entities(
+            sa.func.count(model.id), sa.func.max(model.revision)).one()
+        return '%d-%d' % (count, revision or 0)
+
     def _get_marker_obj(self, context, resource, limit, marker):
+        # Only the sort key values of the marker are read when listing
         if limit and marker:
-            return getattr(self, '_get_%s' % resource)(context, marker)
+            return sqlalchemyutils.Marker(marker, resource)
         return None
 
+    def _get_marker_values(self, context, model, sorts, marker):
+        """Return a row with the sort key values of a marker.
+
+        The marker is looked up like the objects of the collection, so that
+        the markers not visible in context are not found.
+        """
+        columns = [getattr(model, key) for key, direction in sorts
+                   if isinstance(getattr(getattr(model, key, None),
+                                         'property', None),
+                                 orm.ColumnProperty)]
+        if columns:
+            query = self._model_query(context, model).with_entities(*columns)
+            row = query.filter(model.id == marker.id).first()
+            if row is not None:
+                return row
+        # Let the resource raise its not found error
+        get_resource = getattr(self, '_get_%s' % marker.resource, None)
+        if get_resource:
+            return get_resource(context, marker.id)
+        raise q_exc.NotFound()
+
 
 class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                         CommonDbMixin):
@@ -224,6 +344,33 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
     __native_pagination_support = True
     __native_sorting_support = True
 
+    # Fields of core resources stored in child tables, used for listing
+    # resources from the requested fields only
+    _network_child_fields = {
+        'subnets': (models_v2.Subnet.network_id,
+                    [models_v2.Subnet.id],
+                    lambda row: row.id)}
+    _subnet_child_fields = {
+        'allocation_pools': (models_v2.IPAllocationPool.subnet_id,
+                             [models_v2.IPAllocationPool.first_ip,
+                              models_v2.IPAllocationPool.last_ip],
+                             lambda row: {'start': row.first_ip,
+                                          'end': row.last_ip}),
+        'dns_nameservers': (models_v2.DNSNameServer.subnet_id,
+                            [models_v2.DNSNameServer.address],
+                            lambda row: row.address),
+        'host_routes': (models_v2.SubnetRoute.subnet_id,
+                        [models_v2.SubnetRoute.destination,
+                         models_v2.SubnetRoute.nexthop],
+                        lambda row: {'destination': row.destination,
+                                     'nexthop': row.nexthop})}
+    _port_child_fields = {
+        'fixed_ips': (models_v2.IPAllocation.port_id,
+                      [models_v2.IPAllocation.subnet_id,
+                       models_v2.IPAllocation.ip_address],
+                      lambda row: {'subnet_id': row.subnet_id,
+                                   'ip_address': row.ip_address})}
+
     def __init__(self):
         # NOTE(jkoelker) This is an incomplete implementation. Subclasses
         #                must override __init__ and setup the database
@@ -284,16 +431,20 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         return context.session.query(models_v2.Subnet).all()
 
     @staticmethod
-    def _generate_mac(context, network_id):
+    def _random_mac():
         base_mac = cfg.CONF.base_mac.split(':')
+        mac = [int(base_mac[0], 16), int(base_mac[1], 16),
+               int(base_mac[2], 16), random.randint(0x00, 0xff),
+               random.randint(0x00, 0xff), random.randint(0x00, 0xff)]
+        if base_mac[3] != '00':
+            mac[3] = int(base_mac[3], 16)
+        return ':'.join(map(lambda x: "%02x" % x, mac))
+
+    @staticmethod
+    def _generate_mac(context, network_id):
         max_retries = cfg.CONF.mac_generation_retries
         for i in range(max_retries):
-            mac = [int(base_mac[0], 16), int(base_mac[1], 16),
-                   int(base_mac[2], 16), random.randint(0x00, 0xff),
-                   random.randint(0x00, 0xff), random.randint(0x00, 0xff)]
-            if base_mac[3] != '00':
-                mac[3] = int(base_mac[3], 16)
-            mac_address = ':'.join(map(lambda x: "%02x" % x, mac))
+            mac_address = NeutronDbPluginV2._random_mac()
             if NeutronDbPluginV2._check_unique_mac(context, network_id,
                                                    mac_address):
                 LOG.debug(_("Generated mac for network %(network_id)s "
@@ -310,6 +461,32 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                   max_retries)
         raise q_exc.MacAddressGenerationFailure(net_id=network_id)
 
+    @staticmethod
+    def _generate_macs(context, network_id, count):
+        """Generate count MAC addresses unique on the network.
+
+        Candidates are checked together with one query, and only those
+        already in use are generated again.
+        """
+        macs = set()
+        for i in range(cfg.CONF.mac_generation_retries):
+            candidates = set(NeutronDbPluginV2._random_mac()
+                             for j in xrange(count - len(macs))) - macs
+            for chunk in _chunks(list(candidates)):
+                in_use = context.session.query(
+                    models_v2.Port.mac_address).filter(
+                        models_v2.Port.network_id == network_id,
+                        models_v2.Port.mac_address.in_(chunk))
+                candidates.difference_update(mac for (mac,) in in_use)
+            macs.update(candidates)
+            if len(macs) == count:
+                return list(macs)
+        LOG.error(_("Unable to generate %(count)s mac addresses after "
+                    "%(max_retries)s attempts"),
+                  {'count': count,
+                   'max_retries': cfg.CONF.mac_generation_retries})
+        raise q_exc.MacAddressGenerationFailure(net_id=network_id)
+
     @staticmethod
     def _check_unique_mac(context, network_id, mac_address):
         mac_qry = context.session.query(models_v2.Port)
@@ -325,92 +502,101 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         """Return an IP address to the pool of free IP's on the network
         subnet.
         """
-        # Grab all allocation pools for the subnet
-        allocation_pools = (context.session.query(
-            models_v2.IPAllocationPool).filter_by(subnet_id=subnet_id).
-            options(orm.joinedload('available_ranges', innerjoin=True)).
-            with_lockmode('update'))
-        # If there are no available ranges the previous query will return no
-        # results as it uses an inner join to avoid errors with the postgresql
-        # backend (see lp bug 1215350). In this case IP allocation pools must
-        # be loaded with a different query, which does not require lock for
-        # update as the allocation pools for a subnet are immutable.
-        # The 2nd query will be executed only if the first yields no results
-        unlocked_allocation_pools = (context.session.query(
-            models_v2.IPAllocationPool).filter_by(subnet_id=subnet_id))
-
-        # Find the allocation pool for the IP to recycle
+        ip = int(netaddr.IPAddress(ip_address))
+        # Find the allocation pool for the IP to recycle. Pools of a subnet
+        # are immutable, so they are read without locking them and without
+        # loading their availability ranges.
+        pool_qry = context.session.query(
+            models_v2.IPAllocationPool.id,
+            models_v2.IPAllocationPool.first_ip,
+            models_v2.IPAllocationPool.last_ip).filter_by(subnet_id=subnet_id)
         pool_id = None
-
-        for allocation_pool in itertools.chain(allocation_pools,
-                                               unlocked_allocation_pools):
-            allocation_pool_range = netaddr.IPRange(
-                allocation_pool['first_ip'], allocation_pool['last_ip'])
-            if netaddr.IPAddress(ip_address) in allocation_pool_range:
-                pool_id = allocation_pool['id']
+        for allocation_pool in pool_qry:
+            if (int(netaddr.IPAddress(allocation_pool.first_ip)) <= ip <=
+                    int(netaddr.IPAddress(allocation_pool.last_ip))):
+                pool_id = allocation_pool.id
                 break
         if not pool_id:
             NeutronDbPluginV2._delete_ip_allocation(
                 context, network_id, subnet_id, ip_address)
             return
-        # Two requests will be done on the database. The first will be to
-        # search if an entry starts with ip_address + 1 (r1). The second
-        # will be to see if an entry ends with ip_address -1 (r2).
-        # If 1 of the above holds true then the specific entry will be
-        # modified. If both hold true then the two ranges will be merged.
-        # If there are no entries then a single entry will be added.
-        range_qry = context.session.query(
-            models_v2.IPAvailabilityRange).with_lockmode('update')
+        # Two index lookups are done on the database. The first searches for
+        # a range starting with ip_address + 1 (r1), the second for the range
+        # preceding the IP, which is used if it ends with ip_address - 1
+        # (r2). If only one of them exists it is extended with the IP; if
+        # both do they are merged. Otherwise a new range is added. Ranges
+        # are changed with compare-and-swap like in _generate_ip, retrying
+        # with a locking read on conflicts. A new range is only added after
+        # a locking read, so that a concurrent recycling of an adjacent IP
+        # waits for it and merges with it rather than adding another range.
         ip_first = str(netaddr.IPAddress(ip_address) + 1)
         ip_last = str(netaddr.IPAddress(ip_address) - 1)
+        ip_key = models_v2.ip_sort_key(ip_address)
         LOG.debug(_("Recycle %s"), ip_address)
-        try:
-            r1 = range_qry.filter_by(allocation_pool_id=pool_id,
-                                     first_ip=ip_first).one()
-            LOG.debug(_("Recycle: first match for %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r1['first_ip'], 'last_ip': r1['last_ip']})
-        except exc.NoResultFound:
-            r1 = []
-        try:
-            r2 = range_qry.filter_by(allocation_pool_id=pool_id,
-                                     last_ip=ip_last).one()
-            LOG.debug(_("Recycle: last match for %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r2['first_ip'], 'last_ip': r2['last_ip']})
-        except exc.NoResultFound:
-            r2 = []
-
-        if r1 and r2:
-            # Merge the two ranges
-            ip_range = models_v2.IPAvailabilityRange(
-                allocation_pool_id=pool_id,
-                first_ip=r2['first_ip'],
-                last_ip=r1['last_ip'])
-            context.session.add(ip_range)
-            LOG.debug(_("Recycle: merged %(first_ip1)s-%(last_ip1)s and "
-                        "%(first_ip2)s-%(last_ip2)s"),
-                      {'first_ip1': r2['first_ip'], 'last_ip1': r2['last_ip'],
-                       'first_ip2': r1['first_ip'], 'last_ip2': r1['last_ip']})
-            context.session.delete(r1)
-            context.session.delete(r2)
-        elif r1:
-            # Update the range with matched first IP
-            r1['first_ip'] = ip_address
-            LOG.debug(_("Recycle: updated first %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r1['first_ip'], 'last_ip': r1['last_ip']})
-        elif r2:
-            # Update the range with matched last IP
-            r2['last_ip'] = ip_address
-            LOG.debug(_("Recycle: updated last %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': r2['first_ip'], 'last_ip': r2['last_ip']})
+        for attempt in xrange(cfg.CONF.ip_allocation_retries + 1):
+            range_qry = context.session.query(
+                models_v2.IPAvailabilityRange.allocation_pool_id,
+                models_v2.IPAvailabilityRange.first_ip,
+                models_v2.IPAvailabilityRange.last_ip).filter_by(
+                    allocation_pool_id=pool_id)
+            if attempt:
+                range_qry = range_qry.with_lockmode('update')
+            r1 = range_qry.filter_by(first_ip=ip_first).first()
+            r2 = range_qry.filter(
+                models_v2.IPAvailabilityRange.first_ip_key < ip_key).order_by(
+                    models_v2.IPAvailabilityRange.first_ip_key.desc()).first()
+            if r2 and r2.last_ip != ip_last:
+                r2 = None
+
+            if r1 and r2:
+                # Merge the two ranges
+                if NeutronDbPluginV2._swap_ip_range(context, r1):
+                    if not NeutronDbPluginV2._swap_ip_range(
+                            context, r2, r2.first_ip, r1.last_ip):
+                        # r2 changed meanwhile: keep r1's IPs as a range
+                        context.session.add(models_v2.IPAvailabilityRange(
+                            allocation_pool_id=pool_id,
+                            first_ip=ip_address,
+                            last_ip=r1.last_ip))
+                    LOG.debug(_("Recycle: merged %(first_ip1)s-%(last_ip1)s "
+                                "and %(first_ip2)s-%(last_ip2)s"),
+                              {'first_ip1': r2.first_ip,
+                               'last_ip1': r2.last_ip,
+                               'first_ip2': r1.first_ip,
+                               'last_ip2': r1.last_ip})
+                    break
+            elif r1:
+                # Update the range with matched first IP
+                if NeutronDbPluginV2._swap_ip_range(context, r1, ip_address,
+                                                    r1.last_ip):
+                    LOG.debug(_("Recycle: updated first "
+                                "%(first_ip)s-%(last_ip)s"),
+                              {'first_ip': ip_address,
+                               'last_ip': r1.last_ip})
+                    break
+            elif r2:
+                # Update the range with matched last IP
+                if NeutronDbPluginV2._swap_ip_range(context, r2, r2.first_ip,
+                                                    ip_address):
+                    LOG.debug(_("Recycle: updated last "
+                                "%(first_ip)s-%(last_ip)s"),
+                              {'first_ip': r2.first_ip,
+                               'last_ip': ip_address})
+                    break
+            elif attempt:
+                # Create a new range
+                ip_range = models_v2.IPAvailabilityRange(
+                    allocation_pool_id=pool_id,
+                    first_ip=ip_address,
+                    last_ip=ip_address)
+                context.session.add(ip_range)
+                LOG.debug(_("Recycle: created new %(first_ip)s-%(last_ip)s"),
+                          {'first_ip': ip_address, 'last_ip': ip_address})
+                break
         else:
-            # Create a new range
-            ip_range = models_v2.IPAvailabilityRange(
-                allocation_pool_id=pool_id,
-                first_ip=ip_address,
-                last_ip=ip_address)
-            context.session.add(ip_range)
-            LOG.debug(_("Recycle: created new %(first_ip)s-%(last_ip)s"),
-                      {'first_ip': ip_address, 'last_ip': ip_address})
+            # Adjacent ranges kept changing: adding an unmerged range would
+            # fragment the pool
+            raise q_exc.IpAddressAllocationConflict(subnet_id=subnet_id)
         NeutronDbPluginV2._delete_ip_allocation(context, network_id, subnet_id,
                                                 ip_address)
 
@@ -448,6 +634,55 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                             ip_address=ip_address,
                             subnet_id=subnet_id).delete()
 
+    @staticmethod
+    def _get_ip_ranges_query(context, subnet_id, locked=False):
+        """Return a query on the availability ranges of a subnet.
+
+        Ranges are read as plain tuples rather than mapped objects, as they
+        are then modified with compare-and-swap statements. They are sorted
+        by IP address, so that the IPs recycled low in the pools are given
+        out first rather than left as fragments.
+        """
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange.allocation_pool_id,
+            models_v2.IPAvailabilityRange.first_ip,
+            models_v2.IPAvailabilityRange.last_ip).join(
+                models_v2.IPAllocationPool).filter(
+                    models_v2.IPAllocationPool.subnet_id == subnet_id)
+        range_qry = range_qry.order_by(
+            models_v2.IPAvailabilityRange.first_ip_key)
+        if locked:
+            range_qry = range_qry.with_lockmode('update')
+        return range_qry
+
+    @staticmethod
+    def _swap_ip_range(context, ip_range, first_ip=None, last_ip=None):
+        """Replace the boundaries of an availability range.
+
+        The range is only changed if it still has the boundaries it was read
+        with. If no new boundaries are given the range is deleted. Return
+        True if the range was changed, False if it was concurrently modified.
+        """
+        range_qry = context.session.query(
+            models_v2.IPAvailabilityRange).filter_by(
+                allocation_pool_id=ip_range.allocation_pool_id,
+                first_ip=ip_range.first_ip,
+                last_ip=ip_range.last_ip)
+        if first_ip is None:
+            count = range_qry.delete(synchronize_session=False)
+        else:
+            count = range_qry.update(
+                {'first_ip': first_ip,
+                 'first_ip_key': models_v2.ip_sort_key(first_ip),
+                 'last_ip': last_ip},
+                synchronize_session=False)
+        if not count:
+            LOG.debug(_("IP availability range %(first_ip)s-%(last_ip)s "
+                        "was modified concurrently"),
+                      {'first_ip': ip_range.first_ip,
+                       'last_ip': ip_range.last_ip})
+        return bool(count)
+
     @staticmethod
     def _generate_ip(context, subnets):
         """Generate an IP address.
@@ -455,65 +690,139 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         The IP address will be generated from one of the subnets defined on
         the network.
         """
-        range_qry = context.session.query(
-            models_v2.IPAvailabilityRange).join(
-                models_v2.IPAllocationPool).with_lockmode('update')
+        conflicting_subnet_id = None
         for subnet in subnets:
-            range = range_qry.filter_by(subnet_id=subnet['id']).first()
-            if not range:
-                LOG.debug(_("All IPs from subnet %(subnet_id)s (%(cidr)s) "
-                            "allocated"),
-                          {'subnet_id': subnet['id'], 'cidr': subnet['cidr']})
-                continue
-            ip_address = range['first_ip']
-            LOG.debug(_("Allocated IP - %(ip_address)s from %(first_ip)s "
-                        "to %(last_ip)s"),
-                      {'ip_address': ip_address,
-                       'first_ip': range['first_ip'],
-                       'last_ip': range['last_ip']})
-            if range['first_ip'] == range['last_ip']:
-                # No more free indices on subnet => delete
-                LOG.debug(_("No more free IP's in slice. Deleting allocation "
-                            "pool."))
-                context.session.delete(range)
+            # NOTE: availability ranges are not locked when read, the update
+            # fails instead if another allocation changed the range first.
+            # As the first read might then come from a stale snapshot,
+            # further attempts use a locking read.
+            for attempt in xrange(cfg.CONF.ip_allocation_retries + 1):
+                range = NeutronDbPluginV2._get_ip_ranges_query(
+                    context, subnet['id'], locked=attempt > 0).first()
+                if not range:
+                    LOG.debug(_("All IPs from subnet %(subnet_id)s "
+                                "(%(cidr)s) allocated"),
+                              {'subnet_id': subnet['id'],
+                               'cidr': subnet['cidr']})
+                    break
+                ip_address = range.first_ip
+                if range.first_ip == range.last_ip:
+                    # No more free indices on subnet => delete
+                    allocated = NeutronDbPluginV2._swap_ip_range(context,
+                                                                 range)
+                else:
+                    # increment the first free
+                    allocated = NeutronDbPluginV2._swap_ip_range(
+                        context, range,
+                        str(netaddr.IPAddress(ip_address) + 1),
+                        range.last_ip)
+                if allocated:
+                    LOG.debug(_("Allocated IP - %(ip_address)s from "
+                                "%(first_ip)s to %(last_ip)s"),
+                              {'ip_address': ip_address,
+                               'first_ip': range.first_ip,
+                               'last_ip': range.last_ip})
+                    return {'ip_address': ip_address,
+                            'subnet_id': subnet['id']}
             else:
-                # increment the first free
-                range['first_ip'] = str(netaddr.IPAddress(ip_address) + 1)
-            return {'ip_address': ip_address, 'subnet_id': subnet['id']}
+                LOG.warning(_("IP allocation on subnet %(subnet_id)s lost "
+                              "%(attempts)s races with concurrent "
+                              "allocations"),
+                            {'subnet_id': subnet['id'],
+                             'attempts': attempt + 1})
+                conflicting_subnet_id = subnet['id']
+        if conflicting_subnet_id:
+            raise q_exc.IpAddressAllocationConflict(
+                subnet_id=conflicting_subnet_id)
+        raise q_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
+
+    @staticmethod
+    def _generate_ips(context, subnets, count):
+        """Generate count IP addresses from the subnets.
+
+        Addresses are taken in order from the availability ranges of each
+        subnet, which are read once with a lock rather than once per
+        address.
+        """
+        ips = []
+        conflicting_subnet_id = None
+        for subnet in subnets:
+            ranges = NeutronDbPluginV2._get_ip_ranges_query(
+                context, subnet['id'], locked=True).all()
+            for range in ranges:
+                first = netaddr.IPAddress(range.first_ip)
+                size = int(netaddr.IPAddress(range.last_ip)) - int(first) + 1
+                taken = min(count - len(ips), size)
+                if taken == size:
+                    allocated = NeutronDbPluginV2._swap_ip_range(context,
+                                                                 range)
+                else:
+                    allocated = NeutronDbPluginV2._swap_ip_range(
+                        context, range, str(first + taken), range.last_ip)
+                if allocated:
+                    ips.extend({'ip_address': str(first + i),
+                                'subnet_id': subnet['id']}
+                               for i in xrange(taken))
+                else:
+                    conflicting_subnet_id = subnet['id']
+                if len(ips) == count:
+                    return ips
+            LOG.debug(_("All IPs from subnet %(subnet_id)s (%(cidr)s) "
+                        "allocated"),
+                      {'subnet_id': subnet['id'], 'cidr': subnet['cidr']})
+        if conflicting_subnet_id:
+            raise q_exc.IpAddressAllocationConflict(
+                subnet_id=conflicting_subnet_id)
         raise q_exc.IpAddressGenerationFailure(net_id=subnets[0]['network_id'])
 
     @staticmethod
     def _allocate_specific_ip(context, subnet_id, ip_address):
         """Allocate a specific IP address on the subnet."""
         ip = int(netaddr.IPAddress(ip_address))
-        range_qry = context.session.query(
-            models_v2.IPAvailabilityRange).join(
-                models_v2.IPAllocationPool).with_lockmode('update')
-        results = range_qry.filter_by(subnet_id=subnet_id)
-        for range in results:
-            first = int(netaddr.IPAddress(range['first_ip']))
-            last = int(netaddr.IPAddress(range['last_ip']))
-            if first <= ip <= last:
-                if first == last:
-                    context.session.delete(range)
-                    return
-                elif first == ip:
-                    range['first_ip'] = str(netaddr.IPAddress(ip_address) + 1)
-                    return
-                elif last == ip:
-                    range['last_ip'] = str(netaddr.IPAddress(ip_address) - 1)
-                    return
-                else:
-                    # Split into two ranges
-                    new_first = str(netaddr.IPAddress(ip_address) + 1)
-                    new_last = range['last_ip']
-                    range['last_ip'] = str(netaddr.IPAddress(ip_address) - 1)
+        ip_key = models_v2.ip_sort_key(ip_address)
+        for attempt in xrange(cfg.CONF.ip_allocation_retries + 1):
+            # Ranges do not overlap: only the last one starting at or before
+            # the IP can hold it
+            range_qry = NeutronDbPluginV2._get_ip_ranges_query(
+                context, subnet_id, locked=attempt > 0)
+            range_key = models_v2.IPAvailabilityRange.first_ip_key
+            range = range_qry.filter(range_key <= ip_key).order_by(
+                None).order_by(range_key.desc()).first()
+            if not range:
+                return
+            first = int(netaddr.IPAddress(range.first_ip))
+            last = int(netaddr.IPAddress(range.last_ip))
+            if ip > last:
+                return
+            if first == last:
+                allocated = NeutronDbPluginV2._swap_ip_range(context, range)
+            elif first == ip:
+                allocated = NeutronDbPluginV2._swap_ip_range(
+                    context, range, str(netaddr.IPAddress(ip_address) + 1),
+                    range.last_ip)
+            elif last == ip:
+                allocated = NeutronDbPluginV2._swap_ip_range(
+                    context, range, range.first_ip,
+                    str(netaddr.IPAddress(ip_address) - 1))
+            else:
+                # Split into two ranges
+                allocated = NeutronDbPluginV2._swap_ip_range(
+                    context, range, range.first_ip,
+                    str(netaddr.IPAddress(ip_address) - 1))
+                if allocated:
                     ip_range = models_v2.IPAvailabilityRange(
-                        allocation_pool_id=range['allocation_pool_id'],
-                        first_ip=new_first,
-                        last_ip=new_last)
+                        allocation_pool_id=range.allocation_pool_id,
+                        first_ip=str(netaddr.IPAddress(ip_address) + 1),
+                        last_ip=range.last_ip)
                     context.session.add(ip_range)
-                    return
+            if allocated:
+                return
+        LOG.warning(_("Allocation of IP %(ip_address)s on subnet "
+                      "%(subnet_id)s lost %(attempts)s races with concurrent "
+                      "allocations"),
+                    {'ip_address': ip_address, 'subnet_id': subnet_id,
+                     'attempts': attempt + 1})
+        raise q_exc.IpAddressAllocationConflict(subnet_id=subnet_id)
 
     @staticmethod
     def _check_unique_ip(context, network_id, subnet_id, ip_address):
@@ -703,17 +1012,8 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                                            p['fixed_ips'])
             ips = self._allocate_fixed_ips(context, network, configured_ips)
         else:
-            filter = {'network_id': [p['network_id']]}
-            subnets = self.get_subnets(context, filters=filter)
-            # Split into v4 and v6 subnets
-            v4 = []
-            v6 = []
-            for subnet in subnets:
-                if subnet['ip_version'] == 4:
-                    v4.append(subnet)
-                else:
-                    v6.append(subnet)
-            version_subnets = [v4, v6]
+            version_subnets = self._get_subnets_by_ip_version(
+                context, p['network_id'])
             for subnets in version_subnets:
                 if subnets:
                     result = NeutronDbPluginV2._generate_ip(context, subnets)
@@ -721,6 +1021,20 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                 'subnet_id': result['subnet_id']})
         return ips
 
+    def _get_subnets_by_ip_version(self, context, network_id):
+        """Return the v4 and the v6 subnets of a network."""
+        filter = {'network_id': [network_id]}
+        subnets = self.get_subnets(context, filters=filter)
+        # Split into v4 and v6 subnets
+        v4 = []
+        v6 = []
+        for subnet in subnets:
+            if subnet['ip_version'] == 4:
+                v4.append(subnet)
+            else:
+                v6.append(subnet)
+        return [v4, v6]
+
     def _validate_subnet_cidr(self, context, network, new_subnet_cidr):
         """Validate the CIDR for a subnet.
 
@@ -728,13 +1042,16 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         for the other subnets specified for this network, or with any other
         CIDR if overlapping IPs are disabled.
         """
-        new_subnet_ipset = netaddr.IPSet([new_subnet_cidr])
+        new_subnet = netaddr.IPNetwork(new_subnet_cidr)
         if cfg.CONF.allow_overlapping_ips:
             subnet_list = network.subnets
         else:
             subnet_list = self._get_all_subnets(context)
         for subnet in subnet_list:
-            if (netaddr.IPSet([subnet.cidr]) & new_subnet_ipset):
+            cidr = netaddr.IPNetwork(subnet.cidr)
+            if (cidr.version == new_subnet.version and
+                    cidr.first <= new_subnet.last and
+                    new_subnet.first <= cidr.last):
                 # don't give out details of the overlapping subnet
                 err_msg = (_("Requested subnet with cidr: %(cidr)s for "
                              "network: %(network_id)s overlaps with another "
@@ -762,7 +1079,7 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         subnet_last_ip = netaddr.IPAddress(subnet.last - 1)
 
         LOG.debug(_("Performing IP validity checks on allocation pools"))
-        ip_sets = []
+        ip_ranges = []
         for ip_pool in ip_pools:
             try:
                 start_ip = netaddr.IPAddress(ip_pool['start'])
@@ -792,29 +1109,25 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                     pool=ip_pool,
                     subnet_cidr=subnet_cidr)
             # Valid allocation pool
-            # Create an IPSet for it for easily verifying overlaps
-            ip_sets.append(netaddr.IPSet(netaddr.IPRange(
-                ip_pool['start'],
-                ip_pool['end']).cidrs()))
+            ip_ranges.append((int(start_ip), int(end_ip), ip_pool))
 
         LOG.debug(_("Checking for overlaps among allocation pools "
                     "and gateway ip"))
-        ip_ranges = ip_pools[:]
-
-        # Use integer cursors as an efficient way for implementing
-        # comparison and avoiding comparing the same pair twice
-        for l_cursor in range(len(ip_sets)):
-            for r_cursor in range(l_cursor + 1, len(ip_sets)):
-                if ip_sets[l_cursor] & ip_sets[r_cursor]:
-                    l_range = ip_ranges[l_cursor]
-                    r_range = ip_ranges[r_cursor]
-                    LOG.error(_("Found overlapping ranges: %(l_range)s and "
-                                "%(r_range)s"),
-                              {'l_range': l_range, 'r_range': r_range})
-                    raise q_exc.OverlappingAllocationPools(
-                        pool_1=l_range,
-                        pool_2=r_range,
-                        subnet_cidr=subnet_cidr)
+        # Once sorted by their first IP, a pool overlaps with a previous one
+        # if and only if it starts before the furthest end seen so far.
+        ip_ranges.sort(key=lambda ip_range: ip_range[:2])
+        l_last, l_range = None, None
+        for first, last, r_range in ip_ranges:
+            if l_range and first <= l_last:
+                LOG.error(_("Found overlapping ranges: %(l_range)s and "
+                            "%(r_range)s"),
+                          {'l_range': l_range, 'r_range': r_range})
+                raise q_exc.OverlappingAllocationPools(
+                    pool_1=l_range,
+                    pool_2=r_range,
+                    subnet_cidr=subnet_cidr)
+            if not l_range or last > l_last:
+                l_last, l_range = last, r_range
 
     def _validate_host_route(self, route, ip_version):
         try:
@@ -951,8 +1264,42 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                 context.session.rollback()
         return objects
 
+    def _is_create_overridden(self, resource, cls):
+        """Return True if create_<resource> is not the one of cls.
+
+        The bulk creation implemented by cls can only be used when this is
+        not the case, as the overriding method must process every item.
+        """
+        create = getattr(self, 'create_%s' % resource)
+        cls_create = getattr(cls, 'create_%s' % resource)
+        return getattr(create, 'im_func', None) is not cls_create.im_func
+
     def create_network_bulk(self, context, networks):
-        return self._create_bulk('network', context, networks)
+        if self._is_create_overridden('network', NeutronDbPluginV2):
+            return self._create_bulk('network', context, networks)
+        with context.session.begin(subtransactions=True):
+            return self._create_networks_bulk(context, networks['networks'])
+
+    def _create_networks_bulk(self, context, networks):
+        """Create the database records of several networks at once."""
+        rows = []
+        for network in networks:
+            n = network['network']
+            rows.append({'tenant_id': self._get_tenant_id_for_create(context,
+                                                                     n),
+                         'id': n.get('id') or uuidutils.generate_uuid(),
+                         'name': n['name'],
+                         'admin_state_up': n['admin_state_up'],
+                         'shared': n['shared'],
+                         'status': n.get('status',
+                                         constants.NET_STATUS_ACTIVE)})
+        if rows:
+            revision = models_v2.next_revision(context.session,
+                                               models_v2.Network)
+            context.session.execute(models_v2.Network.__table__.insert(),
+                                    [dict(row, revision=revision)
+                                     for row in rows])
+        return [dict(row, subnets=[]) for row in rows]
 
     def create_network(self, context, network):
         """Handle creation of a single network."""
@@ -1023,12 +1370,17 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                     sorts=sorts,
                                     limit=limit,
                                     marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+                                    page_reverse=page_reverse,
+                                    child_fields=self._network_child_fields)
 
     def get_networks_count(self, context, filters=None):
         return self._get_collection_count(context, models_v2.Network,
                                           filters=filters)
 
+    def get_networks_revision(self, context, filters=None):
+        return self._get_collection_revision(context, models_v2.Network,
+                                             filters=filters)
+
     def create_subnet_bulk(self, context, subnets):
         return self._create_bulk('subnet', context, subnets)
 
@@ -1294,14 +1646,81 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                     sorts=sorts,
                                     limit=limit,
                                     marker_obj=marker_obj,
-                                    page_reverse=page_reverse)
+                                    page_reverse=page_reverse,
+                                    child_fields=self._subnet_child_fields)
 
     def get_subnets_count(self, context, filters=None):
         return self._get_collection_count(context, models_v2.Subnet,
                                           filters=filters)
 
+    def get_subnets_revision(self, context, filters=None):
+        return self._get_collection_revision(context, models_v2.Subnet,
+                                             filters=filters)
+
     def create_port_bulk(self, context, ports):
-        return self._create_bulk('port', context, ports)
+        if self._is_create_overridden('port', NeutronDbPluginV2):
+            return self._create_bulk('port', context, ports)
+        with context.session.begin(subtransactions=True):
+            return self._create_ports_bulk(context, ports['ports'])
+
+    def _create_ports_bulk(self, context, ports):
+        """Create the database records of several ports.
+
+        Ports requesting neither a MAC address nor fixed IPs are created
+        together: their MAC addresses and IP addresses are generated in
+        batches for each network, and rows are inserted with a single
+        statement per table. Other ports are created one at a time, before
+        the batches. Return the port dicts, without extensions, in the
+        order of the request.
+        """
+        results = [None] * len(ports)
+        batches = {}
+        for index, port in enumerate(ports):
+            p = port['port']
+            if (p['mac_address'] is attributes.ATTR_NOT_SPECIFIED and
+                    p['fixed_ips'] is attributes.ATTR_NOT_SPECIFIED):
+                batches.setdefault(p['network_id'], []).append(index)
+            else:
+                results[index] = NeutronDbPluginV2.create_port(self, context,
+                                                               port)
+        port_rows = []
+        ip_rows = []
+        for network_id, indexes in batches.iteritems():
+            # Raise if the network does not exist
+            self._get_network(context, network_id)
+            macs = self._generate_macs(context, network_id, len(indexes))
+            version_ips = [self._generate_ips(context, subnets, len(indexes))
+                           for subnets in self._get_subnets_by_ip_version(
+                               context, network_id) if subnets]
+            for i, index in enumerate(indexes):
+                p = ports[index]['port']
+                tenant_id = self._get_tenant_id_for_create(context, p)
+                port_row = {'tenant_id': tenant_id,
+                            'id': p.get('id') or uuidutils.generate_uuid(),
+                            'name': p['name'],
+                            'network_id': network_id,
+                            'mac_address': macs[i],
+                            'admin_state_up': p['admin_state_up'],
+                            'status': p.get('status',
+                                            constants.PORT_STATUS_ACTIVE),
+                            'device_id': p['device_id'],
+                            'device_owner': p['device_owner']}
+                port_rows.append(port_row)
+                fixed_ips = [ips[i] for ips in version_ips]
+                ip_rows.extend(dict(ip, port_id=port_row['id'],
+                                    network_id=network_id)
+                               for ip in fixed_ips)
+                results[index] = dict(port_row, fixed_ips=fixed_ips)
+        if port_rows:
+            revision = models_v2.next_revision(context.session,
+                                               models_v2.Port)
+            context.session.execute(models_v2.Port.__table__.insert(),
+                                    [dict(row, revision=revision)
+                                     for row in port_rows])
+        if ip_rows:
+            context.session.execute(models_v2.IPAllocation.__table__.insert(),
+                                    ip_rows)
+        return results
 
     def create_port(self, context, port):
         p = port['port']
@@ -1473,6 +1892,9 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
         query = self._apply_filters_to_query(query, Port, filters)
         if limit and page_reverse and sorts:
             sorts = [(s[0], not s[1]) for s in sorts]
+        if isinstance(marker_obj, sqlalchemyutils.Marker) and sorts:
+            marker_obj = self._get_marker_values(context, Port, sorts,
+                                                 marker_obj)
         query = sqlalchemyutils.paginate_query(query, Port, limit,
                                                sorts, marker_obj)
         return query
@@ -1485,10 +1907,30 @@ class NeutronDbPluginV2(neutron_plugin_base_v2.NeutronPluginBaseV2,
                                       sorts=sorts, limit=limit,
                                       marker_obj=marker_obj,
                                       page_reverse=page_reverse)
-        items = [self._make_port_dict(c, fields) for c in query]
+        items = None
+        if fields:
+            items = self._get_collection_fields(context, query,
+                                                models_v2.Port, fields,
+                                                self._port_child_fields)
+        if items is None:
+            query = self._apply_eager_loads(query, models_v2.Port)
+            items = [self._make_port_dict(c, fields) for c in query]
         if limit and page_reverse:
             items.reverse()
         return items
 
     def get_ports_count(self, context, filters=None):
         return self._get_ports_query(context, filters).count()
+
+    def get_ports_revision(self, context, filters=None):
+        return self._get_query_revision(
+            self._get_ports_query(context, filters), models_v2.Port)
+
+
+# Subnets of networks, and DNS servers and host routes of subnets are not
+# eagerly loaded by the models
+CommonDbMixin.register_model_eager_loads(
+    models_v2.Network, [orm.subqueryload(models_v2.Network.subnets)])
+CommonDbMixin.register_model_eager_loads(
+    models_v2.Subnet, [orm.subqueryload(models_v2.Subnet.dns_nameservers),
+                       orm.subqueryload(models_v2.Subnet.routes)])
@@ -19,6 +19,9 @@ from sqlalchemy.orm import exc
 from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import utils
+from neutron.db import db_base_plugin_v2
+from neutron.db import models_v2
+from neutron.extensions import extra_dhcp_opt as edo_ext
 from neutron.extensions import portbindings
 from neutron import manager
 from neutron.openstack.common import log as logging
@@ -26,10 +29,85 @@ from neutron.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
 
+# Only the attributes consumed by the DHCP agent and its drivers are sent
+# back by get_active_networks_info.
+DHCP_PORT_FIELDS = ['id', 'network_id', 'mac_address', 'fixed_ips',
+                    'device_id', 'device_owner', edo_ext.EXTRADHCPOPTS]
+DHCP_SUBNET_FIELDS = ['id', 'network_id', 'cidr', 'ip_version', 'enable_dhcp',
+                      'gateway_ip', 'dns_nameservers', 'host_routes']
+
 
 class DhcpRpcCallbackMixin(object):
     """A mix-in that enable DHCP agent support in plugin implementations."""
 
+    def _group_by_network_id(self, res):
+        grouped = {}
+        for e in res:
+            grouped.setdefault(e['network_id'], []).append(e)
+        return grouped
+
+    def _has_db_get_ports(self, plugin):
+        """Return True if plugin lists ports as NeutronDbPluginV2 does."""
+        if not isinstance(plugin, db_base_plugin_v2.NeutronDbPluginV2):
+            return False
+        get_ports = db_base_plugin_v2.NeutronDbPluginV2.get_ports
+        return getattr(plugin.get_ports, 'im_func', None) is get_ports.im_func
+
+    def _get_dhcp_ports(self, context, plugin, network_ids):
+        """Return the ports of the given networks as seen by DHCP agents.
+
+        Plugins backed by the Neutron DB which do not override get_ports
+        are read with a few flat column queries instead of building full
+        port dicts; other plugins go through get_ports asking only for the
+        fields the agent uses.
+        """
+        if not self._has_db_get_ports(plugin):
+            return plugin.get_ports(context,
+                                    filters={'network_id': network_ids},
+                                    fields=DHCP_PORT_FIELDS)
+        if not network_ids:
+            return []
+
+        # The model query hooks registered for ports still apply
+        query = plugin._model_query(context, models_v2.Port).with_entities(
+            models_v2.Port.id, models_v2.Port.network_id,
+            models_v2.Port.mac_address, models_v2.Port.device_id,
+            models_v2.Port.device_owner)
+        query = query.filter(models_v2.Port.network_id.in_(network_ids))
+        ports = {}
+        for (port_id, network_id, mac_address,
+             device_id, device_owner) in query:
+            ports[port_id] = {'id': port_id,
+                              'network_id': network_id,
+                              'mac_address': mac_address,
+                              'device_id': device_id,
+                              'device_owner': device_owner,
+                              'fixed_ips': []}
+
+        query = context.session.query(models_v2.IPAllocation.port_id,
+                                      models_v2.IPAllocation.subnet_id,
+                                      models_v2.IPAllocation.ip_address)
+        query = query.filter(
+            models_v2.IPAllocation.network_id.in_(network_ids))
+        for port_id, subnet_id, ip_address in query:
+            port = ports.get(port_id)
+            if port:
+                port['fixed_ips'].append({'subnet_id': subnet_id,
+                                          'ip_address': ip_address})
+
+        if utils.is_extension_supported(plugin,
+                                        constants.EXTRA_DHCP_OPT_EXT_ALIAS):
+            for port in ports.itervalues():
+                port[edo_ext.EXTRADHCPOPTS] = []
+            opts = plugin.get_extra_dhcp_opts_by_network(context, network_ids)
+            for port_id, opt_name, opt_value in opts:
+                port = ports.get(port_id)
+                if port:
+                    port[edo_ext.EXTRADHCPOPTS].append(
+                        {'opt_name': opt_name, 'opt_value': opt_value})
+
+        return ports.values()
+
     def _get_active_networks(self, context, **kwargs):
         """Retrieve and return a list of the active networks."""
         host = kwargs.get('host')
@@ -59,18 +137,20 @@ class DhcpRpcCallbackMixin(object):
         """Returns all the networks/subnets/ports in system."""
         host = kwargs.get('host')
         LOG.debug(_('get_active_networks_info from %s'), host)
+        context.use_replica()
         networks = self._get_active_networks(context, **kwargs)
         plugin = manager.NeutronManager.get_plugin()
-        filters = {'network_id': [network['id'] for network in networks]}
-        ports = plugin.get_ports(context, filters=filters)
-        filters['enable_dhcp'] = [True]
-        subnets = plugin.get_subnets(context, filters=filters)
+        network_ids = [network['id'] for network in networks]
+        filters = {'network_id': network_ids, 'enable_dhcp': [True]}
+        grouped_subnets = self._group_by_network_id(
+            plugin.get_subnets(context, filters=filters,
+                               fields=DHCP_SUBNET_FIELDS))
+        grouped_ports = self._group_by_network_id(
+            self._get_dhcp_ports(context, plugin, network_ids))
 
         for network in networks:
-            network['subnets'] = [subnet for subnet in subnets
-                                  if subnet['network_id'] == network['id']]
-            network['ports'] = [port for port in ports
-                                if port['network_id'] == network['id']]
+            network['subnets'] = grouped_subnets.get(network['id'], [])
+            network['ports'] = grouped_ports.get(network['id'], [])
 
         return networks
 
@@ -45,6 +45,10 @@ class ExternalNetwork(model_base.BASEV2):
                             uselist=False, cascade='delete'))
 
 
+models_v2.register_revision_parent(ExternalNetwork, models_v2.Network,
+                                   'network_id')
+
+
 class External_net_db_mixin(object):
     """Mixin class to add external network methods to db_plugin_base_v2."""
 
@@ -52,6 +52,9 @@ class ExtraDhcpOpt(model_base.BASEV2, models_v2.HasId):
         backref=orm.backref("dhcp_opts", lazy='joined', cascade='delete'))
 
 
+models_v2.register_revision_parent(ExtraDhcpOpt, models_v2.Port, 'port_id')
+
+
 class ExtraDhcpOptMixin(object):
     """Mixin class to add extra options to the DHCP opts file
     and associate them to a port.
@@ -79,6 +82,15 @@ class ExtraDhcpOptMixin(object):
         return [{'opt_name': r.opt_name, 'opt_value': r.opt_value}
                 for r in binding]
 
+    def get_extra_dhcp_opts_by_network(self, context, network_ids):
+        """Return (port_id, opt_name, opt_value) tuples for the networks."""
+        query = context.session.query(ExtraDhcpOpt.port_id,
+                                      ExtraDhcpOpt.opt_name,
+                                      ExtraDhcpOpt.opt_value)
+        query = query.join(models_v2.Port,
+                           models_v2.Port.id == ExtraDhcpOpt.port_id)
+        return query.filter(models_v2.Port.network_id.in_(network_ids)).all()
+
     def _update_extra_dhcp_opts_on_port(self, context, id, port,
                                         updated_port=None):
         # It is not necessary to update in a transaction, because
@@ -247,5 +247,6 @@ class L3AgentSchedulerDbMixin(l3agentscheduler.L3AgentSchedulerPluginBase,
 
     def schedule_routers(self, context, routers):
         """Schedule the routers to l3 agents."""
-        for router in routers:
-            self.schedule_router(context, router)
+        if self.router_scheduler:
+            return self.router_scheduler.schedule_routers(
+                self, context, routers)
@@ -26,6 +26,7 @@ from neutron.api.rpc.agentnotifiers import l3_rpc_agent_api
 from neutron.api.v2 import attributes
 from neutron.common import constants as l3_constants
 from neutron.common import exceptions as q_exc
+from neutron.db import db_base_plugin_v2
 from neutron.db import model_base
 from neutron.db import models_v2
 from neutron.extensions import l3
@@ -49,7 +50,8 @@ EXTERNAL_GW_INFO = l3.EXTERNAL_GW_INFO
 API_TO_DB_COLUMN_MAP = {'port_id': 'fixed_port_id'}
 
 
-class Router(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
+class Router(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant,
+             models_v2.HasRevision):
     """Represents a v2 neutron router."""
 
     name = sa.Column(sa.String(255))
@@ -59,7 +61,8 @@ class Router(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
     gw_port = orm.relationship(models_v2.Port)
 
 
-class FloatingIP(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
+class FloatingIP(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant,
+                 models_v2.HasRevision):
     """Represents a floating IP address.
 
     This IP address may or may not be allocated to a tenant, and may or
@@ -80,6 +83,10 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
 
     l3_rpc_notifier = l3_rpc_agent_api.L3AgentNotify
 
+    # The gateway port is read when building router dicts
+    db_base_plugin_v2.CommonDbMixin.register_model_eager_loads(
+        Router, [orm.joinedload(Router.gw_port)])
+
     @property
     def _core_plugin(self):
         return manager.NeutronManager.get_plugin()
@@ -269,6 +276,10 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
         return self._get_collection_count(context, Router,
                                           filters=filters)
 
+    def get_routers_revision(self, context, filters=None):
+        return self._get_collection_revision(context, Router,
+                                             filters=filters)
+
     def _check_for_dup_router_subnet(self, context, router_id,
                                      network_id, subnet_id, subnet_cidr):
         try:
@@ -709,6 +720,10 @@ class L3_NAT_db_mixin(l3.RouterPluginBase):
         return self._get_collection_count(context, FloatingIP,
                                           filters=filters)
 
+    def get_floatingips_revision(self, context, filters=None):
+        return self._get_collection_revision(context, FloatingIP,
+                                             filters=filters)
+
     def prevent_l3_port_deletion(self, context, port_id):
         """Checks to make sure a port is allowed to be deleted.
 
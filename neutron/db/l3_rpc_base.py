@@ -42,6 +42,7 @@ class L3RpcCallbackMixin(object):
         router_ids = kwargs.get('router_ids')
         host = kwargs.get('host')
         context = neutron_context.get_admin_context()
+        context.use_replica()
         l3plugin = manager.NeutronManager.get_service_plugins()[
             plugin_constants.L3_ROUTER_NAT]
         if not l3plugin:
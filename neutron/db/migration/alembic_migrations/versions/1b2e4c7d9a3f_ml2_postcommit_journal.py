@@ -0,0 +1,62 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Journal of the ML2 asynchronous postcommit calls
+
+Revision ID: 1b2e4c7d9a3f
+Revises: 4a1fd0c5b7e3
+Create Date: 2013-11-12 15:41:08.527390
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '1b2e4c7d9a3f'
+down_revision = '4a1fd0c5b7e3'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = [
+    'neutron.plugins.ml2.plugin.Ml2Plugin'
+]
+
+from alembic import op
+import sqlalchemy as sa
+
+
+from neutron.db import migration
+
+
+def upgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    op.create_table(
+        'ml2_postcommit_journal',
+        sa.Column('id', sa.Integer(), nullable=False, autoincrement=True),
+        sa.Column('host', sa.String(length=255), nullable=False),
+        sa.Column('driver', sa.String(length=64), nullable=False),
+        sa.Column('method', sa.String(length=64), nullable=False),
+        sa.Column('context', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    op.drop_table('ml2_postcommit_journal')
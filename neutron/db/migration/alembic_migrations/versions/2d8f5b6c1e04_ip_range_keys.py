@@ -0,0 +1,76 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add a sortable key of the first IP to IP availability ranges
+
+Revision ID: 2d8f5b6c1e04
+Revises: 1b2e4c7d9a3f
+Create Date: 2013-11-19 09:27:51.208614
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2d8f5b6c1e04'
+down_revision = '1b2e4c7d9a3f'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = ['*']
+
+from alembic import op
+import netaddr
+import sqlalchemy as sa
+
+
+from neutron.db import migration
+
+
+def upgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    op.add_column('ipavailabilityranges',
+                  sa.Column('first_ip_key', sa.String(length=32),
+                            nullable=True))
+    ranges = sa.sql.table('ipavailabilityranges',
+                          sa.sql.column('allocation_pool_id', sa.String),
+                          sa.sql.column('first_ip', sa.String),
+                          sa.sql.column('last_ip', sa.String),
+                          sa.sql.column('first_ip_key', sa.String))
+    connection = op.get_bind()
+    for pool_id, first_ip, last_ip in connection.execute(
+            sa.select([ranges.c.allocation_pool_id, ranges.c.first_ip,
+                       ranges.c.last_ip])).fetchall():
+        op.execute(ranges.update().where(
+            (ranges.c.allocation_pool_id == pool_id) &
+            (ranges.c.first_ip == first_ip) &
+            (ranges.c.last_ip == last_ip)).values(
+                first_ip_key='%032x' % int(netaddr.IPAddress(first_ip))))
+    op.alter_column('ipavailabilityranges', 'first_ip_key',
+                    existing_type=sa.String(length=32), nullable=False)
+    op.create_index('ix_ipavailabilityranges_pool_first_ip_key',
+                    'ipavailabilityranges',
+                    ['allocation_pool_id', 'first_ip_key'])
+
+
+def downgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    op.drop_index('ix_ipavailabilityranges_pool_first_ip_key',
+                  'ipavailabilityranges')
+    op.drop_column('ipavailabilityranges', 'first_ip_key')
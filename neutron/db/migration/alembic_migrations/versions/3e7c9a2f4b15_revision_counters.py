@@ -0,0 +1,77 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+
+"""Add revision counters
+
+Revision ID: 3e7c9a2f4b15
+Revises: 2d8f5b6c1e04
+Create Date: 2013-11-21 14:03:12.518230
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3e7c9a2f4b15'
+down_revision = '2d8f5b6c1e04'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = ['*']
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import reflection
+
+
+from neutron.db import migration
+
+# Tables given a revision by 4a1fd0c5b7e3, the counters start above the
+# revisions already held by the existing ones
+TABLES = ['networks', 'subnets', 'ports', 'routers', 'floatingips',
+          'securitygroups', 'securitygrouprules']
+
+
+def upgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    inspector = reflection.Inspector.from_engine(op.get_bind())
+    existing = inspector.get_table_names()
+    op.create_table(
+        'revisioncounters',
+        sa.Column('table_name', sa.String(length=64), nullable=False),
+        sa.Column('revision', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('table_name'))
+    counters = sa.sql.table('revisioncounters',
+                            sa.sql.column('table_name', sa.String),
+                            sa.sql.column('revision', sa.BigInteger))
+    connection = op.get_bind()
+    for name in TABLES:
+        if name not in existing:
+            continue
+        table = sa.sql.table(name, sa.sql.column('revision', sa.BigInteger))
+        revision = connection.execute(
+            sa.select([sa.func.max(table.c.revision)])).scalar()
+        op.execute(counters.insert().values(table_name=name,
+                                            revision=revision or 0))
+
+
+def downgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    op.drop_table('revisioncounters')
@@ -0,0 +1,67 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+#
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add revision to networks, subnets, ports, routers and security groups
+
+Revision ID: 4a1fd0c5b7e3
+Revises: havana
+Create Date: 2013-11-04 10:12:45.381223
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a1fd0c5b7e3'
+down_revision = 'havana'
+
+# Change to ['*'] if this migration applies to all plugins
+
+migration_for_plugins = ['*']
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import reflection
+
+
+from neutron.db import migration
+
+# Routers and security groups are only created for some plugins, the
+# column is added to the tables which exist
+TABLES = ['networks', 'subnets', 'ports', 'routers', 'floatingips',
+          'securitygroups', 'securitygrouprules']
+
+
+def _existing_tables():
+    inspector = reflection.Inspector.from_engine(op.get_bind())
+    existing = inspector.get_table_names()
+    return [table for table in TABLES if table in existing]
+
+
+def upgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    for table in _existing_tables():
+        op.add_column(table, sa.Column('revision', sa.BigInteger(),
+                                       nullable=False, server_default='0'))
+
+
+def downgrade(active_plugins=None, options=None):
+    if not migration.should_run(active_plugins, migration_for_plugins):
+        return
+
+    for table in _existing_tables():
+        op.drop_column(table, 'revision')
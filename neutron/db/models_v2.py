@@ -15,8 +15,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import netaddr
 import sqlalchemy as sa
+from sqlalchemy import event
 from sqlalchemy import orm
+from sqlalchemy.orm import util as orm_util
 
 from neutron.db import model_base
 from neutron.openstack.common import uuidutils
@@ -37,6 +40,23 @@ class HasId(object):
                    default=uuidutils.generate_uuid)
 
 
+class HasRevision(object):
+    """Revision mixin, add to subclasses whose changes are tracked.
+
+    The revision is increased every time the object, or one of the child
+    objects registered with register_revision_parent(), is changed. Values
+    come from the counter of the table kept by next_revision(), so that a
+    collection changes its highest revision whenever one of its objects is
+    updated.
+
+    Only changes flushed by the ORM are tracked. Rows inserted or updated
+    with Core statements or bulk Query.update() calls must set their
+    revision to next_revision() themselves.
+    """
+
+    revision = sa.Column(sa.BigInteger, nullable=False, server_default='0')
+
+
 class HasStatusDescription(object):
     """Status with description mixin."""
 
@@ -44,6 +64,11 @@ class HasStatusDescription(object):
     status_description = sa.Column(sa.String(255))
 
 
+def ip_sort_key(ip_address):
+    """Return a string which sorts like the IP address among its version."""
+    return '%032x' % int(netaddr.IPAddress(ip_address))
+
+
 class IPAvailabilityRange(model_base.BASEV2):
     """Internal representation of available IPs for Neutron subnets.
 
@@ -54,6 +79,8 @@ class IPAvailabilityRange(model_base.BASEV2):
     only done if the range is contiguous. If not, the first_ip will be
     the same as the last_ip. When adjacent ips are recycled the ranges
     will be merged.
+    first_ip_key sorts like first_ip (see ip_sort_key), so that the range
+    holding an IP address is found with an index lookup.
     """
 
     allocation_pool_id = sa.Column(sa.String(36),
@@ -63,6 +90,14 @@ class IPAvailabilityRange(model_base.BASEV2):
                                    primary_key=True)
     first_ip = sa.Column(sa.String(64), nullable=False, primary_key=True)
     last_ip = sa.Column(sa.String(64), nullable=False, primary_key=True)
+    first_ip_key = sa.Column(sa.String(32), nullable=False)
+    __table_args__ = (sa.Index('ix_ipavailabilityranges_pool_first_ip_key',
+                               'allocation_pool_id', 'first_ip_key'),)
+
+    @orm.validates('first_ip')
+    def _set_first_ip_key(self, key, value):
+        self.first_ip_key = ip_sort_key(value)
+        return value
 
     def __repr__(self):
         return "%s - %s" % (self.first_ip, self.last_ip)
@@ -116,7 +151,7 @@ class SubnetRoute(model_base.BASEV2, Route):
                           primary_key=True)
 
 
-class Port(model_base.BASEV2, HasId, HasTenant):
+class Port(model_base.BASEV2, HasId, HasTenant, HasRevision):
     """Represents a port on a Neutron v2 network."""
 
     name = sa.Column(sa.String(255))
@@ -140,7 +175,7 @@ class DNSNameServer(model_base.BASEV2):
                           primary_key=True)
 
 
-class Subnet(model_base.BASEV2, HasId, HasTenant):
+class Subnet(model_base.BASEV2, HasId, HasTenant, HasRevision):
     """Represents a neutron subnet.
 
     When a subnet is created the first and last entries will be created. These
@@ -166,7 +201,7 @@ class Subnet(model_base.BASEV2, HasId, HasTenant):
     shared = sa.Column(sa.Boolean)
 
 
-class Network(model_base.BASEV2, HasId, HasTenant):
+class Network(model_base.BASEV2, HasId, HasTenant, HasRevision):
     """Represents a v2 neutron network."""
 
     name = sa.Column(sa.String(255))
@@ -175,3 +210,100 @@ class Network(model_base.BASEV2, HasId, HasTenant):
     status = sa.Column(sa.String(16))
     admin_state_up = sa.Column(sa.Boolean)
     shared = sa.Column(sa.Boolean)
+
+
+# Maps child models to the (parent model, parent id attribute) pairs whose
+# revision is increased when a child object is changed
+_revision_parents = {}
+
+
+def register_revision_parent(model, parent_model, parent_id_attr):
+    """Increase the revision of a parent when objects of model change.
+
+    parent_id_attr is the name of the attribute of model holding the id of
+    the parent object, which must have a revision.
+    """
+    _revision_parents.setdefault(model, []).append(
+        (parent_model, parent_id_attr))
+
+
+class RevisionCounter(model_base.BASEV2):
+    """Represents the last revision given to the objects of a table."""
+
+    table_name = sa.Column(sa.String(64), primary_key=True)
+    revision = sa.Column(sa.BigInteger, nullable=False)
+
+
+def next_revision(session, model):
+    """Return a revision above all the revisions given to objects of model.
+
+    The counter row of the table is incremented by the database and stays
+    locked until the transaction ends, so revisions increase in the order
+    transactions commit whatever the clocks of the servers say.
+    """
+    counters = RevisionCounter.__table__
+    table = model.__table__
+    counter = counters.c.table_name == table.name
+    if not session.execute(counters.update().where(counter).values(
+            revision=counters.c.revision + 1)).rowcount:
+        # The migration creates the counters of the existing tables, the
+        # counter of a new table starts above the revisions it may hold
+        revision = session.execute(
+            sa.select([sa.func.max(table.c.revision)])).scalar()
+        session.execute(counters.insert().values(
+            table_name=table.name, revision=(revision or 0) + 1))
+    return session.execute(
+        sa.select([counters.c.revision]).where(counter)).scalar()
+
+
+def _flush_revision(session, model, revisions):
+    # Objects of a table changed by the same flush share one revision
+    name = model.__table__.name
+    if name not in revisions:
+        revisions[name] = next_revision(session, model)
+    return revisions[name]
+
+
+def _bump_parent_revisions(session, obj, bumped, revisions):
+    for parent_model, parent_id_attr in _revision_parents.get(type(obj), []):
+        parent_id = getattr(obj, parent_id_attr)
+        if not parent_id or (parent_model, parent_id) in bumped:
+            continue
+        bumped.add((parent_model, parent_id))
+        key = orm_util.identity_key(parent_model, parent_id)
+        parent = session.identity_map.get(key)
+        if parent is None and parent_model in _revision_parents:
+            # The parent is loaded to find its own parents
+            parent = session.query(parent_model).get(parent_id)
+        if parent is None:
+            # The parent is not loaded, or is created by this flush in which
+            # case there is no row to update yet
+            table = parent_model.__table__
+            session.execute(table.update().where(
+                table.c.id == parent_id).values(
+                    revision=_flush_revision(session, parent_model,
+                                             revisions)))
+        elif parent not in session.deleted:
+            parent.revision = _flush_revision(session, parent_model,
+                                              revisions)
+            _bump_parent_revisions(session, parent, bumped, revisions)
+
+
+@event.listens_for(orm.Session, 'before_flush')
+def _update_revisions(session, flush_context, instances):
+    changed = list(session.new) + list(session.deleted)
+    changed.extend(obj for obj in session.dirty
+                   if session.is_modified(obj, passive=True))
+    bumped = set()
+    revisions = {}
+    for obj in changed:
+        if isinstance(obj, HasRevision) and obj not in session.deleted:
+            obj.revision = _flush_revision(session, type(obj), revisions)
+    for obj in changed:
+        _bump_parent_revisions(session, obj, bumped, revisions)
+
+
+register_revision_parent(IPAllocation, Port, 'port_id')
+register_revision_parent(SubnetRoute, Subnet, 'subnet_id')
+register_revision_parent(DNSNameServer, Subnet, 'subnet_id')
+register_revision_parent(Subnet, Network, 'network_id')
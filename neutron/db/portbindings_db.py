@@ -39,6 +39,9 @@ class PortBindingPort(model_base.BASEV2):
                             cascade='delete'))
 
 
+models_v2.register_revision_parent(PortBindingPort, models_v2.Port, 'port_id')
+
+
 class PortBindingMixin(portbindings_base.PortBindingBaseMixin):
     extra_binding_dict = None
 
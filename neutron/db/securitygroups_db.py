@@ -36,7 +36,8 @@ IP_PROTOCOL_MAP = {constants.PROTO_NAME_TCP: constants.PROTO_NUM_TCP,
                    constants.PROTO_NAME_ICMP_V6: constants.PROTO_NUM_ICMP_V6}
 
 
-class SecurityGroup(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
+class SecurityGroup(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant,
+                    models_v2.HasRevision):
     """Represents a v2 neutron security group."""
 
     name = sa.Column(sa.String(255))
@@ -63,7 +64,7 @@ class SecurityGroupPortBinding(model_base.BASEV2):
 
 
 class SecurityGroupRule(model_base.BASEV2, models_v2.HasId,
-                        models_v2.HasTenant):
+                        models_v2.HasTenant, models_v2.HasRevision):
     """Represents a v2 neutron security group rule."""
 
     security_group_id = sa.Column(sa.String(36),
@@ -93,11 +94,21 @@ class SecurityGroupRule(model_base.BASEV2, models_v2.HasId,
         primaryjoin="SecurityGroup.id==SecurityGroupRule.remote_group_id")
 
 
+models_v2.register_revision_parent(SecurityGroupPortBinding, models_v2.Port,
+                                   'port_id')
+models_v2.register_revision_parent(SecurityGroupRule, SecurityGroup,
+                                   'security_group_id')
+
+
 class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
     """Mixin class to add security group to db_plugin_base_v2."""
 
     __native_bulk_support = True
 
+    # Rules are read when building security group dicts
+    db_base_plugin_v2.CommonDbMixin.register_model_eager_loads(
+        SecurityGroup, [orm.subqueryload('rules')])
+
     def create_security_group_bulk(self, context, security_group_rule):
         return self._create_bulk('security_group', context,
                                  security_group_rule)
@@ -165,6 +176,10 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
         return self._get_collection_count(context, SecurityGroup,
                                           filters=filters)
 
+    def get_security_groups_revision(self, context, filters=None):
+        return self._get_collection_revision(context, SecurityGroup,
+                                             filters=filters)
+
     def get_security_group(self, context, id, fields=None, tenant_id=None):
         """Tenant id is given to handle the case when creating a security
         group rule on behalf of another use.
@@ -416,6 +431,10 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
         return self._get_collection_count(context, SecurityGroupRule,
                                           filters=filters)
 
+    def get_security_group_rules_revision(self, context, filters=None):
+        return self._get_collection_revision(context, SecurityGroupRule,
+                                             filters=filters)
+
     def get_security_group_rule(self, context, id, fields=None):
         security_group_rule = self._get_security_group_rule(context, id)
         return self._make_security_group_rule_dict(security_group_rule, fields)
@@ -463,16 +482,20 @@ class SecurityGroupDbMixin(ext_sg.SecurityGroupPluginBase):
         :returns: the default security group id.
         """
         filters = {'name': ['default'], 'tenant_id': [tenant_id]}
-        default_group = self.get_security_groups(context, filters,
-                                                 default_sg=True)
-        if not default_group:
-            security_group = {'security_group': {'name': 'default',
-                                                 'tenant_id': tenant_id,
-                                                 'description': 'default'}}
-            ret = self.create_security_group(context, security_group, True)
-            return ret['id']
-        else:
-            return default_group[0]['id']
+        # The lookup is part of the transaction so that it is not made on a
+        # replica database lagging behind
+        with context.session.begin(subtransactions=True):
+            default_group = self.get_security_groups(context, filters,
+                                                     default_sg=True)
+            if not default_group:
+                security_group = {'security_group': {'name': 'default',
+                                                     'tenant_id': tenant_id,
+                                                     'description': 'default'}}
+                ret = self.create_security_group(context, security_group,
+                                                 True)
+                return ret['id']
+            else:
+                return default_group[0]['id']
 
     def _get_security_groups_on_port(self, context, port):
         """Check that all security groups on port belong to tenant.
@@ -136,6 +136,7 @@ class SecurityGroupServerRpcCallbackMixin(object):
         :returns: port correspond to the devices with security group rules
         """
         devices = kwargs.get('devices')
+        context.use_replica()
 
         ports = {}
         for device in devices:
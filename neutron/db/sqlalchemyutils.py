@@ -24,6 +24,27 @@ from neutron.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
 
+# Database backends able to compare row values, as in (k1, k2) > (X1, X2)
+ROW_VALUE_DIALECTS = ('mysql', 'postgresql')
+
+
+class Marker(object):
+    """The last item of the previous page, known by its id only.
+
+    CommonDbMixin reads the values of the sort keys of such a marker with a
+    query scoped like the listing, rather than loading the marker object
+    with its relationships.
+    """
+
+    def __init__(self, id, resource):
+        self.id = id
+        self.resource = resource
+
+
+def _supports_row_values(query):
+    bind = query.session.bind
+    return bind is not None and bind.dialect.name in ROW_VALUE_DIALECTS
+
 
 def paginate_query(query, model, limit, sorts, marker_obj=None):
     """Returns a query with sorting / pagination criteria added.
@@ -41,17 +62,21 @@ def paginate_query(query, model, limit, sorts, marker_obj=None):
 
     We also have to cope with different sort directions.
 
+    When all the keys are sorted in the same direction and the database
+    supports it, a single row value comparison is used instead:
+    (k1, k2, k3) > (X1, X2, X3)
+
     Typically, the id of the last row is used as the client-facing pagination
-    marker, then the actual marker object must be fetched from the db and
-    passed in to us as marker.
+    marker, then the actual marker object, or a row holding the values of its
+    sort keys, must be fetched from the db and passed in to us as marker.
 
     :param query: the query object to which we should add paging/sorting
     :param model: the ORM model class
     :param limit: maximum number of items to return
     :param sorts: array of attributes and direction by which results should
                  be sorted
-    :param marker: the last item of the previous page; we returns the next
-                    results after this value.
+    :param marker_obj: the last item of the previous page; we returns the
+                       next results after this value.
     :rtype: sqlalchemy.orm.query.Query
     :return: The query with sorting/pagination added.
     """
@@ -85,21 +110,31 @@ def paginate_query(query, model, limit, sorts, marker_obj=None):
     if marker_obj:
         marker_values = [getattr(marker_obj, sort[0]) for sort in sorts]
 
-        # Build up an array of sort criteria as in the docstring
-        criteria_list = []
-        for i, sort in enumerate(sorts):
-            crit_attrs = [(getattr(model, sorts[j][0]) == marker_values[j])
-                          for j in xrange(i)]
-            model_attr = getattr(model, sort[0])
-            if sort[1]:
-                crit_attrs.append((model_attr > marker_values[i]))
+        if (len(sorts) > 1 and len(set(sort[1] for sort in sorts)) == 1 and
+                _supports_row_values(query)):
+            keys = sqlalchemy.tuple_(*[getattr(model, sort[0])
+                                       for sort in sorts])
+            values = sqlalchemy.tuple_(*marker_values)
+            if sorts[0][1]:
+                f = keys > values
             else:
-                crit_attrs.append((model_attr < marker_values[i]))
-
-            criteria = sqlalchemy.sql.and_(*crit_attrs)
-            criteria_list.append(criteria)
-
-        f = sqlalchemy.sql.or_(*criteria_list)
+                f = keys < values
+        else:
+            # Build up an array of sort criteria as in the docstring
+            criteria_list = []
+            for i, sort in enumerate(sorts):
+                crit_attrs = [(getattr(model, sorts[j][0]) ==
+                               marker_values[j]) for j in xrange(i)]
+                model_attr = getattr(model, sort[0])
+                if sort[1]:
+                    crit_attrs.append((model_attr > marker_values[i]))
+                else:
+                    crit_attrs.append((model_attr < marker_values[i]))
+
+                criteria = sqlalchemy.sql.and_(*crit_attrs)
+                criteria_list.append(criteria)
+
+            f = sqlalchemy.sql.or_(*criteria_list)
         query = query.filter(f)
 
     if limit:
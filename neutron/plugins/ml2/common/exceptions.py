@@ -21,3 +21,9 @@ from neutron.common import exceptions
 class MechanismDriverError(exceptions.NeutronException):
     """Mechanism driver call failed."""
     message = _("%(method)s failed.")
+
+
+class AsynchronousPortBinding(exceptions.NeutronException):
+    """Port binding attempted by an asynchronous postcommit call."""
+    message = _("Port %(port_id)s cannot be bound by an asynchronous "
+                "postcommit call, ports are bound by bind_port.")
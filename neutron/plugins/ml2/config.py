@@ -30,6 +30,25 @@ ml2_opts = [
                 help=_("An ordered list of networking mechanism driver "
                        "entrypoints to be loaded from the "
                        "neutron.ml2.mechanism_drivers namespace.")),
+    cfg.ListOpt('async_postcommit_drivers',
+                default=[],
+                help=_("List of mechanism drivers whose postcommit calls "
+                       "are run asynchronously, after the API request "
+                       "returns, in order for the resources of each "
+                       "network.")),
+    cfg.IntOpt('postcommit_workers',
+               default=4,
+               help=_("Number of concurrent asynchronous postcommit calls "
+                      "for each mechanism driver.")),
+    cfg.IntOpt('postcommit_max_retries',
+               default=5,
+               help=_("Number of times a failed asynchronous postcommit "
+                      "call is retried before it is dropped.")),
+    cfg.FloatOpt('postcommit_retry_interval',
+                 default=1,
+                 help=_("Seconds to wait before retrying a failed "
+                        "asynchronous postcommit call, doubled after each "
+                        "retry.")),
 ]
 
 
@@ -13,9 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import sqlalchemy as sa
 from sqlalchemy.orm import exc
 
 from neutron.db import api as db_api
+from neutron.db import db_base_plugin_v2
 from neutron.db import models_v2
 from neutron.db import securitygroups_db as sg_db
 from neutron.extensions import portbindings
@@ -49,15 +51,38 @@ def add_network_segment(session, network_id, segment):
               'network_id': record.network_id})
 
 
+def _make_segment_dict(record):
+    return {api.ID: record.id,
+            api.NETWORK_TYPE: record.network_type,
+            api.PHYSICAL_NETWORK: record.physical_network,
+            api.SEGMENTATION_ID: record.segmentation_id}
+
+
 def get_network_segments(session, network_id):
     with session.begin(subtransactions=True):
         records = (session.query(models.NetworkSegment).
                    filter_by(network_id=network_id))
-        return [{api.ID: record.id,
-                 api.NETWORK_TYPE: record.network_type,
-                 api.PHYSICAL_NETWORK: record.physical_network,
-                 api.SEGMENTATION_ID: record.segmentation_id}
-                for record in records]
+        return [_make_segment_dict(record) for record in records]
+
+
+def get_networks_segments(session, network_ids):
+    """Return the segments of several networks by network id.
+
+    The segments are read with one query for each
+    MAX_IDS_PER_QUERY networks rather than one query for each network.
+    """
+    segments = dict((network_id, []) for network_id in network_ids)
+    network_ids = list(segments)
+    with session.begin(subtransactions=True):
+        for i in xrange(0, len(network_ids),
+                        db_base_plugin_v2.MAX_IDS_PER_QUERY):
+            chunk = network_ids[i:i + db_base_plugin_v2.MAX_IDS_PER_QUERY]
+            records = (session.query(models.NetworkSegment).
+                       filter(models.NetworkSegment.network_id.in_(chunk)))
+            for record in records:
+                segments[record.network_id].append(
+                    _make_segment_dict(record))
+    return segments
 
 
 def ensure_port_binding(session, port_id):
@@ -93,6 +118,78 @@ def get_port(session, port_id):
             return
 
 
+def _port_id_filter(port_ids):
+    # The devices of some agents are named after truncated port ids
+    full_ids = [port_id for port_id in port_ids if len(port_id) == 36]
+    criteria = [models_v2.Port.id.startswith(port_id)
+                for port_id in port_ids if len(port_id) != 36]
+    if full_ids:
+        criteria.append(models_v2.Port.id.in_(full_ids))
+    return sa.or_(*criteria)
+
+
+def get_ports_status(session, port_ids):
+    """Get the status of ports for update within transaction.
+
+    Only the id, network_id, device_owner, status and binding host of
+    the ports are read, with two queries for each MAX_IDS_PER_QUERY port
+    ids. The port ids may be truncated. The ports are locked, but not their
+    bindings, which are read separately as PostgreSQL does not lock the
+    rows of outer joined tables.
+    """
+    ports = []
+    with session.begin(subtransactions=True):
+        for i in xrange(0, len(port_ids),
+                        db_base_plugin_v2.MAX_IDS_PER_QUERY):
+            chunk = port_ids[i:i + db_base_plugin_v2.MAX_IDS_PER_QUERY]
+            query = (session.query(models_v2.Port.id,
+                                   models_v2.Port.network_id,
+                                   models_v2.Port.device_owner,
+                                   models_v2.Port.status).
+                     filter(_port_id_filter(chunk)).
+                     with_lockmode('update'))
+            chunk_ports = [{'id': port_id,
+                            'network_id': network_id,
+                            'device_owner': device_owner,
+                            'status': status,
+                            'host': None}
+                           for port_id, network_id, device_owner, status
+                           in query]
+            if not chunk_ports:
+                continue
+            hosts = dict(session.query(models.PortBinding.port_id,
+                                       models.PortBinding.host).
+                         filter(models.PortBinding.port_id.in_(
+                             [port['id'] for port in chunk_ports])))
+            for port in chunk_ports:
+                port['host'] = hosts.get(port['id'])
+            ports.extend(chunk_ports)
+    return ports
+
+
+def update_ports_status(session, port_ids, status):
+    """Set the status of ports which do not have it already.
+
+    A single conditional UPDATE statement is issued for each
+    MAX_IDS_PER_QUERY ports, which also sets the revision of the ports
+    since the statement bypasses the ORM. Returns the number of updated
+    ports.
+    """
+    updated = 0
+    with session.begin(subtransactions=True):
+        if port_ids:
+            revision = models_v2.next_revision(session, models_v2.Port)
+        for i in xrange(0, len(port_ids),
+                        db_base_plugin_v2.MAX_IDS_PER_QUERY):
+            chunk = port_ids[i:i + db_base_plugin_v2.MAX_IDS_PER_QUERY]
+            updated += (session.query(models_v2.Port).
+                        filter(models_v2.Port.id.in_(chunk),
+                               models_v2.Port.status != status).
+                        update({'status': status, 'revision': revision},
+                               synchronize_session=False))
+    return updated
+
+
 def get_port_and_sgs(port_id):
     """Get port from database with security group info."""
 
@@ -133,3 +230,26 @@ def get_port_binding_host(port_id):
                       {'port_id': port_id})
             return
     return query.host
+
+
+def add_postcommit_job(session, host, driver, method, context):
+    with session.begin(subtransactions=True):
+        record = models.PostcommitJournal(host=host, driver=driver,
+                                          method=method, context=context)
+        session.add(record)
+    return record.id
+
+
+def delete_postcommit_job(session, job_id):
+    with session.begin(subtransactions=True):
+        (session.query(models.PostcommitJournal).
+         filter_by(id=job_id).
+         delete())
+
+
+def get_postcommit_jobs(session, host):
+    with session.begin(subtransactions=True):
+        return (session.query(models.PostcommitJournal).
+                filter_by(host=host).
+                order_by(models.PostcommitJournal.id).
+                all())
@@ -262,6 +262,33 @@ class PortContext(object):
         pass
 
 
+class PortStatusContext(object):
+    """Context passed to MechanismDrivers for changes to port status.
+
+    A PortStatusContext instance is passed instead of a PortContext to
+    the MechanismDrivers supporting port status changes when only the
+    status of a port is changed, typically by an L2 agent wiring or
+    unwiring the port. Only the few port attributes identifying the
+    port are loaded.
+    """
+
+    __metaclass__ = ABCMeta
+
+    @abstractproperty
+    def current(self):
+        """Return the current state of the port.
+
+        Return a dictionary with the id, network_id, device_owner and
+        the new status of the port.
+        """
+        pass
+
+    @abstractproperty
+    def original_status(self):
+        """Return the status of the port prior to the change."""
+        pass
+
+
 class MechanismDriver(object):
     """Define stable abstract interface for ML2 mechanism drivers.
 
@@ -281,10 +308,16 @@ class MechanismDriver(object):
     Because rollback outside of the transaction is not done in the
     update network/port case, all data validation must be done within
     methods that are part of the database transaction.
+
+    Drivers setting supports_port_status are called with
+    update_port_status_postcommit instead of update_port_precommit and
+    update_port_postcommit when only the status of a port changes.
     """
 
     __metaclass__ = ABCMeta
 
+    supports_port_status = False
+
     @abstractmethod
     def initialize(self):
         """Perform driver initialization.
@@ -534,6 +567,19 @@ class MechanismDriver(object):
         """
         pass
 
+    def update_port_status_postcommit(self, context):
+        """Notify of a change of the status of a port.
+
+        :param context: PortStatusContext instance describing the port
+        and its new status, as well as its status prior to the change.
+
+        Called after the transaction completes, only if the driver
+        sets supports_port_status. Call can block, though will block
+        the entire process so care should be taken to not drastically
+        affect performance.
+        """
+        pass
+
     def delete_port_precommit(self, context):
         """Delete resources of a port.
 
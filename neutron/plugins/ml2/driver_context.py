@@ -112,3 +112,19 @@ class PortContext(MechanismDriverContext, api.PortContext):
         self._binding.segment = segment_id
         self._binding.vif_type = vif_type
         self._binding.cap_port_filter = cap_port_filter
+
+
+class PortStatusContext(MechanismDriverContext, api.PortStatusContext):
+
+    def __init__(self, plugin, plugin_context, port, original_status):
+        super(PortStatusContext, self).__init__(plugin, plugin_context)
+        self._port = port
+        self._original_status = original_status
+
+    @property
+    def current(self):
+        return self._port
+
+    @property
+    def original_status(self):
+        return self._original_status
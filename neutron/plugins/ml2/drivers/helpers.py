@@ -0,0 +1,159 @@
+# Copyright (c) 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Free segmentation ID computation for the ML2 type drivers.
+
+Type drivers only store a row for each allocated segmentation ID. The free
+IDs of a pool are derived from its configured ranges and from the allocated
+IDs, without enumerating the ranges, so that the cost does not depend on the
+size of the ranges.
+"""
+
+import bisect
+import random
+
+from sqlalchemy.orm import util as orm_util
+
+from neutron.openstack.common.db import exception as db_exc
+from neutron.openstack.common import log
+
+LOG = log.getLogger(__name__)
+
+
+def merge_ranges(ranges):
+    """Return the sorted list of the disjoint (min, max) ranges covered."""
+    merged = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            if high > merged[-1][1]:
+                merged[-1] = (merged[-1][0], high)
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def in_ranges(ranges, segmentation_id):
+    return any(low <= segmentation_id <= high for low, high in ranges)
+
+
+def _split_allocated(ranges, allocated):
+    """Return the sorted allocated IDs of each range of merged ranges."""
+    allocated = sorted(set(allocated))
+    split = []
+    for low, high in ranges:
+        start = bisect.bisect_left(allocated, low)
+        end = bisect.bisect_right(allocated, high)
+        split.append(allocated[start:end])
+    return split
+
+
+class FreeIds(object):
+    """Free IDs of ranges of segmentation IDs.
+
+    :param ranges: list of inclusive (min, max) ranges, which may overlap
+    :param allocated: iterable of the allocated IDs, which may lie outside
+                      the ranges
+    """
+
+    def __init__(self, ranges, allocated):
+        self.ranges = merge_ranges(ranges)
+        self._allocated = _split_allocated(self.ranges, allocated)
+        self.count = sum(high - low + 1 - len(ids) for (low, high), ids
+                         in zip(self.ranges, self._allocated))
+
+    def get(self, index):
+        """Return the free ID at index, in increasing order of the IDs."""
+        for (low, high), ids in zip(self.ranges, self._allocated):
+            free = high - low + 1 - len(ids)
+            if index >= free:
+                index -= free
+                continue
+            segmentation_id = low + index
+            for allocated_id in ids:
+                if allocated_id > segmentation_id:
+                    break
+                segmentation_id += 1
+            return segmentation_id
+        raise IndexError(index)
+
+    def add_allocated(self, segmentation_id):
+        """Remove an ID from the free IDs."""
+        for (low, high), ids in zip(self.ranges, self._allocated):
+            if low <= segmentation_id <= high:
+                index = bisect.bisect_left(ids, segmentation_id)
+                if index == len(ids) or ids[index] != segmentation_id:
+                    ids.insert(index, segmentation_id)
+                    self.count -= 1
+                return
+
+
+def choose_free_id(pools):
+    """Pick a random free ID from several pools.
+
+    Picking at random rather than the lowest free ID keeps concurrent
+    allocations from contending for the same ID.
+
+    :param pools: dict of FreeIds by pool key
+    :returns: (key, segmentation_id) tuple, or None if no ID is free
+    """
+    total = sum(free.count for free in pools.itervalues())
+    if not total:
+        return
+    index = random.randrange(total)
+    for key in sorted(pools):
+        free = pools[key]
+        if index < free.count:
+            return key, free.get(index)
+        index -= free.count
+
+
+def add_allocation(session, allocation):
+    """Insert allocation in a savepoint.
+
+    The ID of the allocation may have been taken by a concurrent
+    transaction, in which case only the savepoint is rolled back. IDs whose
+    allocation is loaded in the session are not inserted again.
+
+    :returns: False if the ID was already allocated, True otherwise
+    """
+    if orm_util.identity_key(instance=allocation) in session.identity_map:
+        return False
+    try:
+        with session.begin_nested():
+            session.add(allocation)
+    except db_exc.DBDuplicateEntry:
+        return False
+    return True
+
+
+def allocate_free_id(session, pools, create_allocation):
+    """Allocate a random free ID from several pools.
+
+    Another free ID is tried when the chosen one is allocated concurrently.
+
+    :param pools: dict of FreeIds by pool key, updated with the IDs found
+                  to be allocated
+    :param create_allocation: callable returning the allocation model
+                              object of a pool key and ID
+    :returns: (key, segmentation_id) tuple, or None if no ID is free
+    """
+    while True:
+        choice = choose_free_id(pools)
+        if not choice or add_allocation(session, create_allocation(*choice)):
+            return choice
+        key, segmentation_id = choice
+        LOG.debug(_("Segmentation ID %s was allocated concurrently, "
+                    "choosing another one"), segmentation_id)
+        pools[key].add_allocated(segmentation_id)
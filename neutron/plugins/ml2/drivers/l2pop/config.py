@@ -24,6 +24,14 @@ l2_population_options = [
     cfg.IntOpt('agent_boot_time', default=180,
                help=_('Delay within which agent is expected to update '
                       'existing ports whent it restarts')),
+    cfg.FloatOpt('notify_interval', default=0,
+                 help=_('Seconds during which the FDB changes fanned out to '
+                        'the agents are accumulated and sent as one message, '
+                        '0 to send each change at once')),
+    cfg.IntOpt('fdb_cache_time', default=0,
+               help=_('Seconds during which the FDB entries of a network '
+                      'are cached and updated from the port changes handled '
+                      'by this server, 0 to query them each time')),
 ]
 
 cfg.CONF.register_opts(l2_population_options, "l2pop")
@@ -17,6 +17,8 @@
 # @author: Francois Eleouet, Orange
 # @author: Mathieu Rohon, Orange
 
+import time
+
 from oslo.config import cfg
 
 from neutron.common import constants as const
@@ -37,6 +39,9 @@ class L2populationMechanismDriver(api.MechanismDriver,
     def initialize(self):
         LOG.debug(_("Experimental L2 population driver"))
         self.rpc_ctx = n_context.get_admin_context_without_session()
+        # Network id -> (expiry time, {port id: (agent host, agent ip,
+        # port fdb entries)}) of the ports bound to an agent in the network
+        self._fdb_cache = {}
 
     def _get_port_fdb_entries(self, port):
         return [[port['mac_address'],
@@ -46,9 +51,57 @@ class L2populationMechanismDriver(api.MechanismDriver,
         self.remove_fdb_entries = self._update_port_down(context)
 
     def delete_port_postcommit(self, context):
+        port = context.current
+        network_fdb = self._get_cached_network_fdb(port['network_id'])
+        if network_fdb is not None:
+            network_fdb.pop(port['id'], None)
         l2pop_rpc.L2populationAgentNotify.remove_fdb_entries(
             self.rpc_ctx, self.remove_fdb_entries)
 
+    def delete_network_postcommit(self, context):
+        self._fdb_cache.pop(context.current['id'], None)
+
+    def _get_cached_network_fdb(self, network_id):
+        entry = self._fdb_cache.get(network_id)
+        if entry and entry[0] > time.time():
+            return entry[1]
+
+    def _get_network_fdb(self, session, network_id):
+        """Return the fdb entries of the ports of a network by port id.
+
+        With fdb_cache_time, the entries are cached and then updated from
+        the port changes instead of being queried again.
+        """
+        network_fdb = self._get_cached_network_fdb(network_id)
+        if network_fdb is not None:
+            return network_fdb
+        network_fdb = {}
+        for binding, agent in self.get_network_ports(session, network_id):
+            network_fdb[binding.port_id] = (
+                agent.host, self.get_agent_ip(agent),
+                self._get_port_fdb_entries(binding.port))
+        if cfg.CONF.l2pop.fdb_cache_time:
+            self._fdb_cache[network_id] = (
+                time.time() + cfg.CONF.l2pop.fdb_cache_time, network_fdb)
+        return network_fdb
+
+    def _update_fdb_cache(self, orig, port):
+        network_fdb = self._get_cached_network_fdb(port['network_id'])
+        if network_fdb is None or (
+            port['status'] == orig['status'] and
+            port['admin_state_up'] == orig['admin_state_up'] and
+            port['binding:host_id'] == orig['binding:host_id'] and
+            port['fixed_ips'] == orig['fixed_ips']):
+            return
+        network_fdb.pop(port['id'], None)
+        if not (port['admin_state_up'] and port['binding:host_id']):
+            return
+        agent = self.get_agent_by_host(db_api.get_session(),
+                                       port['binding:host_id'])
+        if agent:
+            network_fdb[port['id']] = (agent.host, self.get_agent_ip(agent),
+                                       self._get_port_fdb_entries(port))
+
     def _get_diff_ips(self, orig, port):
         orig_ips = set([ip['ip_address'] for ip in orig['fixed_ips']])
         port_ips = set([ip['ip_address'] for ip in port['fixed_ips']])
@@ -92,6 +145,8 @@ class L2populationMechanismDriver(api.MechanismDriver,
         port = context.current
         orig = context.original
 
+        self._update_fdb_cache(orig, port)
+
         if port['status'] == orig['status']:
             self._fixed_ips_changed(context, orig, port)
         elif port['status'] == const.PORT_STATUS_ACTIVE:
@@ -161,21 +216,19 @@ class L2populationMechanismDriver(api.MechanismDriver,
                                   'ports': {}}}
             ports = agent_fdb_entries[network_id]['ports']
 
-            network_ports = self.get_network_ports(session, network_id)
-            for network_port in network_ports:
-                binding, agent = network_port
-                if agent.host == agent_host:
+            network_fdb = self._get_network_fdb(session, network_id)
+            for host, ip, fdb_entries in network_fdb.itervalues():
+                if host == agent_host:
                     continue
 
-                ip = self.get_agent_ip(agent)
                 if not ip:
                     LOG.debug(_("Unable to retrieve the agent ip, check "
                                 "the agent %(agent_host)s configuration."),
-                              {'agent_host': agent.host})
+                              {'agent_host': host})
                     continue
 
                 agent_ports = ports.get(ip, [const.FLOODING_ENTRY])
-                agent_ports += self._get_port_fdb_entries(binding.port)
+                agent_ports += fdb_entries
                 ports[ip] = agent_ports
 
             # And notify other agents to add flooding entry
@@ -17,14 +17,33 @@
 # @author: Francois Eleouet, Orange
 # @author: Mathieu Rohon, Orange
 
+import copy
+
+import eventlet
+from oslo.config import cfg
+
 from neutron.common import topics
 from neutron.openstack.common import log as logging
 from neutron.openstack.common.rpc import proxy
+from neutron.plugins.ml2.drivers.l2pop import config  # noqa
 
 
 LOG = logging.getLogger(__name__)
 
 
+def merge_fdb_entries(fdb_entries, other_fdb_entries):
+    """Add to fdb_entries the entries of other_fdb_entries not in it."""
+    for network_id, other_network in other_fdb_entries.iteritems():
+        network = fdb_entries.setdefault(
+            network_id, {'segment_id': other_network['segment_id'],
+                         'network_type': other_network['network_type'],
+                         'ports': {}})
+        for agent_ip, other_entries in other_network['ports'].iteritems():
+            entries = network['ports'].setdefault(agent_ip, [])
+            entries.extend(entry for entry in other_entries
+                           if entry not in entries)
+
+
 class L2populationAgentNotifyAPI(proxy.RpcProxy):
     BASE_RPC_API_VERSION = '1.0'
 
@@ -35,6 +54,10 @@ class L2populationAgentNotifyAPI(proxy.RpcProxy):
         self.topic_l2pop_update = topics.get_topic_name(topic,
                                                         topics.L2POPULATION,
                                                         topics.UPDATE)
+        # Fanout FDB changes waiting to be sent, as [method, fdb_entries]
+        # in the order the changes were made
+        self._pending_fanouts = []
+        self._flush_scheduled = False
 
     def _notification_fanout(self, context, method, fdb_entries):
         LOG.debug(_('Fanout notify l2population agents at %(topic)s '
@@ -47,6 +70,32 @@ class L2populationAgentNotifyAPI(proxy.RpcProxy):
                          self.make_msg(method, fdb_entries=fdb_entries),
                          topic=self.topic_l2pop_update)
 
+    def _queue_fanout(self, context, method, fdb_entries):
+        """Accumulate the FDB changes of notify_interval in one message.
+
+        The changes are merged while consecutive changes have the same
+        method, so that the order of additions and removals is kept.
+        """
+        interval = cfg.CONF.l2pop.notify_interval
+        if not interval:
+            self._notification_fanout(context, method, fdb_entries)
+            return
+        if self._pending_fanouts and self._pending_fanouts[-1][0] == method:
+            merge_fdb_entries(self._pending_fanouts[-1][1], fdb_entries)
+        else:
+            self._pending_fanouts.append([method,
+                                          copy.deepcopy(fdb_entries)])
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            eventlet.spawn_after(interval, self.flush_fanouts, context)
+
+    def flush_fanouts(self, context):
+        """Send the accumulated FDB changes."""
+        pending, self._pending_fanouts = self._pending_fanouts, []
+        self._flush_scheduled = False
+        for method, fdb_entries in pending:
+            self._notification_fanout(context, method, fdb_entries)
+
     def _notification_host(self, context, method, fdb_entries, host):
         LOG.debug(_('Notify l2population agent %(host)s at %(topic)s the '
                     'message %(method)s with %(fdb_entries)s'),
@@ -64,8 +113,7 @@ class L2populationAgentNotifyAPI(proxy.RpcProxy):
                 self._notification_host(context, 'add_fdb_entries',
                                         fdb_entries, host)
             else:
-                self._notification_fanout(context, 'add_fdb_entries',
-                                          fdb_entries)
+                self._queue_fanout(context, 'add_fdb_entries', fdb_entries)
 
     def remove_fdb_entries(self, context, fdb_entries, host=None):
         if fdb_entries:
@@ -73,8 +121,7 @@ class L2populationAgentNotifyAPI(proxy.RpcProxy):
                 self._notification_host(context, 'remove_fdb_entries',
                                         fdb_entries, host)
             else:
-                self._notification_fanout(context, 'remove_fdb_entries',
-                                          fdb_entries)
+                self._queue_fanout(context, 'remove_fdb_entries', fdb_entries)
 
     def update_fdb_entries(self, context, fdb_entries, host=None):
         if fdb_entries:
@@ -82,6 +129,9 @@ class L2populationAgentNotifyAPI(proxy.RpcProxy):
                 self._notification_host(context, 'update_fdb_entries',
                                         fdb_entries, host)
             else:
+                # Changes of fixed IPs are not merged, the changes accumulated
+                # before are sent first
+                self.flush_fanouts(context)
                 self._notification_fanout(context, 'update_fdb_entries',
                                           fdb_entries)
 
@@ -37,6 +37,9 @@ class AgentMechanismDriverBase(api.MechanismDriver):
 
     __metaclass__ = ABCMeta
 
+    # The agents learn about port changes from the agent notifications
+    supports_port_status = True
+
     def __init__(self, agent_type, vif_type, cap_port_filter):
         """Initialize base class for specific L2 agent type.
 
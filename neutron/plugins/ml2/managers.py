@@ -23,6 +23,7 @@ from neutron.extensions import portbindings
 from neutron.openstack.common import log
 from neutron.plugins.ml2.common import exceptions as ml2_exc
 from neutron.plugins.ml2 import driver_api as api
+from neutron.plugins.ml2 import postcommit
 
 
 LOG = log.getLogger(__name__)
@@ -112,6 +113,9 @@ class MechanismManager(stevedore.named.NamedExtensionManager):
         # Ordered list of mechanism drivers, defining
         # the order in which the drivers are called.
         self.ordered_mech_drivers = []
+        # Queues of the asynchronous postcommit calls, keyed by the
+        # name of their mechanism driver.
+        self.postcommit_queues = {}
 
         LOG.info(_("Configured mechanism driver names: %s"),
                  cfg.CONF.ml2.mechanism_drivers)
@@ -131,29 +135,77 @@ class MechanismManager(stevedore.named.NamedExtensionManager):
         for ext in self:
             self.mech_drivers[ext.name] = ext
             self.ordered_mech_drivers.append(ext)
+        # Drivers notified of port status changes as such, and drivers
+        # seeing them as port updates
+        self.port_status_drivers = [
+            driver for driver in self.ordered_mech_drivers
+            if driver.obj.supports_port_status]
+        self.port_update_drivers = [
+            driver for driver in self.ordered_mech_drivers
+            if not driver.obj.supports_port_status]
         LOG.info(_("Registered mechanism drivers: %s"),
                  [driver.name for driver in self.ordered_mech_drivers])
 
-    def initialize(self):
+    def initialize(self, plugin):
+        """Initialize the mechanism drivers.
+
+        :param plugin: plugin given to the asynchronous postcommit calls
+        """
         for driver in self.ordered_mech_drivers:
             LOG.info(_("Initializing mechanism driver '%s'"), driver.name)
             driver.obj.initialize()
+        self._start_postcommit_queues(plugin)
+
+    def _start_postcommit_queues(self, plugin):
+        for name in cfg.CONF.ml2.async_postcommit_drivers:
+            driver = self.mech_drivers.get(name)
+            if not driver:
+                LOG.error(_("Asynchronous postcommit driver '%s' is not a "
+                            "registered mechanism driver"), name)
+                continue
+            self.postcommit_queues[name] = postcommit.PostcommitQueue(
+                driver, plugin, cfg.CONF.ml2.postcommit_workers,
+                cfg.CONF.ml2.postcommit_max_retries,
+                cfg.CONF.ml2.postcommit_retry_interval)
+        if self.postcommit_queues:
+            LOG.info(_("Asynchronous postcommit drivers: %s"),
+                     self.postcommit_queues.keys())
+            postcommit.recover(self.postcommit_queues)
+
+    def get_postcommit_stats(self):
+        """Return the backlog and latency of each asynchronous driver."""
+        return dict((name, postcommit_queue.get_stats())
+                    for name, postcommit_queue
+                    in self.postcommit_queues.iteritems())
 
     def _call_on_drivers(self, method_name, context,
-                         continue_on_failure=False):
+                         continue_on_failure=False, drivers=None):
         """Helper method for calling a method across all mechanism drivers.
 
+        The postcommit calls of the asynchronous mechanism drivers are
+        queued rather than made, so that their failures are not reported.
+
         :param method_name: name of the method to call
         :param context: context parameter to pass to each method call
         :param continue_on_failure: whether or not to continue to call
         all mechanism drivers once one has raised an exception
+        :param drivers: mechanism drivers to call, all by default
         :raises: neutron.plugins.ml2.common.MechanismDriverError
         if any mechanism driver call fails.
         """
         error = False
-        for driver in self.ordered_mech_drivers:
+        snapshot = None
+        if drivers is None:
+            drivers = self.ordered_mech_drivers
+        for driver in drivers:
+            postcommit_queue = self.postcommit_queues.get(driver.name)
             try:
-                getattr(driver.obj, method_name)(context)
+                if postcommit_queue and method_name.endswith('_postcommit'):
+                    if snapshot is None:
+                        snapshot = postcommit.snapshot_context(context)
+                    postcommit_queue.submit(method_name, snapshot)
+                else:
+                    getattr(driver.obj, method_name)(context)
             except Exception:
                 LOG.exception(
                     _("Mechanism driver '%(name)s' failed in %(method)s"),
@@ -394,6 +446,41 @@ class MechanismManager(stevedore.named.NamedExtensionManager):
         """
         self._call_on_drivers("update_port_postcommit", context)
 
+    def update_port_status_precommit(self, context):
+        """Notify mechanism drivers during a port status change.
+
+        :param context: PortContext of the port
+        :raises: neutron.plugins.ml2.common.MechanismDriverError
+        if any mechanism driver update_port_precommit call fails.
+
+        Only the mechanism drivers not supporting port status changes
+        are called, with update_port_precommit. Called within the
+        database transaction.
+        """
+        self._call_on_drivers("update_port_precommit", context,
+                              drivers=self.port_update_drivers)
+
+    def update_port_status_postcommit(self, status_context,
+                                      port_context=None):
+        """Notify all mechanism drivers after a port status change.
+
+        :param status_context: PortStatusContext of the port
+        :param port_context: PortContext of the port, required if some
+        mechanism drivers do not support port status changes
+        :raises: neutron.plugins.ml2.common.MechanismDriverError
+        if any mechanism driver call fails.
+
+        The mechanism drivers supporting port status changes are called
+        with update_port_status_postcommit, the others with
+        update_port_postcommit. Called after the database transaction.
+        """
+        self._call_on_drivers("update_port_status_postcommit",
+                              status_context,
+                              drivers=self.port_status_drivers)
+        if self.port_update_drivers:
+            self._call_on_drivers("update_port_postcommit", port_context,
+                                  drivers=self.port_update_drivers)
+
     def delete_port_precommit(self, context):
         """Notify all mechanism drivers during port deletion.
 
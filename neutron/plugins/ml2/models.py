@@ -67,3 +67,26 @@ class PortBinding(model_base.BASEV2):
         backref=orm.backref("port_binding",
                             lazy='joined', uselist=False,
                             cascade='delete'))
+
+
+class PostcommitJournal(model_base.BASEV2):
+    """Represent a pending asynchronous mechanism driver postcommit call.
+
+    The record is added when the call is queued and deleted once the
+    mechanism driver has completed it, so that the calls which remain
+    when neutron-server is stopped are run again on the same host.
+    """
+
+    __tablename__ = 'ml2_postcommit_journal'
+
+    id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+    host = sa.Column(sa.String(255), nullable=False)
+    driver = sa.Column(sa.String(64), nullable=False)
+    method = sa.Column(sa.String(64), nullable=False)
+    # Snapshot of the mechanism driver context, in JSON
+    context = sa.Column(sa.Text, nullable=False)
+
+
+models_v2.register_revision_parent(NetworkSegment, models_v2.Network,
+                                   'network_id')
+models_v2.register_revision_parent(PortBinding, models_v2.Port, 'port_id')
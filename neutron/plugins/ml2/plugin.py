@@ -101,7 +101,7 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         self.mechanism_manager = managers.MechanismManager()
         db.initialize()
         self.type_manager.initialize()
-        self.mechanism_manager.initialize()
+        self.mechanism_manager.initialize(self)
 
         self._setup_rpc()
 
@@ -174,9 +174,10 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             value = None
         return value
 
-    def _extend_network_dict_provider(self, context, network):
+    def _extend_network_dict_provider(self, context, network, segments=None):
         id = network['id']
-        segments = db.get_network_segments(context.session, id)
+        if segments is None:
+            segments = db.get_network_segments(context.session, id)
         if not segments:
             LOG.error(_("Network %s has no segments"), id)
             network[provider.NETWORK_TYPE] = None
@@ -194,9 +195,42 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             network[provider.PHYSICAL_NETWORK] = segment[api.PHYSICAL_NETWORK]
             network[provider.SEGMENTATION_ID] = segment[api.SEGMENTATION_ID]
 
-    def _filter_nets_provider(self, context, nets, filters):
-        # TODO(rkukura): Implement filtering.
-        return nets
+    def _ml2_network_result_filter_hook(self, query, filters):
+        # A network matches when one of its segments matches all the
+        # provider filters, which are applied in SQL so that paginated
+        # results are not shortened by filtering them afterwards.
+        segment_filters = [
+            (models.NetworkSegment.network_type,
+             filters.get(provider.NETWORK_TYPE)),
+            (models.NetworkSegment.physical_network,
+             filters.get(provider.PHYSICAL_NETWORK)),
+            (models.NetworkSegment.segmentation_id,
+             filters.get(provider.SEGMENTATION_ID))]
+        segment_filters = [column.in_(values)
+                           for column, values in segment_filters if values]
+        if not segment_filters:
+            return query
+        segments = (query.session.query(models.NetworkSegment.network_id).
+                    filter(*segment_filters))
+        return query.filter(models_v2.Network.id.in_(segments.subquery()))
+
+    def _get_collection_query(self, context, model, filters=None, **kwargs):
+        if model is models_v2.Network and filters and not context.is_admin:
+            # The provider attributes are only shown to admins, filtering
+            # on them would reveal them
+            filters = dict((key, value) for key, value in filters.iteritems()
+                           if key not in (provider.NETWORK_TYPE,
+                                          provider.PHYSICAL_NETWORK,
+                                          provider.SEGMENTATION_ID))
+        return super(Ml2Plugin, self)._get_collection_query(
+            context, model, filters=filters, **kwargs)
+
+    db_base_plugin_v2.NeutronDbPluginV2.register_model_query_hook(
+        models_v2.Network,
+        "ml2_network_segments",
+        None,
+        None,
+        '_ml2_network_result_filter_hook')
 
     def _process_port_binding(self, mech_context, attrs):
         binding = mech_context._binding
@@ -360,10 +394,12 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
             nets = super(Ml2Plugin,
                          self).get_networks(context, filters, None, sorts,
                                             limit, marker, page_reverse)
+            segments = db.get_networks_segments(
+                session, [net['id'] for net in nets])
             for net in nets:
-                self._extend_network_dict_provider(context, net)
+                self._extend_network_dict_provider(context, net,
+                                                   segments[net['id']])
 
-            nets = self._filter_nets_provider(context, nets, filters)
             nets = self._filter_nets_l3(context, nets, filters)
 
         return [self._fields(net, fields) for net in nets]
@@ -572,6 +608,58 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         self.notify_security_groups_member_updated(context, result)
         return result
 
+    def create_port_bulk(self, context, ports):
+        if self._is_create_overridden('port', Ml2Plugin):
+            return self._create_bulk('port', context, ports)
+        items = ports['ports']
+        sgids = []
+        dhcp_opts = []
+        mech_contexts = []
+        networks = {}
+
+        session = context.session
+        with session.begin(subtransactions=True):
+            for port in items:
+                port['port']['status'] = const.PORT_STATUS_DOWN
+                self._ensure_default_security_group_on_port(context, port)
+                sgids.append(self._get_security_groups_on_port(context, port))
+                dhcp_opts.append(port['port'].get(edo_ext.EXTRADHCPOPTS, []))
+            results = self._create_ports_bulk(context, items)
+            for port, result, port_sgids, port_dhcp_opts in zip(
+                    items, results, sgids, dhcp_opts):
+                attrs = port['port']
+                self._process_port_create_security_group(context, result,
+                                                         port_sgids)
+                network_id = result['network_id']
+                if network_id not in networks:
+                    networks[network_id] = self.get_network(context,
+                                                            network_id)
+                mech_context = driver_context.PortContext(
+                    self, context, result, networks[network_id])
+                self._process_port_binding(mech_context, attrs)
+                result[addr_pair.ADDRESS_PAIRS] = (
+                    self._process_create_allowed_address_pairs(
+                        context, result,
+                        attrs.get(addr_pair.ADDRESS_PAIRS)))
+                self._process_port_create_extra_dhcp_opts(context, result,
+                                                          port_dhcp_opts)
+                mech_contexts.append(mech_context)
+            for mech_context in mech_contexts:
+                self.mechanism_manager.create_port_precommit(mech_context)
+
+        try:
+            for mech_context in mech_contexts:
+                self.mechanism_manager.create_port_postcommit(mech_context)
+        except ml2_exc.MechanismDriverError:
+            with excutils.save_and_reraise_exception():
+                LOG.error(_("mechanism_manager.create_port_postcommit "
+                            "failed, deleting ports created in bulk"))
+                for result in results:
+                    self.delete_port(context, result['id'])
+        for result in results:
+            self.notify_security_groups_member_updated(context, result)
+        return results
+
     def update_port(self, context, id, port):
         attrs = port['port']
         need_port_update_notify = False
@@ -651,30 +739,93 @@ class Ml2Plugin(db_base_plugin_v2.NeutronDbPluginV2,
         self.notify_security_groups_member_updated(context, port)
 
     def update_port_status(self, context, port_id, status):
-        updated = False
+        return bool(self.update_ports_status(context, [port_id], status))
+
+    def update_ports_status(self, context, port_ids, status, host=None):
+        """Set the status of ports, as reported by L2 agents.
+
+        The status of the ports which are not bound to host, if given,
+        is left unchanged. The ports and their networks are only loaded
+        to build PortContexts for the mechanism drivers which do not
+        support port status changes, if any.
+
+        :returns: the given port ids of the existing ports
+        """
         session = context.session
+        contexts = []
         with session.begin(subtransactions=True):
-            port = db.get_port(session, port_id)
-            if not port:
-                LOG.warning(_("Port %(port)s updated up by agent not found"),
-                            {'port': port_id})
-                return False
-            if port.status != status:
+            ports = db.get_ports_status(session, port_ids)
+            ports_by_id = dict((port['id'], port) for port in ports)
+            existing = []
+            changed = {}
+            for port_id in port_ids:
+                port = ports_by_id.get(port_id)
+                if not port:
+                    matches = [port for port in ports
+                               if port['id'].startswith(port_id)]
+                    if len(matches) != 1:
+                        if matches:
+                            LOG.error(_("Multiple ports have port_id "
+                                        "starting with %s"), port_id)
+                        else:
+                            LOG.warning(_("Port %(port)s updated up by "
+                                          "agent not found"),
+                                        {'port': port_id})
+                        continue
+                    port = matches[0]
+                existing.append(port_id)
+                if host and port['host'] != host:
+                    LOG.debug(_("Port %(port)s not bound to the agent host "
+                                "%(host)s"), {'port': port_id, 'host': host})
+                elif port['status'] != status:
+                    changed[port['id']] = port
+
+            if changed:
+                port_contexts = {}
+                if self.mechanism_manager.port_update_drivers:
+                    port_contexts = self._make_port_status_update_contexts(
+                        context, changed.keys(), status)
+                db.update_ports_status(session, changed.keys(), status)
+                for port_id, port in changed.iteritems():
+                    original_status = port['status']
+                    port = dict(port, status=status)
+                    del port['host']
+                    contexts.append((driver_context.PortStatusContext(
+                        self, context, port, original_status),
+                        port_contexts.get(port_id)))
+
+        for status_context, mech_context in contexts:
+            self.mechanism_manager.update_port_status_postcommit(
+                status_context, mech_context)
+
+        return existing
+
+    def _make_port_status_update_contexts(self, context, port_ids, status):
+        # Called within the transaction updating the status of the ports
+        session = context.session
+        port_contexts = {}
+        networks = {}
+        for i in xrange(0, len(port_ids),
+                        db_base_plugin_v2.MAX_IDS_PER_QUERY):
+            chunk = port_ids[i:i + db_base_plugin_v2.MAX_IDS_PER_QUERY]
+            query = session.query(models_v2.Port).filter(
+                models_v2.Port.id.in_(chunk))
+            for port in query:
                 original_port = self._make_port_dict(port)
-                port.status = status
-                updated_port = self._make_port_dict(port)
-                network = self.get_network(context,
-                                           original_port['network_id'])
+                updated_port = dict(original_port, status=status)
+                # The status is updated by a single UPDATE statement
+                session.expire(port, ['status'])
+                network_id = original_port['network_id']
+                if network_id not in networks:
+                    networks[network_id] = self.get_network(context,
+                                                            network_id)
                 mech_context = driver_context.PortContext(
-                    self, context, updated_port, network,
+                    self, context, updated_port, networks[network_id],
                     original_port=original_port)
-                self.mechanism_manager.update_port_precommit(mech_context)
-                updated = True
-
-        if updated:
-            self.mechanism_manager.update_port_postcommit(mech_context)
-
-        return True
+                self.mechanism_manager.update_port_status_precommit(
+                    mech_context)
+                port_contexts[port['id']] = mech_context
+        return port_contexts
 
     def port_bound_to_host(self, port_id, host):
         port_host = db.get_port_binding_host(port_id)
@@ -0,0 +1,303 @@
+# Copyright (c) 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Asynchronous execution of mechanism driver postcommit calls.
+
+The postcommit calls of the mechanism drivers configured in
+async_postcommit_drivers are queued by the MechanismManager instead of
+being made while the API request waits. The mechanism driver context is
+saved as a snapshot of its data, which is journaled in the database until
+the call completes so that it can be queued again when neutron-server is
+restarted. Drivers called with a snapshot get the plugin and an admin
+context from it, like from the contexts of synchronous calls.
+"""
+
+import collections
+import time
+
+import eventlet
+from eventlet import queue
+from oslo.config import cfg
+
+from neutron import context as neutron_context
+from neutron.db import api as db_api
+from neutron.extensions import portbindings
+from neutron.openstack.common import jsonutils
+from neutron.openstack.common import log
+from neutron.plugins.ml2.common import exceptions as ml2_exc
+from neutron.plugins.ml2 import db
+from neutron.plugins.ml2 import driver_api as api
+from neutron.plugins.ml2 import driver_context
+
+LOG = log.getLogger(__name__)
+
+# Upper bound of the wait before retrying a failed call, in seconds
+MAX_RETRY_INTERVAL = 60
+
+
+def snapshot_context(context):
+    """Return the data of a mechanism driver context as a dict."""
+    if isinstance(context, api.PortStatusContext):
+        return {'port_status': context.current,
+                'original_status': context.original_status}
+    if isinstance(context, api.PortContext):
+        return {'port': context.current,
+                'original_port': context.original,
+                'network': snapshot_context(context.network),
+                'bound_segment': context.bound_segment}
+    if isinstance(context, api.SubnetContext):
+        return {'subnet': context.current,
+                'original_subnet': context.original}
+    return {'network': context.current,
+            'original_network': context.original,
+            'network_segments': context.network_segments}
+
+
+def restore_context(plugin, plugin_context, data):
+    """Return the mechanism driver context of a snapshot."""
+    if 'port_status' in data:
+        return PortStatusSnapshot(plugin, plugin_context, data)
+    if 'port' in data:
+        return PortSnapshot(plugin, plugin_context, data)
+    if 'subnet' in data:
+        return SubnetSnapshot(plugin, plugin_context, data)
+    return NetworkSnapshot(plugin, plugin_context, data)
+
+
+def _network_id(data):
+    if 'port_status' in data:
+        return data['port_status']['network_id']
+    if 'port' in data:
+        return data['port']['network_id']
+    if 'subnet' in data:
+        return data['subnet']['network_id']
+    return data['network']['id']
+
+
+class NetworkSnapshot(driver_context.MechanismDriverContext,
+                      api.NetworkContext):
+
+    def __init__(self, plugin, plugin_context, data):
+        super(NetworkSnapshot, self).__init__(plugin, plugin_context)
+        self._data = data
+
+    @property
+    def current(self):
+        return self._data['network']
+
+    @property
+    def original(self):
+        return self._data['original_network']
+
+    @property
+    def network_segments(self):
+        return self._data['network_segments']
+
+
+class SubnetSnapshot(driver_context.MechanismDriverContext,
+                     api.SubnetContext):
+
+    def __init__(self, plugin, plugin_context, data):
+        super(SubnetSnapshot, self).__init__(plugin, plugin_context)
+        self._data = data
+
+    @property
+    def current(self):
+        return self._data['subnet']
+
+    @property
+    def original(self):
+        return self._data['original_subnet']
+
+
+class PortSnapshot(driver_context.MechanismDriverContext, api.PortContext):
+
+    def __init__(self, plugin, plugin_context, data):
+        super(PortSnapshot, self).__init__(plugin, plugin_context)
+        self._data = data
+        self._network = NetworkSnapshot(plugin, plugin_context,
+                                        data['network'])
+
+    @property
+    def current(self):
+        return self._data['port']
+
+    @property
+    def original(self):
+        return self._data['original_port']
+
+    @property
+    def network(self):
+        return self._network
+
+    @property
+    def bound_segment(self):
+        return self._data['bound_segment']
+
+    def host_agents(self, agent_type):
+        host = self.current.get(portbindings.HOST_ID)
+        return self._plugin.get_agents(self._plugin_context,
+                                       filters={'agent_type': [agent_type],
+                                                'host': [host]})
+
+    def set_binding(self, segment_id, vif_type, cap_port_filter):
+        raise ml2_exc.AsynchronousPortBinding(port_id=self.current['id'])
+
+
+class PortStatusSnapshot(driver_context.MechanismDriverContext,
+                         api.PortStatusContext):
+
+    def __init__(self, plugin, plugin_context, data):
+        super(PortStatusSnapshot, self).__init__(plugin, plugin_context)
+        self._data = data
+
+    @property
+    def current(self):
+        return self._data['port_status']
+
+    @property
+    def original_status(self):
+        return self._data['original_status']
+
+
+class _Job(object):
+
+    def __init__(self, job_id, method, data):
+        self.id = job_id
+        self.method = method
+        self.data = data
+        self.queued = time.time()
+
+
+class PostcommitQueue(object):
+    """Run the postcommit calls of a mechanism driver asynchronously.
+
+    The calls for the resources of a network are run in the order they were
+    queued, while the calls for different networks are run concurrently by
+    up to workers green threads. A failed call is retried after an interval
+    doubled for each retry, delaying the later calls for the same network.
+    """
+
+    def __init__(self, driver, plugin, workers, max_retries, retry_interval):
+        self.driver = driver
+        self.plugin = plugin
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+        # Pending jobs for each network id, the network ids with pending
+        # jobs being taken from _ready by one worker at a time
+        self._jobs = {}
+        self._ready = queue.Queue()
+        self.backlog = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        for i in xrange(workers):
+            eventlet.spawn_n(self._work)
+
+    def submit(self, method, data, job_id=None):
+        """Queue a call, journaling it unless it is already journaled."""
+        if job_id is None:
+            job_id = db.add_postcommit_job(db_api.get_session(),
+                                           cfg.CONF.host, self.driver.name,
+                                           method, jsonutils.dumps(data))
+        job = _Job(job_id, method, data)
+        key = _network_id(data)
+        self.backlog += 1
+        if key in self._jobs:
+            self._jobs[key].append(job)
+        else:
+            self._jobs[key] = collections.deque([job])
+            self._ready.put(key)
+
+    def get_stats(self):
+        return {'backlog': self.backlog,
+                'completed': self.completed,
+                'failed': self.failed,
+                'average_latency': (self.total_latency / self.completed
+                                    if self.completed else 0.0),
+                'max_latency': self.max_latency}
+
+    def _work(self):
+        while True:
+            key = self._ready.get()
+            jobs = self._jobs[key]
+            while jobs:
+                self._run(jobs[0])
+                jobs.popleft()
+                self.backlog -= 1
+            del self._jobs[key]
+
+    def _run(self, job):
+        context = restore_context(self.plugin,
+                                  neutron_context.get_admin_context(),
+                                  job.data)
+        retries = 0
+        while True:
+            try:
+                getattr(self.driver.obj, job.method)(context)
+                break
+            except Exception:
+                LOG.exception(
+                    _("Mechanism driver '%(name)s' failed in %(method)s"),
+                    {'name': self.driver.name, 'method': job.method})
+                if retries >= self.max_retries:
+                    LOG.error(_("Dropping %(method)s call of mechanism "
+                                "driver '%(name)s' after %(retries)s "
+                                "retries"),
+                              {'name': self.driver.name,
+                               'method': job.method, 'retries': retries})
+                    self.failed += 1
+                    break
+                eventlet.sleep(min(self.retry_interval * 2 ** retries,
+                                   MAX_RETRY_INTERVAL))
+                retries += 1
+        latency = time.time() - job.queued
+        self.completed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        LOG.debug(_("Mechanism driver '%(name)s' completed %(method)s "
+                    "%(latency).3f s after it was queued, %(backlog)s calls "
+                    "pending"),
+                  {'name': self.driver.name, 'method': job.method,
+                   'latency': latency, 'backlog': self.backlog - 1})
+        try:
+            db.delete_postcommit_job(db_api.get_session(), job.id)
+        except Exception:
+            LOG.exception(_("Failed to remove %(method)s call of mechanism "
+                            "driver '%(name)s' from the journal"),
+                          {'name': self.driver.name, 'method': job.method})
+
+
+def recover(queues):
+    """Queue the calls journaled on this host before it was restarted.
+
+    :param queues: dict of PostcommitQueue by mechanism driver name
+    """
+    session = db_api.get_session()
+    for record in db.get_postcommit_jobs(session, cfg.CONF.host):
+        postcommit_queue = queues.get(record.driver)
+        if postcommit_queue:
+            LOG.info(_("Queuing journaled %(method)s call of mechanism "
+                       "driver '%(name)s'"),
+                     {'name': record.driver, 'method': record.method})
+            postcommit_queue.submit(record.method,
+                                    jsonutils.loads(record.context),
+                                    job_id=record.id)
+        else:
+            LOG.warning(_("Dropping journaled %(method)s call of mechanism "
+                          "driver '%(name)s', which is not asynchronous"),
+                        {'name': record.driver, 'method': record.method})
+            db.delete_postcommit_job(session, record.id)
@@ -40,10 +40,11 @@ class RpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
                    sg_db_rpc.SecurityGroupServerRpcCallbackMixin,
                    type_tunnel.TunnelRpcCallbackMixin):
 
-    RPC_API_VERSION = '1.1'
+    RPC_API_VERSION = '1.2'
     # history
     #   1.0 Initial version (from openvswitch/linuxbridge)
     #   1.1 Support Security Group RPC
+    #   1.2 Support update_devices_up and update_devices_down
 
     def __init__(self, notifier, type_manager):
         # REVISIT(kmestery): This depends on the first three super classes
@@ -157,21 +158,9 @@ class RpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
         LOG.debug(_("Device %(device)s no longer exists at agent "
                     "%(agent_id)s"),
                   {'device': device, 'agent_id': agent_id})
-        plugin = manager.NeutronManager.get_plugin()
-        port_id = self._device_to_port_id(device)
-        port_exists = True
-        if (host and not plugin.port_bound_to_host(port_id, host)):
-            LOG.debug(_("Device %(device)s not bound to the"
-                        " agent host %(host)s"),
-                      {'device': device, 'host': host})
-            return {'device': device,
-                    'exists': port_exists}
-
-        port_exists = plugin.update_port_status(rpc_context, port_id,
-                                                q_const.PORT_STATUS_DOWN)
-
-        return {'device': device,
-                'exists': port_exists}
+        return self._update_devices_status(rpc_context, [device],
+                                           q_const.PORT_STATUS_DOWN,
+                                           host)[0]
 
     def update_device_up(self, rpc_context, **kwargs):
         """Device is up on agent."""
@@ -180,16 +169,37 @@ class RpcCallbacks(dhcp_rpc_base.DhcpRpcCallbackMixin,
         host = kwargs.get('host')
         LOG.debug(_("Device %(device)s up at agent %(agent_id)s"),
                   {'device': device, 'agent_id': agent_id})
+        self._update_devices_status(rpc_context, [device],
+                                    q_const.PORT_STATUS_ACTIVE, host)
+
+    def update_devices_down(self, rpc_context, **kwargs):
+        """Devices no longer exist on agent."""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        host = kwargs.get('host')
+        LOG.debug(_("Devices %(devices)s no longer exist at agent "
+                    "%(agent_id)s"),
+                  {'devices': devices, 'agent_id': agent_id})
+        return self._update_devices_status(rpc_context, devices,
+                                           q_const.PORT_STATUS_DOWN, host)
+
+    def update_devices_up(self, rpc_context, **kwargs):
+        """Devices are up on agent."""
+        agent_id = kwargs.get('agent_id')
+        devices = kwargs.get('devices')
+        host = kwargs.get('host')
+        LOG.debug(_("Devices %(devices)s up at agent %(agent_id)s"),
+                  {'devices': devices, 'agent_id': agent_id})
+        self._update_devices_status(rpc_context, devices,
+                                    q_const.PORT_STATUS_ACTIVE, host)
+
+    def _update_devices_status(self, rpc_context, devices, status, host):
         plugin = manager.NeutronManager.get_plugin()
-        port_id = self._device_to_port_id(device)
-        if (host and not plugin.port_bound_to_host(port_id, host)):
-            LOG.debug(_("Device %(device)s not bound to the"
-                        " agent host %(host)s"),
-                      {'device': device, 'host': host})
-            return
-
-        plugin.update_port_status(rpc_context, port_id,
-                                  q_const.PORT_STATUS_ACTIVE)
+        port_ids = [self._device_to_port_id(device) for device in devices]
+        existing = set(plugin.update_ports_status(rpc_context, port_ids,
+                                                  status, host))
+        return [{'device': device, 'exists': port_id in existing}
+                for device, port_id in zip(devices, port_ids)]
 
 
 class AgentNotifierApi(proxy.RpcProxy,
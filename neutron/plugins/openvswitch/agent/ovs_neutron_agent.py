@@ -22,6 +22,7 @@
 # @author: Seetharama Ayyadevara, Freescale Semiconductor, Inc.
 # @author: Kyle Mestery, Cisco Systems, Inc.
 
+import collections
 import distutils.version as dist_version
 import sys
 import time
@@ -334,60 +335,82 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
         if not self.l2_pop:
             self.setup_tunnel_port(tun_name, tunnel_ip, tunnel_type)
 
-    def fdb_add(self, context, fdb_entries):
-        LOG.debug(_("fdb_add received"))
+    def _get_fdb_networks(self, fdb_entries):
+        """Return the (lvm, agent ports) of the networks to update.
+
+        The networks not managed by this agent and the entries of this
+        agent are left out.
+        """
+        networks = []
         for network_id, values in fdb_entries.items():
             lvm = self.local_vlan_map.get(network_id)
             if not lvm:
                 # Agent doesn't manage any port in this network
                 continue
-            agent_ports = values.get('ports')
-            agent_ports.pop(self.local_ip, None)
-            if len(agent_ports):
-                self.tun_br.defer_apply_on()
-                for agent_ip, ports in agent_ports.items():
-                    # Ensure we have a tunnel port with this remote agent
-                    ofport = self.tun_br_ofports[
-                        lvm.network_type].get(agent_ip)
-                    if not ofport:
-                        port_name = '%s-%s' % (lvm.network_type, agent_ip)
-                        ofport = self.setup_tunnel_port(port_name, agent_ip,
-                                                        lvm.network_type)
-                        if ofport == 0:
-                            continue
-                    for port in ports:
-                        self._add_fdb_flow(port, agent_ip, lvm, ofport)
-                self.tun_br.defer_apply_off()
+            agent_ports = dict((agent_ip, ports) for agent_ip, ports
+                               in values.get('ports').items()
+                               if agent_ip != self.local_ip)
+            if agent_ports:
+                networks.append((lvm, agent_ports))
+        return networks
+
+    def fdb_add(self, context, fdb_entries):
+        LOG.debug(_("fdb_add received"))
+        networks = self._get_fdb_networks(fdb_entries)
+        if not networks:
+            return
+        self.tun_br.defer_apply_on()
+        # Ensure we have a tunnel port with each remote agent, setting up
+        # the missing ports of a tunnel type at once
+        missing_ips = collections.defaultdict(set)
+        for lvm, agent_ports in networks:
+            for agent_ip in agent_ports:
+                if not self.tun_br_ofports[lvm.network_type].get(agent_ip):
+                    missing_ips[lvm.network_type].add(agent_ip)
+        for tunnel_type, remote_ips in missing_ips.items():
+            self.setup_tunnel_ports(tunnel_type, remote_ips)
+        for lvm, agent_ports in networks:
+            tun_ofports = set(lvm.tun_ofports)
+            for agent_ip, ports in agent_ports.items():
+                ofport = self.tun_br_ofports[lvm.network_type].get(agent_ip)
+                if not ofport:
+                    continue
+                for port in ports:
+                    self._add_fdb_flow(port, agent_ip, lvm, ofport)
+            if lvm.tun_ofports != tun_ofports:
+                self._update_flood_flow(lvm)
+        self.tun_br.defer_apply_off()
 
     def fdb_remove(self, context, fdb_entries):
         LOG.debug(_("fdb_remove received"))
-        for network_id, values in fdb_entries.items():
-            lvm = self.local_vlan_map.get(network_id)
-            if not lvm:
-                # Agent doesn't manage any more ports in this network
-                continue
-            agent_ports = values.get('ports')
-            agent_ports.pop(self.local_ip, None)
-            if len(agent_ports):
-                self.tun_br.defer_apply_on()
-                for agent_ip, ports in agent_ports.items():
-                    ofport = self.tun_br_ofports[
-                        lvm.network_type].get(agent_ip)
-                    if not ofport:
-                        continue
-                    for port in ports:
-                        self._del_fdb_flow(port, agent_ip, lvm, ofport)
-                self.tun_br.defer_apply_off()
+        networks = self._get_fdb_networks(fdb_entries)
+        if not networks:
+            return
+        self.tun_br.defer_apply_on()
+        unused_ofports = set()
+        for lvm, agent_ports in networks:
+            tun_ofports = set(lvm.tun_ofports)
+            for agent_ip, ports in agent_ports.items():
+                ofport = self.tun_br_ofports[
+                    lvm.network_type].get(agent_ip)
+                if not ofport:
+                    continue
+                for port in ports:
+                    self._del_fdb_flow(port, agent_ip, lvm, ofport)
+            if lvm.tun_ofports != tun_ofports:
+                self._update_flood_flow(lvm)
+                unused_ofports.update(
+                    (ofport, lvm.network_type)
+                    for ofport in tun_ofports - lvm.tun_ofports)
+        # Check if the tunnel ports are still used
+        for ofport, tunnel_type in unused_ofports:
+            self.cleanup_tunnel_port(ofport, tunnel_type)
+        self.tun_br.defer_apply_off()
 
     def _add_fdb_flow(self, port_info, agent_ip, lvm, ofport):
         if port_info == q_const.FLOODING_ENTRY:
+            # The flooding flow is updated once all the entries are added
             lvm.tun_ofports.add(ofport)
-            ofports = ','.join(lvm.tun_ofports)
-            self.tun_br.mod_flow(table=constants.FLOOD_TO_TUN,
-                                 priority=1,
-                                 dl_vlan=lvm.vlan,
-                                 actions="strip_vlan,set_tunnel:%s,"
-                                 "output:%s" % (lvm.segmentation_id, ofports))
         else:
             # TODO(feleouet): add ARP responder entry
             self.tun_br.add_flow(table=constants.UCAST_TO_TUN,
@@ -399,27 +422,27 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
 
     def _del_fdb_flow(self, port_info, agent_ip, lvm, ofport):
         if port_info == q_const.FLOODING_ENTRY:
-            lvm.tun_ofports.remove(ofport)
-            if len(lvm.tun_ofports) > 0:
-                ofports = ','.join(lvm.tun_ofports)
-                self.tun_br.mod_flow(table=constants.FLOOD_TO_TUN,
-                                     priority=1,
-                                     dl_vlan=lvm.vlan,
-                                     actions="strip_vlan,"
-                                     "set_tunnel:%s,output:%s" %
-                                     (lvm.segmentation_id, ofports))
-            else:
-                # This local vlan doesn't require any more tunelling
-                self.tun_br.delete_flows(table=constants.FLOOD_TO_TUN,
-                                         dl_vlan=lvm.vlan)
-            # Check if this tunnel port is still used
-            self.cleanup_tunnel_port(ofport, lvm.network_type)
+            # The flooding flow is updated once all the entries are removed
+            lvm.tun_ofports.discard(ofport)
         else:
             #TODO(feleouet): remove ARP responder entry
             self.tun_br.delete_flows(table=constants.UCAST_TO_TUN,
                                      dl_vlan=lvm.vlan,
                                      dl_dst=port_info[0])
 
+    def _update_flood_flow(self, lvm):
+        if lvm.tun_ofports:
+            ofports = ','.join(sorted(lvm.tun_ofports))
+            self.tun_br.mod_flow(table=constants.FLOOD_TO_TUN,
+                                 priority=1,
+                                 dl_vlan=lvm.vlan,
+                                 actions="strip_vlan,set_tunnel:%s,"
+                                 "output:%s" % (lvm.segmentation_id, ofports))
+        else:
+            # This local vlan doesn't require any more tunelling
+            self.tun_br.delete_flows(table=constants.FLOOD_TO_TUN,
+                                     dl_vlan=lvm.vlan)
+
     def fdb_update(self, context, fdb_entries):
         LOG.debug(_("fdb_update received"))
         for action, values in fdb_entries.items():
@@ -862,6 +885,28 @@ class OVSNeutronAgent(sg_rpc.SecurityGroupAgentRpcCallbackMixin,
                                              self.local_ip,
                                              tunnel_type,
                                              self.vxlan_udp_port)
+        return self._setup_tunnel_port_flows(remote_ip, tunnel_type, ofport)
+
+    def setup_tunnel_ports(self, tunnel_type, remote_ips):
+        """Set up the tunnel ports to several remote IPs at once.
+
+        The ports are added in one OVSDB transaction. Return the ofport of
+        each remote IP whose tunnel port was set up.
+        """
+        tunnels = dict(('%s-%s' % (tunnel_type, remote_ip), remote_ip)
+                       for remote_ip in remote_ips)
+        port_ofports = self.tun_br.add_tunnel_ports(tunnels, self.local_ip,
+                                                    tunnel_type,
+                                                    self.vxlan_udp_port)
+        ofports = {}
+        for port_name, remote_ip in tunnels.items():
+            ofport = self._setup_tunnel_port_flows(
+                remote_ip, tunnel_type, port_ofports.get(port_name))
+            if ofport:
+                ofports[remote_ip] = ofport
+        return ofports
+
+    def _setup_tunnel_port_flows(self, remote_ip, tunnel_type, ofport):
         if ofport < 0:
             LOG.error(_("Failed to set-up %(type)s tunnel port to %(ip)s"),
                       {'type': tunnel_type, 'ip': remote_ip})
@@ -20,6 +20,7 @@ Policy engine for neutron.  Largely copied from nova.
 """
 import itertools
 import re
+import weakref
 
 from oslo.config import cfg
 
@@ -35,6 +36,8 @@ from neutron.openstack.common import policy
 LOG = logging.getLogger(__name__)
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+# Decisions which depend on credentials only, memoized per context
+_DECISION_CACHE = weakref.WeakKeyDictionary()
 ADMIN_CTX_POLICY = 'context_is_admin'
 # Maps deprecated 'extension' policies to new-style policies
 DEPRECATED_POLICY_MAP = {
@@ -314,6 +317,78 @@ class FieldCheck(policy.Check):
         return target_value == self.value
 
 
+def _check_credentials(rule, creds):
+    """Evaluate a rule looking at the credentials only.
+
+    Return True or False if the roles in the credentials are enough to
+    decide the rule, or None if its outcome depends on the target.
+    """
+    if isinstance(rule, policy.TrueCheck):
+        return True
+    elif isinstance(rule, policy.FalseCheck):
+        return False
+    elif isinstance(rule, policy.RoleCheck):
+        return rule(None, creds)
+    elif isinstance(rule, policy.RuleCheck):
+        try:
+            return _check_credentials(policy._rules[rule.match], creds)
+        except KeyError:
+            # Same as RuleCheck, fail closed
+            return False
+    elif isinstance(rule, policy.NotCheck):
+        result = _check_credentials(rule.rule, creds)
+        return None if result is None else not result
+    elif isinstance(rule, (policy.AndCheck, policy.OrCheck)):
+        # An 'and' is decided by any False, an 'or' by any True
+        decisive = isinstance(rule, policy.OrCheck)
+        result = not decisive
+        for sub_rule in rule.rules:
+            sub_result = _check_credentials(sub_rule, creds)
+            if sub_result is decisive:
+                return decisive
+            elif sub_result is None:
+                result = None
+        return result
+    return None
+
+
+def _get_credentials_decision(context, action):
+    """Decide a read action from the credentials in this context.
+
+    Return True or False if the action can be decided without looking at
+    its target, and None otherwise. Decisions are memoized for the
+    lifetime of the context, so that listing many items evaluates rules
+    such as 'rule:admin_only' only once per request.
+    """
+    init()
+    if get_resource_and_action(action)[1]:
+        # Rules for write actions are built from the target
+        return
+    rules, decisions = _DECISION_CACHE.get(context, (None, None))
+    if rules is not policy._rules:
+        decisions = {}
+        _DECISION_CACHE[context] = (policy._rules, decisions)
+    key = (action, tuple(context.roles))
+    if key not in decisions:
+        decisions[key] = _check_credentials(
+            policy.RuleCheck('rule', action), {'roles': context.roles})
+    return decisions[key]
+
+
+def check_credentials_only(context, action):
+    """Verify if a read action can be decided without a target.
+
+    Return True or False when the credentials in this context are enough
+    to decide the action, None when the target must be checked too, and
+    raise a PolicyRuleNotFound exception if the action is not defined in
+    the policy engine.
+    """
+    init()
+    if not policy._rules or action not in policy._rules:
+        raise exceptions.PolicyRuleNotFound(rule=action)
+    return _get_credentials_decision(context, action)
+
+
 def _prepare_check(context, action, target):
     """Prepare rule, target, and credentials for the policy engine."""
     init()
@@ -339,6 +414,9 @@ def check(context, action, target, plugin=None):
 
     :return: Returns True if access is permitted else False.
     """
+    decision = _get_credentials_decision(context, action)
+    if decision is not None:
+        return decision
     return policy.check(*(_prepare_check(context, action, target)))
 
 
@@ -355,6 +433,9 @@ def check_if_exists(context, action, target):
     # Raise if there's no match for requested action in the policy engine
     if not policy._rules or action not in policy._rules:
         raise exceptions.PolicyRuleNotFound(rule=action)
+    decision = _get_credentials_decision(context, action)
+    if decision is not None:
+        return decision
     return policy.check(*(_prepare_check(context, action, target)))
 
 
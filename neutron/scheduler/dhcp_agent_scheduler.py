@@ -18,6 +18,7 @@
 import random
 
 from oslo.config import cfg
+from sqlalchemy import func
 
 from neutron.common import constants
 from neutron.db import agents_db
@@ -34,6 +35,9 @@ class ChanceScheduler(object):
     can be introduced later.
     """
 
+    def _choose_dhcp_agents(self, context, active_dhcp_agents, n_agents):
+        return random.sample(active_dhcp_agents, n_agents)
+
     def _schedule_bind_network(self, context, agent, network_id):
         binding = agentschedulers_db.NetworkDhcpAgentBinding()
         binding.dhcp_agent = agent
@@ -78,7 +82,8 @@ class ChanceScheduler(object):
                 LOG.warn(_('No more DHCP agents'))
                 return
             n_agents = min(len(active_dhcp_agents), n_agents)
-            chosen_agents = random.sample(active_dhcp_agents, n_agents)
+            chosen_agents = self._choose_dhcp_agents(
+                context, active_dhcp_agents, n_agents)
             for agent in chosen_agents:
                 self._schedule_bind_network(context, agent, network['id'])
         return chosen_agents
@@ -119,3 +124,16 @@ class ChanceScheduler(object):
                     binding.network_id = net_id
                     context.session.add(binding)
         return True
+
+
+class LeastNetworksScheduler(ChanceScheduler):
+    """Allocate to a network the DHCP agents hosting the fewest networks."""
+
+    def _choose_dhcp_agents(self, context, active_dhcp_agents, n_agents):
+        binding = agentschedulers_db.NetworkDhcpAgentBinding
+        query = context.session.query(
+            binding.dhcp_agent_id, func.count(binding.network_id)).group_by(
+                binding.dhcp_agent_id)
+        load = dict(query)
+        return sorted(active_dhcp_agents,
+                      key=lambda agent: load.get(agent['id'], 0))[:n_agents]
@@ -17,6 +17,7 @@
 
 import random
 
+from sqlalchemy import func
 from sqlalchemy.orm import exc
 from sqlalchemy.sql import exists
 
@@ -30,12 +31,27 @@ from neutron.openstack.common import log as logging
 LOG = logging.getLogger(__name__)
 
 
-class ChanceScheduler(object):
-    """Allocate a L3 agent for a router in a random way.
-    More sophisticated scheduler (similar to filter scheduler in nova?)
-    can be introduced later.
+class L3Scheduler(object):
+    """Base class of the schedulers of routers to L3 agents.
+
+    Subclasses choose the agent hosting a router among the candidates.
     """
 
+    def _get_agents_load(self, context):
+        """Return the number of routers by agent id, or None if unused."""
+        return None
+
+    def _choose_router_agent(self, candidates, load):
+        raise NotImplementedError()
+
+    def _get_hosted_router_ids(self, context, router_ids):
+        """Return the ids of the routers bound to an L3 agent."""
+        #TODO(gongysh) consider the disabled agent's router
+        binding = l3_agentschedulers_db.RouterL3AgentBinding
+        query = context.session.query(binding.router_id).filter(
+            binding.router_id.in_(router_ids))
+        return set(router_id for router_id, in query)
+
     def auto_schedule_routers(self, plugin, context, host, router_ids):
         """Schedule non-hosted routers to L3 Agent running on host.
         If router_ids is given, each router in router_ids is scheduled
@@ -62,17 +78,14 @@ class ChanceScheduler(object):
                 LOG.warn(_('L3 agent %s is not active'), l3_agent.id)
             # check if each of the specified routers is hosted
             if router_ids:
-                unscheduled_router_ids = []
-                for router_id in router_ids:
-                    l3_agents = plugin.get_l3_agents_hosting_routers(
-                        context, [router_id], admin_state_up=True)
-                    if l3_agents:
-                        LOG.debug(_('Router %(router_id)s has already been'
-                                    ' hosted by L3 agent %(agent_id)s'),
-                                  {'router_id': router_id,
-                                   'agent_id': l3_agents[0]['id']})
-                    else:
-                        unscheduled_router_ids.append(router_id)
+                hosted_router_ids = self._get_hosted_router_ids(context,
+                                                                router_ids)
+                for router_id in hosted_router_ids:
+                    LOG.debug(_('Router %s has already been hosted'),
+                              router_id)
+                unscheduled_router_ids = [router_id for router_id in
+                                          router_ids if router_id
+                                          not in hosted_router_ids]
                 if not unscheduled_router_ids:
                     # all (specified) routers are already scheduled
                     return False
@@ -106,50 +119,92 @@ class ChanceScheduler(object):
 
             # binding
             for router_id in router_ids:
-                binding = l3_agentschedulers_db.RouterL3AgentBinding()
-                binding.l3_agent = l3_agent
-                binding.router_id = router_id
-                binding.default = True
-                context.session.add(binding)
+                self.bind_router(context, router_id, l3_agent, default=True)
         return True
 
+    def bind_router(self, context, router_id, chosen_agent, default=False):
+        binding = l3_agentschedulers_db.RouterL3AgentBinding()
+        binding.l3_agent = chosen_agent
+        binding.router_id = router_id
+        binding.default = default
+        context.session.add(binding)
+        LOG.debug(_('Router %(router_id)s is scheduled to '
+                    'L3 agent %(agent_id)s'),
+                  {'router_id': router_id,
+                   'agent_id': chosen_agent['id']})
+
     def schedule(self, plugin, context, router_id):
         """Schedule the router to an active L3 agent if there
         is no enable L3 agent hosting it.
         """
+        chosen_agents = self.schedule_routers(plugin, context, [router_id])
+        if chosen_agents:
+            return chosen_agents[0]
+
+    def schedule_routers(self, plugin, context, router_ids):
+        """Schedule the routers not hosted by an L3 agent.
+
+        The hosted routers, the active agents and their load are queried
+        once for all the routers. The agents chosen are returned.
+        """
+        if not router_ids:
+            return []
         with context.session.begin(subtransactions=True):
             # allow one router is hosted by just
             # one enabled l3 agent hosting since active is just a
             # timing problem. Non-active l3 agent can return to
             # active any time
-            l3_agents = plugin.get_l3_agents_hosting_routers(
-                context, [router_id], admin_state_up=True)
-            if l3_agents:
-                LOG.debug(_('Router %(router_id)s has already been hosted'
-                            ' by L3 agent %(agent_id)s'),
-                          {'router_id': router_id,
-                           'agent_id': l3_agents[0]['id']})
-                return
-
-            sync_router = plugin.get_router(context, router_id)
+            hosted_router_ids = self._get_hosted_router_ids(context,
+                                                            router_ids)
+            for router_id in hosted_router_ids:
+                LOG.debug(_('Router %s has already been hosted'), router_id)
+            router_ids = set(router_ids) - hosted_router_ids
+            if not router_ids:
+                return []
+
             active_l3_agents = plugin.get_l3_agents(context, active=True)
             if not active_l3_agents:
                 LOG.warn(_('No active L3 agents'))
-                return
-            candidates = plugin.get_l3_agent_candidates(sync_router,
-                                                        active_l3_agents)
-            if not candidates:
-                LOG.warn(_('No L3 agents can host the router %s'),
-                         sync_router['id'])
-                return
-
-            chosen_agent = random.choice(candidates)
-            binding = l3_agentschedulers_db.RouterL3AgentBinding()
-            binding.l3_agent = chosen_agent
-            binding.router_id = sync_router['id']
-            context.session.add(binding)
-            LOG.debug(_('Router %(router_id)s is scheduled to '
-                        'L3 agent %(agent_id)s'),
-                      {'router_id': sync_router['id'],
-                       'agent_id': chosen_agent['id']})
-            return chosen_agent
+                return []
+            load = self._get_agents_load(context)
+            chosen_agents = []
+            for sync_router in plugin.get_routers(
+                context, filters={'id': list(router_ids)}):
+                candidates = plugin.get_l3_agent_candidates(
+                    sync_router, active_l3_agents)
+                if not candidates:
+                    LOG.warn(_('No L3 agents can host the router %s'),
+                             sync_router['id'])
+                    continue
+                chosen_agent = self._choose_router_agent(candidates, load)
+                self.bind_router(context, sync_router['id'], chosen_agent)
+                chosen_agents.append(chosen_agent)
+            return chosen_agents
+
+
+class ChanceScheduler(L3Scheduler):
+    """Allocate a L3 agent for a router in a random way.
+    More sophisticated scheduler (similar to filter scheduler in nova?)
+    can be introduced later.
+    """
+
+    def _choose_router_agent(self, candidates, load):
+        return random.choice(candidates)
+
+
+class LeastRoutersScheduler(L3Scheduler):
+    """Allocate to a router the L3 agent hosting the fewest routers."""
+
+    def _get_agents_load(self, context):
+        binding = l3_agentschedulers_db.RouterL3AgentBinding
+        query = context.session.query(
+            binding.l3_agent_id, func.count(binding.router_id)).group_by(
+                binding.l3_agent_id)
+        return dict(query)
+
+    def _choose_router_agent(self, candidates, load):
+        chosen_agent = min(candidates,
+                           key=lambda agent: load.get(agent['id'], 0))
+        # The routers scheduled in the same batch count in the load
+        load[chosen_agent['id']] = load.get(chosen_agent['id'], 0) + 1
+        return chosen_agent
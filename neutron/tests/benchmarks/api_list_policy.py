@@ -0,0 +1,110 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cost of policy checks when listing ports through the API controller.
+
+A port controller is driven by a plugin which returns canned ports, so that
+the time measured is spent authorizing and filtering the items with the
+policy file shipped in etc/. The time per port is reported for an admin and
+for a regular user owning all the ports. --no-cache evaluates every rule
+against every item, as done before decisions were memoized per request.
+"""
+
+import argparse
+import os
+import time
+
+import mock
+from oslo.config import cfg
+
+from neutron.api.v2 import attributes
+from neutron.api.v2 import base as api_base
+from neutron.common import config
+from neutron import context
+from neutron import policy
+from neutron.tests.benchmarks import base
+from neutron import wsgi
+
+ETCDIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'etc')
+
+
+class FakePlugin(object):
+
+    def __init__(self, ports):
+        self.ports = ports
+
+    def get_ports(self, context, filters=None, fields=None):
+        return self.ports
+
+
+def make_ports(count):
+    return [{'id': 'port-%d' % i,
+             'name': '',
+             'network_id': 'bench-net',
+             'admin_state_up': True,
+             'status': 'ACTIVE',
+             'mac_address': 'fa:16:3e:00:%02x:%02x' % (i / 256, i % 256),
+             'fixed_ips': [{'subnet_id': 'bench-subnet',
+                            'ip_address': '10.0.%d.%d' % (i / 256, i % 256)}],
+             'device_id': 'device-%d' % i,
+             'device_owner': 'compute:nova',
+             'tenant_id': base.TENANT_ID} for i in xrange(count)]
+
+
+def time_list(controller, ctx):
+    request = wsgi.Request.blank('/ports')
+    request.environ['neutron.context'] = ctx
+    start = time.time()
+    for value in controller.index(request).itervalues():
+        # Listed items are viewed as the collection is consumed
+        list(value)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ports', type=int, nargs='+',
+                        default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not memoize target independent decisions')
+    args = parser.parse_args()
+
+    config.parse(args=[])
+    cfg.CONF.set_override('policy_file',
+                          os.path.abspath(os.path.join(ETCDIR,
+                                                       'policy.json')))
+    if args.no_cache:
+        mock.patch.object(policy, '_get_credentials_decision',
+                          return_value=None).start()
+    contexts = {
+        'admin': context.get_admin_context,
+        'member': lambda: context.Context('bench-user', base.TENANT_ID,
+                                          roles=['member'])}
+    print('%8s %14s %14s' % ('ports', 'admin us/port', 'member us/port'))
+    for count in args.ports:
+        controller = api_base.Controller(
+            FakePlugin(make_ports(count)), 'ports', 'port',
+            attributes.RESOURCE_ATTRIBUTE_MAP['ports'])
+        # A new context per listing, as for API requests
+        timings = [min(time_list(controller, contexts[name]())
+                       for i in xrange(args.repeat)) * 1e6 / count
+                   for name in ('admin', 'member')]
+        print('%8d %14.1f %14.1f' % (count, timings[0], timings[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Latency and memory of a large port listing served as JSON.
+
+The port resource is driven by a plugin which returns canned ports, and the
+response is read chunk by chunk as a WSGI server would. The time to the
+first chunk, the total time, the size of the largest chunk and the maximum
+resident memory of the process are reported. --buffered serializes the
+whole listing at once, as done before responses were streamed. Run each
+mode in its own process to compare the memory used.
+"""
+
+import argparse
+import os
+import resource
+import time
+
+import mock
+from oslo.config import cfg
+
+from neutron.api.v2 import attributes
+from neutron.api.v2 import base as api_base
+from neutron.api.v2 import resource as api_resource
+from neutron.common import config
+from neutron import context
+from neutron.tests.benchmarks import api_list_policy
+from neutron import wsgi
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ports', type=int, default=50000)
+    parser.add_argument('--buffered', action='store_true',
+                        help='Serialize the whole listing at once')
+    args = parser.parse_args()
+
+    config.parse(args=[])
+    cfg.CONF.set_override('policy_file',
+                          os.path.abspath(os.path.join(api_list_policy.ETCDIR,
+                                                       'policy.json')))
+    if args.buffered:
+        mock.patch.object(wsgi.JSONDictSerializer, 'serialize_iter',
+                          new=wsgi.DictSerializer.serialize_iter).start()
+    controller = api_base.Controller(
+        api_list_policy.FakePlugin(api_list_policy.make_ports(args.ports)),
+        'ports', 'port', attributes.RESOURCE_ATTRIBUTE_MAP['ports'])
+    app = api_resource.Resource(controller)
+    environ = {'wsgiorg.routing_args': (None, {'action': 'index'}),
+               'neutron.context': context.get_admin_context()}
+
+    start = time.time()
+    status, headers, app_iter = wsgi.Request.blank(
+        '/ports', environ=environ).call_application(app)
+    first = None
+    size = largest = 0
+    for chunk in app_iter:
+        if first is None:
+            first = time.time() - start
+        size += len(chunk)
+        largest = max(largest, len(chunk))
+    total = time.time() - start
+
+    print('ports:          %d' % args.ports)
+    print('body:           %d bytes' % size)
+    print('largest chunk:  %d bytes' % largest)
+    print('first chunk:    %.1f ms' % (first * 1e3))
+    print('total:          %.1f ms' % (total * 1e3))
+    print('max RSS:        %d KiB' %
+          resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+if __name__ == '__main__':
+    main()
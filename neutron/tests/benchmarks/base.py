@@ -0,0 +1,84 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Helpers shared by the benchmarks which drive a plugin on a database."""
+
+import os
+import tempfile
+
+from oslo.config import cfg
+
+from neutron.api.v2 import attributes
+from neutron.common import config
+from neutron.db import api as db_api
+
+TENANT_ID = 'bench-tenant'
+
+
+def configure(connection=None, core_plugin=None):
+    """Parse an empty configuration and point it to a database.
+
+    A temporary SQLite file is used if no connection string is given, so that
+    several threads can share the same database. Return the connection used.
+    """
+    config.parse(args=[])
+    if not connection:
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        connection = 'sqlite:///%s' % path
+    cfg.CONF.set_override('connection', connection, 'database')
+    if core_plugin:
+        cfg.CONF.set_override('core_plugin', core_plugin)
+    return connection
+
+
+def cleanup(connection):
+    db_api.clear_db()
+    if connection.startswith('sqlite:///'):
+        path = connection[len('sqlite:///'):]
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def network_body(name='bench-net'):
+    return {'network': {'name': name,
+                        'admin_state_up': True,
+                        'shared': False,
+                        'tenant_id': TENANT_ID}}
+
+
+def subnet_body(network_id, cidr='10.0.0.0/16', ip_version=4):
+    return {'subnet': {'network_id': network_id,
+                       'name': '',
+                       'cidr': cidr,
+                       'ip_version': ip_version,
+                       'gateway_ip': attributes.ATTR_NOT_SPECIFIED,
+                       'allocation_pools': attributes.ATTR_NOT_SPECIFIED,
+                       'dns_nameservers': attributes.ATTR_NOT_SPECIFIED,
+                       'host_routes': attributes.ATTR_NOT_SPECIFIED,
+                       'enable_dhcp': True,
+                       'tenant_id': TENANT_ID}}
+
+
+def port_body(network_id, device_id='', fixed_ips=None):
+    return {'port': {'network_id': network_id,
+                     'name': '',
+                     'admin_state_up': True,
+                     'mac_address': attributes.ATTR_NOT_SPECIFIED,
+                     'fixed_ips': fixed_ips or attributes.ATTR_NOT_SPECIFIED,
+                     'device_id': device_id,
+                     'device_owner': '',
+                     'tenant_id': TENANT_ID}}
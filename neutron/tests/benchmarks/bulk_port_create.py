@@ -0,0 +1,69 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Time taken to create ports in bulk on a single subnet.
+
+Each batch of ports is created with one create_port_bulk call on
+NeutronDbPluginV2, on a new network, and the time per port is reported.
+--per-item creates every port of a batch with create_port in a single
+transaction, as done by the emulated bulk create. A temporary SQLite file is
+used unless a --connection string (e.g. to a MySQL server) is given.
+"""
+
+import argparse
+import time
+
+from neutron import context
+from neutron.db import db_base_plugin_v2
+from neutron.tests.benchmarks import base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ports', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    parser.add_argument('--per-item', action='store_true',
+                        help='Create the ports one at a time')
+    parser.add_argument('--connection',
+                        help='Database connection string')
+    args = parser.parse_args()
+
+    connection = base.configure(args.connection)
+    try:
+        plugin = db_base_plugin_v2.NeutronDbPluginV2()
+        ctx = context.get_admin_context()
+        print('%8s %10s %12s' % ('ports', 'total s', 'ms/port'))
+        for index, count in enumerate(args.ports):
+            network = plugin.create_network(ctx, base.network_body())
+            plugin.create_subnet(ctx, base.subnet_body(
+                network['id'], cidr='10.%d.0.0/16' % index))
+            ports = [base.port_body(network['id']) for i in xrange(count)]
+            start = time.time()
+            if args.per_item:
+                with ctx.session.begin(subtransactions=True):
+                    for port in ports:
+                        plugin.create_port(ctx, port)
+            else:
+                plugin.create_port_bulk(ctx, {'ports': ports})
+            elapsed = time.time() - start
+            print('%8d %10.2f %12.2f' % (count, elapsed,
+                                         elapsed * 1e3 / count))
+    finally:
+        base.cleanup(connection)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Time taken to list the pages of a large collection of ports.
+
+Ports are created on a single network through NeutronDbPluginV2 and then
+listed page by page, sorted by MAC address, following the marker of each
+page as the API does. The time per page is reported for the first page, the
+middle page and the last page. --load-marker loads the whole marker port
+before each page, as done before only its sort key values were read.
+--emulated lists the whole collection for every page, as done for plugins
+without native pagination. A temporary SQLite file is used unless a
+--connection string (e.g. to a MySQL server) is given.
+"""
+
+import argparse
+import time
+
+import mock
+
+from neutron import context
+from neutron.db import db_base_plugin_v2
+from neutron.tests.benchmarks import base
+
+SORTS = [('mac_address', True), ('id', True)]
+
+
+def list_page(plugin, ctx, limit, marker, emulated):
+    if not emulated:
+        return plugin.get_ports(ctx, sorts=SORTS, limit=limit, marker=marker)
+    ports = plugin.get_ports(ctx)
+    ports.sort(key=lambda port: (port['mac_address'], port['id']))
+    index = 0
+    if marker:
+        index = [port['id'] for port in ports].index(marker) + 1
+    return ports[index:index + limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ports', type=int, default=5000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--load-marker', action='store_true',
+                        help='Load the marker object before each page')
+    parser.add_argument('--emulated', action='store_true',
+                        help='List the whole collection for each page')
+    parser.add_argument('--connection',
+                        help='Database connection string')
+    args = parser.parse_args()
+
+    connection = base.configure(args.connection)
+    try:
+        plugin = db_base_plugin_v2.NeutronDbPluginV2()
+        ctx = context.get_admin_context()
+        network = plugin.create_network(ctx, base.network_body())
+        plugin.create_subnet(ctx, base.subnet_body(network['id']))
+        plugin.create_port_bulk(ctx, {'ports': [
+            base.port_body(network['id']) for i in xrange(args.ports)]})
+
+        if args.load_marker:
+            def get_marker_obj(context, resource, limit, marker):
+                if limit and marker:
+                    return plugin._get_port(context, marker)
+            mock.patch.object(plugin, '_get_marker_obj',
+                              new=get_marker_obj).start()
+
+        timings = []
+        marker = None
+        while True:
+            start = time.time()
+            page = list_page(plugin, ctx, args.limit, marker, args.emulated)
+            timings.append(time.time() - start)
+            if len(page) < args.limit:
+                break
+            marker = page[-1]['id']
+
+        print('ports:        %d' % args.ports)
+        print('pages:        %d' % len(timings))
+        for name, index in (('first', 0), ('middle', len(timings) / 2),
+                            ('last', -1)):
+            print('%-13s %.2f ms' % (name + ' page:', timings[index] * 1e3))
+        print('total:        %.2f s' % sum(timings))
+    finally:
+        base.cleanup(connection)
+
+
+if __name__ == '__main__':
+    main()
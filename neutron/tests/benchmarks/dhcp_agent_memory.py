@@ -0,0 +1,118 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Memory used by the DHCP agent network cache for a large network.
+
+Ports and subnets of a synthetic network are serialized and decoded one by
+one, so that strings are unicode as with RPC and decoded dicts do not stay
+around, then loaded into a NetworkCache. The RSS of the process is reported
+before and after the load. Use --legacy to load ports and subnets as plain
+DictModels for comparison.
+"""
+
+import argparse
+import gc
+
+from neutron.agent import dhcp_agent
+from neutron.agent.linux import dhcp
+from neutron.openstack.common import jsonutils
+from neutron.openstack.common import uuidutils
+
+
+def get_rss_kb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+
+def make_payload(num_ports, num_subnets):
+    network_id = uuidutils.generate_uuid()
+    subnets = [{'id': uuidutils.generate_uuid(),
+                'network_id': network_id,
+                'name': '',
+                'tenant_id': 'tenant',
+                'cidr': '10.%d.0.0/16' % i,
+                'ip_version': 4,
+                'enable_dhcp': True,
+                'gateway_ip': '10.%d.0.1' % i,
+                'dns_nameservers': [],
+                'host_routes': [],
+                'allocation_pools': [{'start': '10.%d.0.2' % i,
+                                      'end': '10.%d.255.254' % i}]}
+               for i in range(num_subnets)]
+    ports = []
+    for i in xrange(num_ports):
+        subnet = subnets[i % num_subnets]
+        ports.append({'id': uuidutils.generate_uuid(),
+                      'network_id': network_id,
+                      'mac_address': 'fa:16:3e:%02x:%02x:%02x' % (
+                          (i >> 16) & 0xff, (i >> 8) & 0xff, i & 0xff),
+                      'device_id': uuidutils.generate_uuid(),
+                      'device_owner': 'compute:nova',
+                      'fixed_ips': [{'subnet_id': subnet['id'],
+                                     'ip_address': '10.%d.%d.%d' % (
+                                         i % num_subnets,
+                                         (i >> 8) & 0xff, i & 0xff)}],
+                      'extra_dhcp_opts': []})
+    network = {'id': network_id,
+               'tenant_id': 'tenant',
+               'admin_state_up': True,
+               'subnets': [jsonutils.dumps(s) for s in subnets],
+               'ports': [jsonutils.dumps(p) for p in ports]}
+    return network
+
+
+def load_network(payload, legacy):
+    if legacy:
+        port_model = subnet_model = dhcp.DictModel
+    else:
+        port_model, subnet_model = dhcp.PortModel, dhcp.SubnetModel
+    network = dict(payload)
+    network['subnets'] = [subnet_model(jsonutils.loads(s))
+                          for s in payload['subnets']]
+    network['ports'] = [port_model(jsonutils.loads(p))
+                        for p in payload['ports']]
+    return dhcp.NetModel(True, network)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ports', type=int, default=100000)
+    parser.add_argument('--subnets', type=int, default=4)
+    parser.add_argument('--legacy', action='store_true',
+                        help='Load ports and subnets as DictModels')
+    args = parser.parse_args()
+
+    payload = make_payload(args.ports, args.subnets)
+    gc.collect()
+    rss_before = get_rss_kb()
+
+    cache = dhcp_agent.NetworkCache()
+    cache.put(load_network(payload, args.legacy))
+    gc.collect()
+    rss_after = get_rss_kb()
+
+    print('model:       %s' % ('DictModel' if args.legacy else 'PortModel'))
+    print('ports:       %d' % args.ports)
+    print('RSS before:  %d KiB' % rss_before)
+    print('RSS after:   %d KiB' % rss_after)
+    print('per port:    %.0f bytes' %
+          ((rss_after - rss_before) * 1024.0 / max(args.ports, 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Throughput of concurrent port creation on a single subnet.
+
+Several threads create ports on the same subnet through NeutronDbPluginV2,
+each with its own context and session, and the number of ports created per
+second is reported along with failed attempts. A temporary SQLite file is
+used unless a --connection string (e.g. to a MySQL server) is given.
+"""
+
+import argparse
+import threading
+import time
+
+from neutron import context
+from neutron.db import db_base_plugin_v2
+from neutron.tests.benchmarks import base
+
+
+def create_ports(plugin, network_id, count, results, lock):
+    ctx = context.get_admin_context()
+    for i in xrange(count):
+        try:
+            plugin.create_port(ctx, base.port_body(network_id))
+            outcome = 'created'
+        except Exception as e:
+            outcome = 'failed'
+            with lock:
+                results['errors'].add(e.__class__.__name__)
+        with lock:
+            results[outcome] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ports', type=int, default=50,
+                        help='Ports created by each thread')
+    parser.add_argument('--connection',
+                        help='Database connection string')
+    args = parser.parse_args()
+
+    connection = base.configure(args.connection)
+    try:
+        plugin = db_base_plugin_v2.NeutronDbPluginV2()
+        ctx = context.get_admin_context()
+        network = plugin.create_network(ctx, base.network_body())
+        plugin.create_subnet(ctx, base.subnet_body(network['id']))
+
+        results = {'created': 0, 'failed': 0, 'errors': set()}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=create_ports,
+                                    args=(plugin, network['id'], args.ports,
+                                          results, lock))
+                   for i in range(args.threads)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        ips = [ip['ip_address'] for port in plugin.get_ports(ctx)
+               for ip in port['fixed_ips']]
+        print('threads:       %d' % args.threads)
+        print('ports created: %d' % results['created'])
+        print('failures:      %d %s' % (results['failed'],
+                                        sorted(results['errors'])))
+        print('duplicate IPs: %d' % (len(ips) - len(set(ips))))
+        print('elapsed:       %.2f s' % elapsed)
+        print('ports/sec:     %.1f' % (results['created'] / elapsed))
+    finally:
+        base.cleanup(connection)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Balance and cost of scheduling routers to L3 agents.
+
+--agents L3 agents and --routers routers are inserted in the database, then
+the routers are scheduled by each L3 agent scheduler in batches of --batch
+routers, as when the routers are scheduled on notification. The scheduling
+time and the spread of the number of routers hosted by each agent are
+reported. A temporary SQLite file is used unless a --connection string
+(e.g. to a MySQL server) is given.
+"""
+
+import argparse
+import math
+import time
+
+from oslo.config import cfg
+from sqlalchemy import func
+
+from neutron.common import constants
+from neutron import context
+from neutron.db import agents_db
+from neutron.db import api as db_api
+from neutron.db import db_base_plugin_v2
+from neutron.db import l3_agentschedulers_db
+from neutron.db import l3_db
+from neutron.openstack.common import jsonutils
+from neutron.openstack.common import timeutils
+from neutron.openstack.common import uuidutils
+from neutron.scheduler import l3_agent_scheduler
+from neutron.tests.benchmarks import base
+
+SCHEDULERS = {'chance': l3_agent_scheduler.ChanceScheduler,
+              'least-routers': l3_agent_scheduler.LeastRoutersScheduler}
+
+
+class SchedulingPlugin(db_base_plugin_v2.NeutronDbPluginV2,
+                       l3_db.L3_NAT_db_mixin,
+                       l3_agentschedulers_db.L3AgentSchedulerDbMixin):
+    pass
+
+
+def populate(num_agents, num_routers):
+    session = db_api.get_session()
+    now = timeutils.utcnow()
+    configurations = jsonutils.dumps({'use_namespaces': True})
+    with session.begin():
+        session.execute(agents_db.Agent.__table__.insert(), [
+            {'id': uuidutils.generate_uuid(),
+             'agent_type': constants.AGENT_TYPE_L3,
+             'binary': 'neutron-l3-agent',
+             'topic': 'l3_agent',
+             'host': 'host-%d' % i,
+             'admin_state_up': True,
+             'created_at': now,
+             'started_at': now,
+             'heartbeat_timestamp': now,
+             'configurations': configurations}
+            for i in xrange(num_agents)])
+        session.execute(l3_db.Router.__table__.insert(), [
+            {'id': uuidutils.generate_uuid(),
+             'tenant_id': base.TENANT_ID,
+             'name': 'router-%d' % i,
+             'status': 'ACTIVE',
+             'admin_state_up': True}
+            for i in xrange(num_routers)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--agents', type=int, default=1000)
+    parser.add_argument('--routers', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--schedulers', nargs='+', choices=SCHEDULERS,
+                        default=sorted(SCHEDULERS))
+    parser.add_argument('--connection',
+                        help='Database connection string')
+    args = parser.parse_args()
+
+    connection = base.configure(args.connection)
+    try:
+        # The agents must stay alive while the routers are scheduled
+        cfg.CONF.set_override('agent_down_time', 24 * 3600)
+        plugin = SchedulingPlugin()
+        populate(args.agents, args.routers)
+        admin_context = context.get_admin_context()
+        session = admin_context.session
+        router_ids = [router_id for router_id, in
+                      session.query(l3_db.Router.id)]
+
+        print('%14s %10s %8s %8s %8s' % ('scheduler', 'seconds', 'min',
+                                         'max', 'stddev'))
+        for name in args.schedulers:
+            with session.begin():
+                session.query(
+                    l3_agentschedulers_db.RouterL3AgentBinding).delete()
+            scheduler = SCHEDULERS[name]()
+            start = time.time()
+            for i in xrange(0, len(router_ids), args.batch):
+                scheduler.schedule_routers(plugin, admin_context,
+                                           router_ids[i:i + args.batch])
+            elapsed = time.time() - start
+
+            load = dict((agent_id, 0) for agent_id, in
+                        session.query(agents_db.Agent.id))
+            binding = l3_agentschedulers_db.RouterL3AgentBinding
+            load.update(session.query(
+                binding.l3_agent_id, func.count(binding.router_id)).group_by(
+                    binding.l3_agent_id))
+            counts = load.values()
+            mean = float(sum(counts)) / len(counts)
+            stddev = math.sqrt(sum((count - mean) ** 2 for count in counts) /
+                               len(counts))
+            print('%14s %10.2f %8d %8d %8.2f' % (name, elapsed, min(counts),
+                                                 max(counts), stddev))
+    finally:
+        base.cleanup(connection)
+
+
+if __name__ == '__main__':
+    main()
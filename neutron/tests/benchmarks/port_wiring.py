@@ -0,0 +1,369 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""End to end cost of wiring the ports of booting instances.
+
+The ML2 plugin with the openvswitch and l2population mechanism drivers,
+--agents Open vSwitch agents on as many compute hosts and a DHCP agent are
+run in this process. Their RPC messages are delivered in process by the fake
+RPC driver, and the agents drive fake bridges, firewall and DHCP driver
+instead of Open vSwitch, iptables and dnsmasq.
+
+--ports ports are created on a tenant VXLAN network and bound to the compute
+hosts in turn, as when instances boot. Each agent then treats its new
+devices in batches of --batch devices, as after polling its integration
+bridge. For both steps, the RPC messages and their size, the SQL statements
+and the wall time per port are reported, followed by the RPC methods sorted
+by total size. A temporary SQLite file is used unless a --connection string
+(e.g. to a MySQL server) is given.
+"""
+
+import argparse
+import collections
+import contextlib
+import shutil
+import tempfile
+import time
+
+import mock
+from oslo.config import cfg
+from sqlalchemy import engine
+from sqlalchemy import event
+
+from neutron.agent import dhcp_agent
+from neutron.agent import firewall
+from neutron.agent.linux import dhcp
+from neutron.agent.linux import ovs_lib
+from neutron.api.rpc.agentnotifiers import dhcp_rpc_agent_api
+from neutron.common import topics
+from neutron import context
+from neutron.db import agents_db  # noqa
+from neutron.extensions import portbindings
+from neutron import manager
+from neutron.openstack.common import jsonutils
+from neutron.openstack.common import rpc
+from neutron.plugins.ml2 import config as ml2_config  # noqa
+from neutron.plugins.ml2.drivers import type_vxlan  # noqa
+from neutron.plugins.openvswitch.agent import ovs_neutron_agent
+from neutron import service
+from neutron.tests.benchmarks import base
+
+ML2_PLUGIN = 'neutron.plugins.ml2.plugin.Ml2Plugin'
+FIREWALL_DRIVER = 'neutron.tests.benchmarks.port_wiring.FakeFirewallDriver'
+DHCP_DRIVER = 'neutron.tests.benchmarks.port_wiring.FakeDhcpDriver'
+DHCP_HOST = 'network-0'
+
+
+class FakeBridge(object):
+    """Open vSwitch bridge keeping its ports in memory.
+
+    The flows are counted but not kept.
+    """
+
+    macs = 0
+
+    def __init__(self, br_name, root_helper):
+        self.br_name = br_name
+        self.ofports = {}
+        self.vif_ports = {}
+        self.flow_mods = 0
+
+    def _add_port(self, port_name):
+        if port_name not in self.ofports:
+            self.ofports[port_name] = str(len(self.ofports) + 1)
+        return self.ofports[port_name]
+
+    def plug_vif(self, port_id, mac_address):
+        port_name = 'tap%s' % port_id[:11]
+        self.vif_ports[port_id] = ovs_lib.VifPort(
+            port_name, self._add_port(port_name), port_id, mac_address,
+            self)
+
+    def get_local_port_mac(self):
+        FakeBridge.macs += 1
+        return 'fa:16:3e:%02x:%02x:%02x' % (FakeBridge.macs >> 16,
+                                            (FakeBridge.macs >> 8) & 0xff,
+                                            FakeBridge.macs & 0xff)
+
+    def get_vif_port_by_id(self, port_id):
+        return self.vif_ports.get(port_id)
+
+    def get_vif_port_set(self):
+        return set(self.vif_ports)
+
+    def add_patch_port(self, local_name, remote_name):
+        return self._add_port(local_name)
+
+    def add_tunnel_port(self, port_name, remote_ip, local_ip,
+                        tunnel_type=None, vxlan_udp_port=None):
+        return self._add_port(port_name)
+
+    def add_tunnel_ports(self, tunnels, local_ip, tunnel_type,
+                         vxlan_udp_port):
+        return dict((port_name, self._add_port(port_name))
+                    for port_name in tunnels)
+
+    def add_port(self, port_name):
+        return self._add_port(port_name)
+
+    def delete_port(self, port_name):
+        self.ofports.pop(port_name, None)
+
+    def reset_bridge(self):
+        self.ofports.clear()
+
+    def set_db_attribute(self, table_name, record, column, value):
+        pass
+
+    def add_flow(self, **kwargs):
+        self.flow_mods += 1
+
+    mod_flow = add_flow
+    delete_flows = add_flow
+
+    def remove_all_flows(self):
+        pass
+
+    def defer_apply_on(self):
+        pass
+
+    def defer_apply_off(self):
+        pass
+
+
+class FakeFirewallDriver(firewall.NoopFirewallDriver):
+    """Firewall keeping the filtered ports, so that they are refreshed."""
+
+    def __init__(self):
+        self.filtered_ports = {}
+
+    def prepare_port_filter(self, port):
+        self.filtered_ports[port['device']] = port
+
+    update_port_filter = prepare_port_filter
+
+    def remove_port_filter(self, port):
+        self.filtered_ports.pop(port['device'], None)
+
+    @property
+    def ports(self):
+        return self.filtered_ports
+
+
+class FakeDhcpDriver(dhcp.DhcpBase):
+    """DHCP driver which neither plugs a DHCP port nor runs a server."""
+
+    def __init__(self, conf, network, root_helper='sudo', version=None,
+                 plugin=None):
+        self.conf = conf
+        self.network = network
+
+    def enable(self):
+        pass
+
+    def disable(self, retain_port=False):
+        pass
+
+    @property
+    def active(self):
+        return True
+
+    def release_lease(self, mac_address, removed_ips):
+        pass
+
+    def reload_allocations(self):
+        pass
+
+    @classmethod
+    def check_version(cls):
+        return 0
+
+
+class Meter(object):
+    """Count the RPC messages and SQL statements of a step."""
+
+    def __init__(self):
+        self.reset()
+        event.listen(engine.Engine, 'after_cursor_execute', self._count_sql)
+
+    def reset(self):
+        self.messages = collections.defaultdict(int)
+        self.sizes = collections.defaultdict(int)
+        self.statements = 0
+
+    def _count_sql(self, *args):
+        self.statements += 1
+
+    def wrap_rpc(self, name):
+        func = getattr(rpc, name)
+
+        def wrapper(context, topic, msg, *args, **kwargs):
+            result = func(context, topic, msg, *args, **kwargs)
+            size = len(jsonutils.dumps(msg))
+            if name == 'call':
+                size += len(jsonutils.dumps(result))
+            self.messages[msg['method']] += 1
+            self.sizes[msg['method']] += size
+            return result
+        return mock.patch.object(rpc, name, wrapper)
+
+    def report(self, step, count, elapsed):
+        print('%8s %10.2f %10.2f %10.1f %10.1f %10.1f' % (
+            step, elapsed, elapsed * 1e3 / count,
+            float(sum(self.messages.values())) / count,
+            sum(self.sizes.values()) / 1024.0 / count,
+            float(self.statements) / count))
+
+
+@contextlib.contextmanager
+def on_host(host):
+    """Run agent code as on host, which the agents read from the config."""
+    cfg.CONF.set_override('host', host)
+    try:
+        yield
+    finally:
+        cfg.CONF.clear_override('host')
+
+
+def configure_options(state_path):
+    dhcp_agent.register_options()
+    cfg.CONF.set_override('rpc_backend',
+                          'neutron.openstack.common.rpc.impl_fake')
+    cfg.CONF.set_override('state_path', state_path)
+    # The agents report their state once and must stay alive
+    cfg.CONF.set_override('report_interval', 0, 'AGENT')
+    cfg.CONF.set_override('agent_down_time', 24 * 3600)
+    cfg.CONF.set_override('type_drivers', ['vxlan'], 'ml2')
+    cfg.CONF.set_override('tenant_network_types', ['vxlan'], 'ml2')
+    cfg.CONF.set_override('mechanism_drivers',
+                          ['openvswitch', 'l2population'], 'ml2')
+    cfg.CONF.set_override('vni_ranges', ['1:1000'], 'ml2_type_vxlan')
+    cfg.CONF.set_override('firewall_driver', FIREWALL_DRIVER,
+                          'SECURITYGROUP')
+    cfg.CONF.set_override('dhcp_driver', DHCP_DRIVER)
+
+
+def start_agents(num_agents):
+    agents = []
+    for i in xrange(num_agents):
+        host = 'compute-%d' % i
+        with on_host(host):
+            agent = ovs_neutron_agent.OVSNeutronAgent(
+                'br-int', 'br-tun', '172.16.%d.%d' % (i / 250, i % 250 + 1),
+                {}, 'sudo', 2, tunnel_types=['vxlan'], l2_population=True)
+            agent._report_state()
+        agents.append((host, agent))
+    with on_host(DHCP_HOST):
+        dhcp_service = service.Service(
+            DHCP_HOST, 'neutron-dhcp-agent', topics.DHCP_AGENT,
+            'neutron.agent.dhcp_agent.DhcpAgentWithStateReport')
+        dhcp_service.start()
+        dhcp_service.manager._report_state()
+    return agents
+
+
+def boot_ports(plugin, admin_context, network_id, agents, num_ports):
+    """Create the ports of instances as the API would."""
+    dhcp_notifier = dhcp_rpc_agent_api.DhcpAgentNotifyAPI()
+    ports = []
+    for i in xrange(num_ports):
+        host, agent = agents[i % len(agents)]
+        body = base.port_body(network_id, device_id='instance-%d' % i)
+        body['port']['device_owner'] = 'compute:nova'
+        body['port'][portbindings.HOST_ID] = host
+        port = plugin.create_port(admin_context, body)
+        dhcp_notifier.notify(admin_context, {'port': port},
+                             'port.create.end')
+        agent.int_br.plug_vif(port['id'], port['mac_address'])
+        ports.append(port)
+    return ports
+
+
+def wire_ports(agents, batch):
+    """Treat the new devices of each agent as after polling its bridge."""
+    for host, agent in agents:
+        devices = sorted(agent.int_br.get_vif_port_set())
+        with on_host(host):
+            for i in xrange(0, len(devices), batch):
+                agent.treat_devices_added(devices[i:i + batch])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--agents', type=int, default=10)
+    parser.add_argument('--ports', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=10)
+    parser.add_argument('--connection',
+                        help='Database connection string')
+    args = parser.parse_args()
+
+    connection = base.configure(args.connection, core_plugin=ML2_PLUGIN)
+    state_path = tempfile.mkdtemp()
+    try:
+        configure_options(state_path)
+        with contextlib.nested(
+            mock.patch.object(ovs_lib, 'OVSBridge', FakeBridge),
+            mock.patch.object(ovs_lib, 'get_bridges',
+                              return_value=['br-int', 'br-tun']),
+            mock.patch.object(ovs_neutron_agent, 'check_ovs_version')
+        ):
+            plugin = manager.NeutronManager.get_plugin()
+            admin_context = context.get_admin_context()
+            agents = start_agents(args.agents)
+            network = plugin.create_network(admin_context,
+                                            base.network_body())
+            subnet = plugin.create_subnet(admin_context,
+                                          base.subnet_body(network['id']))
+            dhcp_rpc_agent_api.DhcpAgentNotifyAPI().notify(
+                admin_context, {'subnet': subnet}, 'subnet.create.end')
+
+            meter = Meter()
+            sizes = collections.defaultdict(int)
+            messages = collections.defaultdict(int)
+            print('%8s %10s %10s %10s %10s %10s' % (
+                'step', 'seconds', 'ms/port', 'rpc/port', 'kB/port',
+                'sql/port'))
+            with contextlib.nested(meter.wrap_rpc('call'),
+                                   meter.wrap_rpc('cast'),
+                                   meter.wrap_rpc('fanout_cast')):
+                for step, func, func_args in (
+                        ('boot', boot_ports, (plugin, admin_context,
+                                              network['id'], agents,
+                                              args.ports)),
+                        ('wire', wire_ports, (agents, args.batch))):
+                    meter.reset()
+                    start = time.time()
+                    func(*func_args)
+                    meter.report(step, args.ports, time.time() - start)
+                    for method, size in meter.sizes.iteritems():
+                        sizes[method] += size
+                        messages[method] += meter.messages[method]
+
+            flow_mods = sum(agent.tun_br.flow_mods + agent.int_br.flow_mods
+                            for host, agent in agents)
+            print('\n%.1f flow modifications per port\n' % (
+                float(flow_mods) / args.ports))
+            print('%36s %10s %10s' % ('rpc method', 'messages', 'kB'))
+            for method in sorted(sizes, key=sizes.get, reverse=True):
+                print('%36s %10d %10.1f' % (method, messages[method],
+                                            sizes[method] / 1024.0))
+    finally:
+        base.cleanup(connection)
+        shutil.rmtree(state_path)
+
+
+if __name__ == '__main__':
+    main()
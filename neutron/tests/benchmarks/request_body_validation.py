@@ -0,0 +1,124 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cost of the validation of API request bodies.
+
+The time per call of the validators of neutron.api.v2.attributes is
+reported for typical values, then the time per port taken to check and
+convert the body of bulk port creations with the checks compiled by the
+port controller. --per-request compiles the checks for every request, as
+done when prepare_request_body is called without the checks of a
+controller.
+"""
+
+import argparse
+import copy
+import time
+
+from neutron.api.v2 import attributes
+from neutron.api.v2 import base as api_base
+from neutron.common import config
+from neutron import context
+from neutron.tests.benchmarks import base
+
+UUID = '3f0a2f3e-7bd0-4c1e-9c2b-6a4b1f7f0a52'
+
+VALIDATOR_SAMPLES = [
+    ('type:boolean', True, None),
+    ('type:string', 'bench-port', None),
+    ('type:values', 4, [4, 6]),
+    ('type:non_negative', 10, None),
+    ('type:uuid', UUID, None),
+    ('type:uuid_list', [UUID, UUID.replace('3f', '4f')], None),
+    ('type:regex', UUID, attributes.UUID_PATTERN),
+    ('type:mac_address', 'fa:16:3e:00:00:01', None),
+    ('type:ip_address', '10.0.0.1', None),
+    ('type:subnet', '10.0.0.0/24', None),
+    ('type:nameservers', ['8.8.8.8', '8.8.4.4'], None),
+    ('type:hostroutes', [{'destination': '10.1.0.0/16',
+                          'nexthop': '10.0.0.1'}], None),
+    ('type:ip_pools', [{'start': '10.0.0.2', 'end': '10.0.0.254'}], None),
+    ('type:fixed_ips', [{'subnet_id': UUID, 'ip_address': '10.0.0.5'}],
+     None),
+]
+
+
+def port_item(index):
+    return {'network_id': UUID,
+            'name': 'port-%d' % index,
+            'admin_state_up': True,
+            'mac_address': 'fa:16:3e:00:%02x:%02x' % (index / 256,
+                                                      index % 256),
+            'fixed_ips': [{'subnet_id': UUID,
+                           'ip_address': '10.0.%d.%d' % (index / 256,
+                                                         index % 256)}],
+            'device_id': UUID,
+            'device_owner': 'compute:nova',
+            'tenant_id': base.TENANT_ID}
+
+
+def time_validators(repeat):
+    print('%-20s %10s' % ('validator', 'us/call'))
+    for rule, value, arg in VALIDATOR_SAMPLES:
+        validator = attributes.validators[rule]
+        if validator(value, arg):
+            raise ValueError(_('Invalid sample for %s') % rule)
+        start = time.time()
+        for i in xrange(repeat):
+            validator(value, arg)
+        print('%-20s %10.2f' % (rule, (time.time() - start) * 1e6 / repeat))
+
+
+def time_bulk_body(controller, ctx, count, per_request):
+    body = {'ports': [port_item(i) for i in xrange(count)]}
+    # Bodies are converted in place
+    body = copy.deepcopy(body)
+    body_checks = None
+    if not per_request:
+        body_checks = controller._body_checks[True]
+    start = time.time()
+    api_base.Controller.prepare_request_body(
+        ctx, body, True, 'port', attributes.RESOURCE_ATTRIBUTE_MAP['ports'],
+        allow_bulk=True, body_checks=body_checks)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ports', type=int, nargs='+',
+                        default=[100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=10000,
+                        help='Calls per validator')
+    parser.add_argument('--per-request', action='store_true',
+                        help='Compile the checks for every request')
+    args = parser.parse_args()
+
+    config.parse(args=[])
+    time_validators(args.repeat)
+    print('')
+    controller = api_base.Controller(
+        None, 'ports', 'port', attributes.RESOURCE_ATTRIBUTE_MAP['ports'],
+        allow_bulk=True)
+    ctx = context.get_admin_context_without_session()
+    print('%8s %10s %12s' % ('ports', 'total ms', 'us/port'))
+    for count in args.ports:
+        elapsed = time_bulk_body(controller, ctx, count, args.per_request)
+        print('%8d %10.2f %12.2f' % (count, elapsed * 1e3,
+                                     elapsed * 1e6 / count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cost of the VXLAN VNI allocations of the ML2 type driver.
+
+For each size of VNI range, the time taken to synchronize the allocations
+table at startup is reported, followed by the time taken to allocate and to
+release the VNIs of --segments tenant networks. A temporary SQLite file is
+used unless a --connection string (e.g. to a MySQL server) is given.
+"""
+
+import argparse
+import time
+
+from oslo.config import cfg
+
+from neutron.db import api as db_api
+from neutron.plugins.ml2.drivers import type_vxlan
+from neutron.tests.benchmarks import base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--vnis', type=int, nargs='+',
+                        default=[1000, 100000, 16000000])
+    parser.add_argument('--segments', type=int, default=1000)
+    parser.add_argument('--connection',
+                        help='Database connection string')
+    args = parser.parse_args()
+
+    print('%10s %10s %14s %14s' % ('vnis', 'sync s', 'allocate ms',
+                                   'release ms'))
+    for count in args.vnis:
+        connection = base.configure(args.connection)
+        try:
+            cfg.CONF.set_override('vni_ranges', ['1:%d' % count],
+                                  'ml2_type_vxlan')
+            db_api.configure_db()
+            driver = type_vxlan.VxlanTypeDriver()
+            start = time.time()
+            driver.initialize()
+            sync = time.time() - start
+
+            session = db_api.get_session()
+            start = time.time()
+            segments = [driver.allocate_tenant_segment(session)
+                        for i in xrange(args.segments)]
+            allocate = time.time() - start
+            start = time.time()
+            for segment in segments:
+                driver.release_segment(session, segment)
+            release = time.time() - start
+            print('%10d %10.2f %14.2f %14.2f' % (
+                count, sync, allocate * 1e3 / args.segments,
+                release * 1e3 / args.segments))
+        finally:
+            base.cleanup(connection)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,8 @@
 # @author: Francois Eleouet, Orange
 # @author: Mathieu Rohon, Orange
 
+import contextlib
+
 import mock
 
 from neutron.common import constants
@@ -30,6 +32,8 @@ from neutron import manager
 from neutron.openstack.common import timeutils
 from neutron.plugins.ml2 import config as config
 from neutron.plugins.ml2.drivers.l2pop import constants as l2_consts
+from neutron.plugins.ml2.drivers.l2pop import db as l2pop_db
+from neutron.plugins.ml2.drivers.l2pop import rpc as l2pop_rpc
 from neutron.plugins.ml2 import managers
 from neutron.plugins.ml2 import rpc
 from neutron.tests.unit import test_db_plugin as test_plugin
@@ -550,3 +554,91 @@ class TestL2PopulationRpcTestCase(test_plugin.NeutronDbPluginV2TestCase):
 
                 self.assertFalse(mock_fanout.called)
                 fanout_patch.stop()
+
+    def test_fdb_add_coalesced(self):
+        config.cfg.CONF.set_override('notify_interval', 1, 'l2pop')
+        notifier = l2pop_rpc.L2populationAgentNotify
+        self.addCleanup(notifier.flush_fanouts, self.adminContext)
+        self._register_ml2_agents()
+
+        with self.subnet(network=self._network) as subnet:
+            host_arg = {portbindings.HOST_ID: HOST}
+            with contextlib.nested(
+                self.port(subnet=subnet, arg_list=(portbindings.HOST_ID,),
+                          **host_arg),
+                self.port(subnet=subnet, arg_list=(portbindings.HOST_ID,),
+                          **host_arg)) as (port1, port2):
+                p1 = port1['port']
+                p2 = port2['port']
+
+                self.mock_fanout.reset_mock()
+                with mock.patch.object(l2pop_rpc.eventlet,
+                                       'spawn_after') as spawn_after:
+                    for port in (p1, p2):
+                        self.callbacks.update_device_up(
+                            self.adminContext, agent_id=HOST,
+                            device='tap' + port['id'])
+                    self.assertFalse(self.mock_fanout.called)
+                    spawn_after.assert_called_once_with(
+                        1, notifier.flush_fanouts, mock.ANY)
+
+                notifier.flush_fanouts(self.adminContext)
+                p1_ips = [p['ip_address'] for p in p1['fixed_ips']]
+                p2_ips = [p['ip_address'] for p in p2['fixed_ips']]
+                expected = {'args':
+                            {'fdb_entries':
+                             {p1['network_id']:
+                              {'ports':
+                               {'20.0.0.1': [[p1['mac_address'], p1_ips[0]],
+                                             [p2['mac_address'],
+                                              p2_ips[0]]]},
+                               'network_type': 'vxlan',
+                               'segment_id': 1}}},
+                            'namespace': None,
+                            'method': 'add_fdb_entries'}
+                self.mock_fanout.assert_called_once_with(
+                    mock.ANY, expected, topic=self.fanout_topic)
+
+    def test_network_fdb_cached(self):
+        config.cfg.CONF.set_override('fdb_cache_time', 60, 'l2pop')
+        self._register_ml2_agents()
+
+        with self.subnet(network=self._network) as subnet:
+            with contextlib.nested(
+                self.port(subnet=subnet, arg_list=(portbindings.HOST_ID,),
+                          **{portbindings.HOST_ID: HOST + '_2'}),
+                self.port(subnet=subnet, arg_list=(portbindings.HOST_ID,),
+                          **{portbindings.HOST_ID: HOST})) as (port1, port2):
+                p1 = port1['port']
+                p2 = port2['port']
+
+                with mock.patch.object(
+                    l2pop_db.L2populationDbMixin, 'get_network_ports',
+                    side_effect=l2pop_db.L2populationDbMixin.get_network_ports,
+                    autospec=True) as get_network_ports:
+                    self.callbacks.update_device_up(
+                        self.adminContext, agent_id=HOST + '_2',
+                        device='tap' + p1['id'])
+                    self.mock_cast.reset_mock()
+                    self.callbacks.update_device_up(
+                        self.adminContext, agent_id=HOST,
+                        device='tap' + p2['id'])
+                self.assertEqual(1, get_network_ports.call_count)
+
+                p1_ips = [p['ip_address'] for p in p1['fixed_ips']]
+                expected = {'args':
+                            {'fdb_entries':
+                             {p1['network_id']:
+                              {'ports':
+                               {'20.0.0.2': [constants.FLOODING_ENTRY,
+                                             [p1['mac_address'],
+                                              p1_ips[0]]]},
+                               'network_type': 'vxlan',
+                               'segment_id': 1}}},
+                            'namespace': None,
+                            'method': 'add_fdb_entries'}
+                topic = topics.get_topic_name(topics.AGENT,
+                                              topics.L2POPULATION,
+                                              topics.UPDATE, HOST)
+                self.mock_cast.assert_called_with(mock.ANY, expected,
+                                                  topic=topic)
@@ -13,11 +13,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+
+import mock
+
+from neutron.common import constants as const
+from neutron import context
 from neutron.extensions import multiprovidernet as mpnet
 from neutron.extensions import portbindings
 from neutron.extensions import providernet as pnet
+from neutron import manager
 from neutron.plugins.ml2 import config
 from neutron.tests.unit import _test_extension_portbindings as test_bindings
+from neutron.tests.unit.ml2 import test_postcommit
 from neutron.tests.unit import test_db_plugin as test_plugin
 from neutron.tests.unit import test_extension_extradhcpopts as test_dhcpopts
 from neutron.tests.unit import test_security_groups_rpc as test_sg_rpc
@@ -74,6 +82,147 @@ class TestMl2PortsV2(test_plugin.TestPortsV2, Ml2PluginV2TestCase):
             self.assertEqual(port['port']['status'], 'DOWN')
             self.assertEqual(self.port_create_status, 'DOWN')
 
+    def test_create_ports_bulk_allocates_in_batch(self):
+        plugin = manager.NeutronManager.get_plugin()
+        with self.subnet() as subnet:
+            with contextlib.nested(
+                mock.patch.object(plugin, '_generate_mac'),
+                mock.patch.object(plugin, '_generate_ip'),
+                mock.patch.object(plugin.mechanism_manager,
+                                  'create_port_postcommit')
+            ) as (generate_mac, generate_ip, postcommit):
+                res = self._create_port_bulk(self.fmt, 3,
+                                             subnet['subnet']['network_id'],
+                                             'test', True)
+                ports = self.deserialize(self.fmt, res)['ports']
+                self.assertEqual(len(ports), 3)
+                self.assertFalse(generate_mac.called)
+                self.assertFalse(generate_ip.called)
+                self.assertEqual(postcommit.call_count, 3)
+            for port in ports:
+                self.assertEqual(port['status'], 'DOWN')
+                self._delete('ports', port['id'])
+
+
+class TestMl2ListStatements(Ml2PluginV2TestCase):
+
+    def test_list_ports(self):
+        self._assert_list_statements_constant('ports', self.port)
+
+    def test_list_networks(self):
+        self._assert_list_statements_constant('networks', self.network)
+
+
+class TestMl2PortStatus(Ml2PluginV2TestCase):
+
+    def setUp(self):
+        super(TestMl2PortStatus, self).setUp()
+        self.plugin = manager.NeutronManager.get_plugin()
+        self.context = context.get_admin_context()
+
+    def _get_status(self, port):
+        return self._show('ports', port['port']['id'])['port']['status']
+
+    def _update_ports_status(self, port_ids, host=None):
+        with mock.patch.object(self.plugin.mechanism_manager,
+                               'update_port_status_postcommit') as notify:
+            existing = self.plugin.update_ports_status(
+                self.context, port_ids, const.PORT_STATUS_ACTIVE, host)
+        return existing, [call[0] for call in notify.call_args_list]
+
+    def test_update_ports_status(self):
+        with self.subnet() as subnet:
+            with contextlib.nested(self.port(subnet=subnet),
+                                   self.port(subnet=subnet)) as ports:
+                port_ids = [ports[0]['port']['id'],
+                            ports[1]['port']['id'][:11], 'missing']
+                existing, calls = self._update_ports_status(port_ids)
+                self.assertEqual(port_ids[:2], existing)
+                for port in ports:
+                    self.assertEqual(const.PORT_STATUS_ACTIVE,
+                                     self._get_status(port))
+                self.assertEqual(2, len(calls))
+                for status_context, port_context in calls:
+                    self.assertEqual(const.PORT_STATUS_DOWN,
+                                     status_context.original_status)
+                    self.assertEqual(const.PORT_STATUS_ACTIVE,
+                                     status_context.current['status'])
+                    self.assertEqual(status_context.current['id'],
+                                     port_context.current['id'])
+                    self.assertEqual(const.PORT_STATUS_DOWN,
+                                     port_context.original['status'])
+
+                existing, calls = self._update_ports_status(port_ids[:1])
+                self.assertEqual(port_ids[:1], existing)
+                self.assertEqual([], calls)
+
+    def test_update_ports_status_changes_etag(self):
+        with self.port() as port:
+            port_id = port['port']['id']
+            etag = self.new_show_request('ports', port_id).get_response(
+                self.api).etag
+            self._update_ports_status([port_id])
+            req = self.new_show_request('ports', port_id)
+            req.headers['If-None-Match'] = '"%s"' % etag
+            res = req.get_response(self.api)
+            self.assertEqual(200, res.status_int)
+            self.assertEqual(const.PORT_STATUS_ACTIVE,
+                             self.deserialize(self.fmt, res)['port']['status'])
+
+    def test_update_ports_status_without_port_contexts(self):
+        with self.port() as port:
+            with contextlib.nested(
+                mock.patch.object(self.plugin.mechanism_manager,
+                                  'port_update_drivers', []),
+                mock.patch.object(self.plugin, 'get_network')
+            ) as (drivers, get_network):
+                existing, calls = self._update_ports_status(
+                    [port['port']['id']])
+            self.assertFalse(get_network.called)
+            self.assertEqual(1, len(calls))
+            self.assertIsNone(calls[0][1])
+            self.assertEqual(const.PORT_STATUS_ACTIVE,
+                             self._get_status(port))
+
+    def test_update_ports_status_other_host(self):
+        with self.port() as port:
+            existing, calls = self._update_ports_status(
+                [port['port']['id']], host='other')
+            self.assertEqual([port['port']['id']], existing)
+            self.assertEqual([], calls)
+            self.assertEqual(const.PORT_STATUS_DOWN, self._get_status(port))
+
+
+class TestMl2AsyncPostcommit(Ml2PluginV2TestCase):
+
+    def setUp(self):
+        config.cfg.CONF.set_override('async_postcommit_drivers', ['test'],
+                                     group='ml2')
+        config.cfg.CONF.set_override('postcommit_max_retries', 0,
+                                     group='ml2')
+        super(TestMl2AsyncPostcommit, self).setUp()
+        mechanism_manager = manager.NeutronManager.get_plugin(
+        ).mechanism_manager
+        self.postcommit_queue = mechanism_manager.postcommit_queues['test']
+        self.addCleanup(test_postcommit.wait_for_queue,
+                        self.postcommit_queue)
+
+    def test_postcommit_calls_queued(self):
+        with mock.patch.object(self.postcommit_queue, 'submit') as submit:
+            with self.port():
+                methods = [call[0][0] for call in submit.call_args_list]
+                self.assertEqual(['create_network_postcommit',
+                                  'create_subnet_postcommit',
+                                  'create_port_postcommit'], methods)
+
+    def test_postcommit_calls_made(self):
+        with self.port():
+            pass
+        test_postcommit.wait_for_queue(self.postcommit_queue)
+        stats = self.postcommit_queue.get_stats()
+        # The network, subnet and port are created and deleted
+        self.assertEqual((6, 0), (stats['completed'], stats['failed']))
+
 
 class TestMl2PortBinding(Ml2PluginV2TestCase,
                          test_bindings.PortBindingsTestCase):
@@ -167,6 +316,41 @@ class TestMultiSegmentNetworks(Ml2PluginV2TestCase):
                           pnet.SEGMENTATION_ID]:
                 self.assertEqual(tz.get(field), tz.get(field))
 
+    def _create_vlan_networks(self):
+        for name, segments in (('net1', [1]), ('net2', [2, 3])):
+            data = {'network': {'name': name,
+                                mpnet.SEGMENTS:
+                                [{pnet.NETWORK_TYPE: 'vlan',
+                                  pnet.PHYSICAL_NETWORK: 'physnet1',
+                                  pnet.SEGMENTATION_ID: segmentation_id}
+                                 for segmentation_id in segments],
+                                'tenant_id': 'tenant_one'}}
+            network_req = self.new_create_request('networks', data)
+            res = network_req.get_response(self.api)
+            self.assertEqual(201, res.status_int)
+
+    def test_list_networks_provider_filters(self):
+        self._create_vlan_networks()
+        for params, expected in (
+                ('%s=vlan' % pnet.NETWORK_TYPE, ['net1', 'net2']),
+                ('%s=flat' % pnet.NETWORK_TYPE, []),
+                ('%s=3' % pnet.SEGMENTATION_ID, ['net2']),
+                ('%s=physnet1&%s=1' % (pnet.PHYSICAL_NETWORK,
+                                       pnet.SEGMENTATION_ID), ['net1'])):
+            req = self.new_list_request('networks', params=params)
+            networks = self.deserialize(self.fmt,
+                                        req.get_response(self.api))
+            self.assertEqual(expected, sorted(net['name'] for net in
+                                              networks['networks']))
+
+    def test_list_networks_provider_filters_ignored_for_users(self):
+        self._create_vlan_networks()
+        ctx = context.Context('', 'tenant_one')
+        networks = self._list('networks', neutron_context=ctx,
+                              query_params='%s=3' % pnet.SEGMENTATION_ID)
+        self.assertEqual(['net1', 'net2'], sorted(net['name'] for net in
+                                                  networks['networks']))
+
     def test_create_network_with_provider_and_multiprovider_fail(self):
         data = {'network': {'name': 'net1',
                             mpnet.SEGMENTS:
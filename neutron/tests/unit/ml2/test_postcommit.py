@@ -0,0 +1,147 @@
+# Copyright (c) 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+from oslo.config import cfg
+
+from neutron.db import api as db_api
+from neutron.extensions import portbindings
+from neutron.openstack.common import jsonutils
+from neutron.plugins.ml2.common import exceptions as ml2_exc
+from neutron.plugins.ml2 import db as ml2_db
+from neutron.plugins.ml2 import driver_api as api
+from neutron.plugins.ml2 import postcommit
+from neutron.tests import base
+
+
+def wait_for_queue(postcommit_queue):
+    for i in xrange(1000):
+        if not postcommit_queue.backlog:
+            return
+        eventlet.sleep(0)
+    raise AssertionError('postcommit queue not drained')
+
+
+def network_snapshot(network_id, name=''):
+    return {'network': {'id': network_id, 'name': name},
+            'original_network': None,
+            'network_segments': [{api.ID: 'segment-id',
+                                  api.NETWORK_TYPE: 'local',
+                                  api.PHYSICAL_NETWORK: None,
+                                  api.SEGMENTATION_ID: None}]}
+
+
+class PostcommitQueueTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(PostcommitQueueTestCase, self).setUp()
+        ml2_db.initialize()
+        self.addCleanup(db_api.clear_db)
+        self.driver = mock.Mock()
+        self.driver.name = 'fake'
+        self.plugin = mock.Mock()
+        self.session = db_api.get_session()
+
+    def _queue(self, workers=2, max_retries=2):
+        postcommit_queue = postcommit.PostcommitQueue(
+            self.driver, self.plugin, workers, max_retries, 0)
+        # Workers must not outlive the database of the test
+        self.addCleanup(wait_for_queue, postcommit_queue)
+        return postcommit_queue
+
+    def _journal(self):
+        return ml2_db.get_postcommit_jobs(self.session, cfg.CONF.host)
+
+    def test_calls_ordered_for_each_network(self):
+        calls = []
+
+        def create_network_postcommit(context):
+            calls.append(context.current['name'])
+            # Let the other worker run
+            eventlet.sleep(0)
+
+        self.driver.obj.create_network_postcommit = create_network_postcommit
+        postcommit_queue = self._queue()
+        for name in ('a1', 'b1', 'a2', 'b2', 'a3'):
+            postcommit_queue.submit('create_network_postcommit',
+                                    network_snapshot(name[0], name))
+
+        wait_for_queue(postcommit_queue)
+        self.assertEqual(['a1', 'a2', 'a3'],
+                         [name for name in calls if name[0] == 'a'])
+        self.assertEqual(['b1', 'b2'],
+                         [name for name in calls if name[0] == 'b'])
+        self.assertEqual([], self._journal())
+        self.assertEqual(5, postcommit_queue.get_stats()['completed'])
+
+    def test_failed_call_retried(self):
+        method = self.driver.obj.delete_network_postcommit
+        method.side_effect = [Exception(), Exception(), None]
+        postcommit_queue = self._queue()
+        postcommit_queue.submit('delete_network_postcommit',
+                                network_snapshot('net'))
+        wait_for_queue(postcommit_queue)
+        self.assertEqual(3, method.call_count)
+        stats = postcommit_queue.get_stats()
+        self.assertEqual((1, 0), (stats['completed'], stats['failed']))
+        self.assertEqual([], self._journal())
+
+    def test_failed_call_dropped(self):
+        method = self.driver.obj.delete_network_postcommit
+        method.side_effect = Exception()
+        postcommit_queue = self._queue(max_retries=1)
+        postcommit_queue.submit('delete_network_postcommit',
+                                network_snapshot('net'))
+        wait_for_queue(postcommit_queue)
+        self.assertEqual(2, method.call_count)
+        self.assertEqual(1, postcommit_queue.get_stats()['failed'])
+        self.assertEqual([], self._journal())
+
+    def test_recover(self):
+        snapshot = network_snapshot('net', 'journaled')
+        for driver in ('fake', 'other'):
+            ml2_db.add_postcommit_job(self.session, cfg.CONF.host, driver,
+                                      'create_network_postcommit',
+                                      jsonutils.dumps(snapshot))
+        postcommit_queue = self._queue()
+        postcommit.recover({'fake': postcommit_queue})
+        wait_for_queue(postcommit_queue)
+        context = self.driver.obj.create_network_postcommit.call_args[0][0]
+        self.assertEqual(snapshot['network'], context.current)
+        self.assertEqual(snapshot['network_segments'],
+                         context.network_segments)
+        self.assertEqual([], self._journal())
+
+    def test_port_snapshot_uses_plugin(self):
+        snapshot = {'port': {'id': 'port', 'network_id': 'net',
+                             portbindings.HOST_ID: 'host'},
+                    'original_port': None,
+                    'network': network_snapshot('net'),
+                    'bound_segment': None}
+        postcommit_queue = self._queue()
+        postcommit_queue.submit('create_port_postcommit', snapshot)
+        wait_for_queue(postcommit_queue)
+        context = self.driver.obj.create_port_postcommit.call_args[0][0]
+        self.assertIs(self.plugin, context._plugin)
+        self.assertTrue(context._plugin_context.is_admin)
+        self.assertIs(self.plugin, context.network._plugin)
+
+        context.host_agents('agent-type')
+        self.plugin.get_agents.assert_called_once_with(
+            context._plugin_context,
+            filters={'agent_type': ['agent-type'], 'host': ['host']})
+        self.assertRaises(ml2_exc.AsynchronousPortBinding,
+                          context.set_binding, 'segment-id', 'ovs', True)
@@ -40,6 +40,7 @@ class GreTypeTest(base.BaseTestCase):
         self.driver.gre_id_ranges = TUNNEL_RANGES
         self.driver._sync_gre_allocations()
         self.session = db.get_session()
+        self.addCleanup(db.clear_db)
 
     def test_validate_provider_segment(self):
         segment = {api.NETWORK_TYPE: 'gre',
@@ -53,59 +54,38 @@ class GreTypeTest(base.BaseTestCase):
         with testtools.ExpectedException(exc.InvalidInput):
             self.driver.validate_provider_segment(segment)
 
+    def _add_allocation(self, tunnel_id, allocated=True):
+        with self.session.begin():
+            self.session.add(type_gre.GreAllocation(gre_id=tunnel_id,
+                                                    allocated=allocated))
+
     def test_sync_tunnel_allocations(self):
+        self._add_allocation(TUN_MIN, allocated=False)
+        self._add_allocation(TUN_MIN + 1)
+        self.driver.gre_id_ranges = UPDATED_TUNNEL_RANGES
+        self.driver._sync_gre_allocations()
+
         self.assertIsNone(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MIN - 1))
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MIN)).allocated
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MIN + 1)).allocated
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MAX - 1)).allocated
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MAX)).allocated
-        )
-        self.assertIsNone(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MAX + 1))
-        )
+            self.driver.get_gre_allocation(self.session, TUN_MIN))
+        alloc = self.driver.get_gre_allocation(self.session, TUN_MIN + 1)
+        self.assertTrue(alloc.allocated)
+        for tunnel_id in xrange(TUN_MIN + 5, TUN_MAX + 5 + 1):
+            self.assertIsNone(
+                self.driver.get_gre_allocation(self.session, tunnel_id))
 
+    def test_allocate_tenant_segment_after_range_update(self):
+        self._add_allocation(TUN_MAX + 1)
         self.driver.gre_id_ranges = UPDATED_TUNNEL_RANGES
         self.driver._sync_gre_allocations()
 
-        self.assertIsNone(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MIN + 5 - 1))
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MIN + 5)).allocated
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MIN + 5 + 1)).allocated
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MAX + 5 - 1)).allocated
-        )
-        self.assertFalse(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MAX + 5)).allocated
-        )
-        self.assertIsNone(
-            self.driver.get_gre_allocation(self.session,
-                                           (TUN_MAX + 5 + 1))
-        )
+        tunnel_ids = set()
+        for x in xrange(TUN_MIN + 5, TUN_MAX + 5):
+            segment = self.driver.allocate_tenant_segment(self.session)
+            tunnel_ids.add(segment[api.SEGMENTATION_ID])
+        self.assertIsNone(self.driver.allocate_tenant_segment(self.session))
+        expected = set(xrange(TUN_MIN + 5, TUN_MAX + 5 + 1))
+        expected.remove(TUN_MAX + 1)
+        self.assertEqual(expected, tunnel_ids)
 
     def test_reserve_provider_segment(self):
         segment = {api.NETWORK_TYPE: 'gre',
@@ -122,7 +102,7 @@ class GreTypeTest(base.BaseTestCase):
         self.driver.release_segment(self.session, segment)
         alloc = self.driver.get_gre_allocation(self.session,
                                                segment[api.SEGMENTATION_ID])
-        self.assertFalse(alloc.allocated)
+        self.assertIsNone(alloc)
 
         segment[api.SEGMENTATION_ID] = 1000
         self.driver.reserve_provider_segment(self.session, segment)
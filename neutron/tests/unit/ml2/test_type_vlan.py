@@ -0,0 +1,184 @@
+# Copyright (c) 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+import mock
+import testtools
+
+from neutron.common import exceptions as exc
+import neutron.db.api as db
+from neutron.openstack.common.db import exception as db_exc
+from neutron.plugins.ml2 import db as ml2_db
+from neutron.plugins.ml2 import driver_api as api
+from neutron.plugins.ml2.drivers import helpers
+from neutron.plugins.ml2.drivers import type_vlan
+from neutron.tests import base
+
+PROVIDER_NET = 'phys_net1'
+TENANT_NET = 'phys_net2'
+VLAN_MIN = 200
+VLAN_MAX = 209
+NETWORK_VLAN_RANGES = {PROVIDER_NET: [],
+                       TENANT_NET: [(VLAN_MIN, VLAN_MAX)]}
+
+
+class VlanTypeTest(base.BaseTestCase):
+
+    def setUp(self):
+        super(VlanTypeTest, self).setUp()
+        ml2_db.initialize()
+        self.driver = type_vlan.VlanTypeDriver()
+        self.driver.network_vlan_ranges = NETWORK_VLAN_RANGES
+        self.driver._sync_vlan_allocations()
+        self.session = db.get_session()
+        self.addCleanup(db.clear_db)
+
+    def _segment(self, physical_network, vlan_id):
+        return {api.NETWORK_TYPE: 'vlan',
+                api.PHYSICAL_NETWORK: physical_network,
+                api.SEGMENTATION_ID: vlan_id}
+
+    def test_sync_vlan_allocations(self):
+        with self.session.begin():
+            for vlan_id, allocated in ((VLAN_MIN, False), (VLAN_MAX, True)):
+                self.session.add(type_vlan.VlanAllocation(
+                    physical_network=TENANT_NET, vlan_id=vlan_id,
+                    allocated=allocated))
+        self.driver._sync_vlan_allocations()
+
+        self.assertIsNone(
+            self.driver.get_vlan_allocation(self.session, TENANT_NET,
+                                            VLAN_MIN))
+        self.assertTrue(
+            self.driver.get_vlan_allocation(self.session, TENANT_NET,
+                                            VLAN_MAX).allocated)
+
+    def test_reserve_provider_segment(self):
+        for vlan_id in (VLAN_MIN, VLAN_MAX + 1):
+            segment = self._segment(TENANT_NET, vlan_id)
+            self.driver.reserve_provider_segment(self.session, segment)
+            alloc = self.driver.get_vlan_allocation(self.session,
+                                                    TENANT_NET, vlan_id)
+            self.assertTrue(alloc.allocated)
+
+            with testtools.ExpectedException(exc.VlanIdInUse):
+                self.driver.reserve_provider_segment(self.session, segment)
+
+            self.driver.release_segment(self.session, segment)
+            self.assertIsNone(
+                self.driver.get_vlan_allocation(self.session, TENANT_NET,
+                                                vlan_id))
+
+    def test_allocate_tenant_segment(self):
+        self.driver.reserve_provider_segment(
+            self.session, self._segment(TENANT_NET, VLAN_MIN + 1))
+        vlan_ids = set()
+        for x in xrange(VLAN_MIN + 1, VLAN_MAX + 1):
+            segment = self.driver.allocate_tenant_segment(self.session)
+            self.assertEqual(TENANT_NET, segment[api.PHYSICAL_NETWORK])
+            vlan_ids.add(segment[api.SEGMENTATION_ID])
+        self.assertIsNone(self.driver.allocate_tenant_segment(self.session))
+        expected = set(xrange(VLAN_MIN, VLAN_MAX + 1))
+        expected.remove(VLAN_MIN + 1)
+        self.assertEqual(expected, vlan_ids)
+
+        segment = self._segment(TENANT_NET, VLAN_MAX)
+        self.driver.release_segment(self.session, segment)
+        self.assertEqual(segment,
+                         self.driver.allocate_tenant_segment(self.session))
+
+    def test_allocate_tenant_segment_random(self):
+        with mock.patch.object(helpers.random, 'randrange',
+                               return_value=5) as randrange:
+            segment = self.driver.allocate_tenant_segment(self.session)
+        randrange.assert_called_once_with(VLAN_MAX - VLAN_MIN + 1)
+        self.assertEqual(VLAN_MIN + 5, segment[api.SEGMENTATION_ID])
+
+    def _fail_first_flush(self):
+        # The first allocation flushed is a duplicate of one committed by a
+        # concurrent transaction
+        flush = self.session.flush
+        errors = [db_exc.DBDuplicateEntry(['vlan_id'])]
+
+        def first_flush_fails(*args, **kwargs):
+            if errors and self.session.new:
+                raise errors.pop()
+            return flush(*args, **kwargs)
+        return mock.patch.object(self.session, 'flush',
+                                 side_effect=first_flush_fails)
+
+    def test_allocate_tenant_segment_concurrently_allocated(self):
+        with contextlib.nested(
+            mock.patch.object(helpers, 'choose_free_id',
+                              side_effect=[(TENANT_NET, VLAN_MIN),
+                                           (TENANT_NET, VLAN_MAX)]),
+            self._fail_first_flush()
+        ) as (choose_free_id, flush):
+            segment = self.driver.allocate_tenant_segment(self.session)
+        self.assertEqual(self._segment(TENANT_NET, VLAN_MAX), segment)
+        pools = choose_free_id.call_args[0][0]
+        self.assertEqual(VLAN_MAX - VLAN_MIN, pools[TENANT_NET].count)
+        self.assertIsNone(self.driver.get_vlan_allocation(
+            self.session, TENANT_NET, VLAN_MIN))
+        self.assertTrue(self.driver.get_vlan_allocation(
+            self.session, TENANT_NET, VLAN_MAX).allocated)
+
+    def test_reserve_provider_segment_concurrently_allocated(self):
+        segment = self._segment(TENANT_NET, VLAN_MIN)
+        with self._fail_first_flush():
+            with testtools.ExpectedException(exc.VlanIdInUse):
+                self.driver.reserve_provider_segment(self.session, segment)
+            self.assertIsNone(self.driver.get_vlan_allocation(
+                self.session, TENANT_NET, VLAN_MIN))
+            self.driver.reserve_provider_segment(self.session, segment)
+        self.assertTrue(self.driver.get_vlan_allocation(
+            self.session, TENANT_NET, VLAN_MIN).allocated)
+
+
+class FreeIdsTest(base.BaseTestCase):
+
+    def test_merge_ranges(self):
+        self.assertEqual([(1, 10), (20, 30)],
+                         helpers.merge_ranges([(20, 25), (1, 5), (6, 8),
+                                               (2, 10), (24, 30)]))
+
+    def test_free_ids(self):
+        free = helpers.FreeIds([(10, 14), (20, 22), (12, 15)],
+                               [5, 10, 12, 13, 21, 30])
+        self.assertEqual(5, free.count)
+        self.assertEqual([11, 14, 15, 20, 22],
+                         [free.get(index) for index in xrange(free.count)])
+        self.assertRaises(IndexError, free.get, free.count)
+
+    def test_free_ids_add_allocated(self):
+        free = helpers.FreeIds([(10, 14)], [12])
+        for segmentation_id in (11, 12, 20):
+            free.add_allocated(segmentation_id)
+        self.assertEqual(3, free.count)
+        self.assertEqual([10, 13, 14],
+                         [free.get(index) for index in xrange(free.count)])
+
+    def test_choose_free_id(self):
+        pools = {'a': helpers.FreeIds([(1, 3)], [2]),
+                 'b': helpers.FreeIds([(1, 2)], [])}
+        with mock.patch.object(helpers.random, 'randrange',
+                               return_value=2) as randrange:
+            self.assertEqual(('b', 1), helpers.choose_free_id(pools))
+        randrange.assert_called_once_with(4)
+
+    def test_choose_free_id_none_free(self):
+        self.assertIsNone(helpers.choose_free_id(
+            {None: helpers.FreeIds([(1, 2)], [1, 2])}))
@@ -982,6 +982,59 @@ class OvsAgentSchedulerTestCase(OvsAgentSchedulerTestCaseBase):
                 admin_context=False)
 
 
+class OvsLeastLoadedSchedulerTestCase(OvsAgentSchedulerTestCaseBase):
+
+    def setUp(self):
+        cfg.CONF.set_override(
+            'network_scheduler_driver',
+            'neutron.scheduler.dhcp_agent_scheduler.LeastNetworksScheduler')
+        cfg.CONF.set_override(
+            'router_scheduler_driver',
+            'neutron.scheduler.l3_agent_scheduler.LeastRoutersScheduler')
+        super(OvsLeastLoadedSchedulerTestCase, self).setUp()
+        self._register_agent_states()
+        self.plugin = manager.NeutronManager.get_plugin()
+
+    def _count_routers_hosted(self, host):
+        agent_id = self._get_agent_id(constants.AGENT_TYPE_L3, host)
+        return len(self._list_routers_hosted_by_l3_agent(
+            agent_id)['routers'])
+
+    def test_schedule_routers_balanced(self):
+        with contextlib.nested(self.router(), self.router(), self.router(),
+                               self.router()) as routers:
+            router_ids = [router['router']['id'] for router in routers]
+            self.plugin.add_router_to_l3_agent(
+                self.adminContext,
+                self._get_agent_id(constants.AGENT_TYPE_L3, L3_HOSTA),
+                router_ids[0])
+            chosen_agents = self.plugin.schedule_routers(self.adminContext,
+                                                         router_ids)
+            self.assertEqual(3, len(chosen_agents))
+            self.assertEqual(2, self._count_routers_hosted(L3_HOSTA))
+            self.assertEqual(2, self._count_routers_hosted(L3_HOSTB))
+
+    def test_schedule_router_to_least_loaded_agent(self):
+        with contextlib.nested(self.router(), self.router()) as routers:
+            self.plugin.add_router_to_l3_agent(
+                self.adminContext,
+                self._get_agent_id(constants.AGENT_TYPE_L3, L3_HOSTA),
+                routers[0]['router']['id'])
+            chosen_agent = self.plugin.schedule_router(
+                self.adminContext, routers[1]['router']['id'])
+            self.assertEqual(L3_HOSTB, chosen_agent['host'])
+
+    def test_schedule_network_to_least_loaded_agent(self):
+        with contextlib.nested(self.network(), self.network()) as networks:
+            hosta_id = self._get_agent_id(constants.AGENT_TYPE_DHCP,
+                                          DHCP_HOSTA)
+            self.plugin.add_network_to_dhcp_agent(
+                self.adminContext, hosta_id, networks[0]['network']['id'])
+            chosen_agent = self.plugin.network_scheduler.schedule(
+                self.plugin, self.adminContext, networks[1]['network'])[0]
+            self.assertEqual(DHCP_HOSTC, chosen_agent['host'])
+
+
 class OvsDhcpAgentNotifierTestCase(test_l3_plugin.L3NatTestCaseMixin,
                                    test_agent_ext_plugin.AgentDBTestMixIn,
                                    AgentSchedulerTestMixIn,
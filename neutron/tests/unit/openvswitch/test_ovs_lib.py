@@ -23,6 +23,7 @@ from neutron.agent.linux import ovs_lib
 from neutron.agent.linux import utils
 from neutron.openstack.common import jsonutils
 from neutron.openstack.common import uuidutils
+from neutron.plugins.openvswitch.common import constants
 from neutron.tests import base
 
 
@@ -329,6 +330,31 @@ class OVS_Lib_Test(base.BaseTestCase):
             ofport)
         self.mox.VerifyAll()
 
+    def test_add_tunnel_ports(self):
+        local_ip = "1.1.1.1"
+        tunnels = {"vxlan-1": "9.9.9.1", "vxlan-2": "9.9.9.2"}
+        args = []
+        for pname in sorted(tunnels):
+            args += ['--', '--may-exist', 'add-port', self.BR_NAME, pname,
+                     '--', 'set', 'Interface', pname, 'type=vxlan',
+                     'options:dst_port=9999',
+                     'options:remote_ip=' + tunnels[pname],
+                     'options:local_ip=' + local_ip,
+                     'options:in_key=flow', 'options:out_key=flow']
+        utils.execute(["ovs-vsctl", self.TO] + args,
+                      root_helper=self.root_helper)
+        utils.execute(["ovs-vsctl", self.TO,
+                       '--', 'get', 'Interface', 'vxlan-1', 'ofport',
+                       '--', 'get', 'Interface', 'vxlan-2', 'ofport'],
+                      root_helper=self.root_helper).AndReturn('6\n7\n')
+        self.mox.ReplayAll()
+
+        self.assertEqual(
+            {'vxlan-1': '6', 'vxlan-2': '7'},
+            self.br.add_tunnel_ports(tunnels, local_ip,
+                                     constants.TYPE_VXLAN, 9999))
+        self.mox.VerifyAll()
+
     def test_add_patch_port(self):
         pname = "tap99"
         peer = "bar10"
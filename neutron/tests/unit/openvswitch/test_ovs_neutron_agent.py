@@ -540,14 +540,51 @@ class TestOvsNeutronAgent(base.BaseTestCase):
         with contextlib.nested(
             mock.patch.object(self.agent.tun_br, 'add_flow'),
             mock.patch.object(self.agent.tun_br, 'mod_flow'),
-            mock.patch.object(self.agent, 'setup_tunnel_port')
+            mock.patch.object(self.agent, 'setup_tunnel_ports')
         ) as (add_flow_fn, mod_flow_fn, add_tun_fn):
             self.agent.fdb_add(None, fdb_entry)
             self.assertFalse(add_tun_fn.called)
             fdb_entry['net1']['ports']['ip_agent_3'] = [['mac', 'ip']]
             self.agent.fdb_add(None, fdb_entry)
-            add_tun_fn.assert_called_with('gre-ip_agent_3', 'ip_agent_3',
-                                          'gre')
+            add_tun_fn.assert_called_with('gre', set(['ip_agent_3']))
+
+    def test_fdb_add_batched(self):
+        self._prepare_l2_pop_ofports()
+        self.agent.l2_pop = True
+        fdb_entry = {'net1':
+                     {'network_type': 'gre',
+                      'segment_id': 'tun1',
+                      'ports':
+                      {'ip_agent_3': [n_const.FLOODING_ENTRY,
+                                      ['mac3', 'ip3']],
+                       'ip_agent_4': [n_const.FLOODING_ENTRY,
+                                      ['mac4', 'ip4']]}},
+                     'net2':
+                     {'network_type': 'gre',
+                      'segment_id': 'tun2',
+                      'ports':
+                      {'ip_agent_3': [n_const.FLOODING_ENTRY]}}}
+        with contextlib.nested(
+            mock.patch.object(self.agent.tun_br, 'add_tunnel_ports',
+                              return_value={'gre-ip_agent_3': '3',
+                                            'gre-ip_agent_4': '4'}),
+            mock.patch.object(self.agent.tun_br, 'mod_flow'),
+            mock.patch.object(self.agent.tun_br, 'defer_apply_on'),
+        ) as (add_tun_fn, mod_flow_fn, defer_fn):
+            self.agent.fdb_add(None, fdb_entry)
+        add_tun_fn.assert_called_once_with(
+            {'gre-ip_agent_3': 'ip_agent_3', 'gre-ip_agent_4': 'ip_agent_4'},
+            self.agent.local_ip, 'gre', self.agent.vxlan_udp_port)
+        self.assertEqual(1, defer_fn.call_count)
+        self.assertEqual(
+            [mock.call(table=constants.FLOOD_TO_TUN, priority=1,
+                       dl_vlan=vlan,
+                       actions='strip_vlan,set_tunnel:%s,output:%s' %
+                       (seg, ofports))
+             for vlan, seg, ofports in (('vlan1', 'seg1', '1,3,4'),
+                                        ('vlan2', 'seg2', '1,2,3'))],
+            sorted(mod_flow_fn.call_args_list,
+                   key=lambda call: call[1]['dl_vlan']))
 
     def test_fdb_del_port(self):
         self._prepare_l2_pop_ofports()
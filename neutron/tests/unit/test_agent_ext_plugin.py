@@ -15,9 +15,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import copy
+import datetime
 import time
 
+import mock
 from oslo.config import cfg
 from webob import exc
 
@@ -29,6 +32,7 @@ from neutron import context
 from neutron.db import agents_db
 from neutron.db import db_base_plugin_v2
 from neutron.extensions import agent
+from neutron import manager
 from neutron.openstack.common import log as logging
 from neutron.openstack.common import timeutils
 from neutron.openstack.common import uuidutils
@@ -241,6 +245,157 @@ class AgentDBTestCase(AgentDBTestMixIn,
             query_string='binary=neutron-l3-agent&host=' + L3_HOSTB)
         self.assertFalse(agents['agents'][0]['alive'])
 
+    def _get_host_agents(self, plugin, host=DHCP_HOSTA):
+        return plugin.get_agents(
+            self.adminContext,
+            filters={'agent_type': [constants.AGENT_TYPE_DHCP],
+                     'host': [host]})
+
+    def test_host_agents_cached(self):
+        plugin = manager.NeutronManager.get_plugin()
+        dhcp_hosta = self._register_agent_states()[2]
+        agents = self._get_host_agents(plugin)
+        self.assertEqual(1, len(agents))
+        self.assertTrue(agents[0]['alive'])
+        with mock.patch.object(plugin, '_get_collection') as get_collection:
+            self.assertEqual(agents, self._get_host_agents(plugin))
+            self.assertFalse(get_collection.called)
+
+        dhcp_hosta['configurations']['use_namespaces'] = False
+        agents_db.AgentExtRpcCallback().report_state(
+            self.adminContext, agent_state={'agent_state': dhcp_hosta},
+            time=timeutils.strtime())
+        agents = self._get_host_agents(plugin)
+        self.assertFalse(agents[0]['configurations']['use_namespaces'])
+
+    def test_host_agents_reloaded_when_down(self):
+        plugin = manager.NeutronManager.get_plugin()
+        self._register_agent_states()
+        self._get_host_agents(plugin)
+        with mock.patch.object(agents_db.AgentDbMixin, 'is_agent_down',
+                               return_value=True):
+            agents = self._get_host_agents(plugin)
+        self.assertFalse(agents[0]['alive'])
+        agents = self._get_host_agents(plugin)
+        self.assertTrue(agents[0]['alive'])
+
+    def test_no_host_agents_cached(self):
+        plugin = manager.NeutronManager.get_plugin()
+        self.assertEqual([], self._get_host_agents(plugin))
+        self._register_agent_states()
+        self.assertEqual(1, len(self._get_host_agents(plugin)))
+
+    def test_configuration_dict_parsed_once(self):
+        plugin = manager.NeutronManager.get_plugin()
+        self._register_agent_states()
+        agent_db = plugin.get_agents_db(
+            self.adminContext,
+            filters={'host': [L3_HOSTA],
+                     'agent_type': [constants.AGENT_TYPE_L3]})[0]
+        conf = plugin.get_configuration_dict(agent_db)
+        self.assertIs(conf, plugin.get_configuration_dict(agent_db))
+        agent_db.configurations = '{"use_namespaces": false}'
+        self.assertEqual({'use_namespaces': False},
+                         plugin.get_configuration_dict(agent_db))
+
+    def test_delete_agent_removes_cached_configurations(self):
+        plugin = manager.NeutronManager.get_plugin()
+        self._register_agent_states()
+        agent = self._get_host_agents(plugin)[0]
+        self.assertTrue(plugin.agent_cache._configurations)
+        self._delete('agents', agent['id'])
+        self.assertNotIn((constants.AGENT_TYPE_DHCP, DHCP_HOSTA),
+                         plugin.agent_cache._configurations)
+        self.assertIsNone(plugin.agent_cache.get(constants.AGENT_TYPE_DHCP,
+                                                 DHCP_HOSTA))
+
+    def _coalesce_heartbeats(self):
+        cfg.CONF.set_override('agent_heartbeat_flush_interval', 10)
+        mock.patch.object(agents_db, 'HEARTBEATS',
+                          agents_db.HeartbeatStore()).start()
+        mock.patch.object(agents_db.loopingcall,
+                          'FixedIntervalLoopingCall').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _report_state(self, agent_state):
+        agents_db.AgentExtRpcCallback().report_state(
+            self.adminContext, agent_state={'agent_state': agent_state},
+            time=timeutils.strtime())
+
+    def _get_dhcp_agent(self):
+        return self._list_agents(
+            query_string='binary=neutron-dhcp-agent&host=' +
+            DHCP_HOSTA)['agents'][0]
+
+    def test_heartbeat_kept_until_flush(self):
+        self._coalesce_heartbeats()
+        dhcp_hosta = self._register_agent_states()[2]
+        registered = self._get_dhcp_agent()['heartbeat_timestamp']
+        later = timeutils.utcnow() + datetime.timedelta(seconds=5)
+        with contextlib.nested(
+            mock.patch.object(timeutils, 'utcnow', return_value=later),
+            mock.patch.object(agents_db.AgentDbMixin,
+                              '_get_agent_by_type_and_host')
+        ) as (utcnow, get_agent):
+            self._report_state(dhcp_hosta)
+            self.assertFalse(get_agent.called)
+        self.assertTrue(agents_db.HEARTBEATS._flush_loop.start.called)
+        heartbeat = self._get_dhcp_agent()['heartbeat_timestamp']
+        self.assertNotEqual(registered, heartbeat)
+
+        agents_db.HEARTBEATS._latest.clear()
+        self.assertEqual(registered,
+                         self._get_dhcp_agent()['heartbeat_timestamp'])
+        agents_db.HEARTBEATS.flush()
+        self.assertEqual(heartbeat,
+                         self._get_dhcp_agent()['heartbeat_timestamp'])
+
+    def test_heartbeat_with_changed_configurations_written(self):
+        self._coalesce_heartbeats()
+        dhcp_hosta = self._register_agent_states()[2]
+        dhcp_hosta['configurations']['use_namespaces'] = False
+        self._report_state(dhcp_hosta)
+        self.assertEqual({}, agents_db.HEARTBEATS._pending)
+        self.assertFalse(
+            self._get_dhcp_agent()['configurations']['use_namespaces'])
+
+    def test_heartbeat_of_deleted_agent_recreates_it(self):
+        self._coalesce_heartbeats()
+        dhcp_hosta = self._register_agent_states()[2]
+        agent_id = self._get_dhcp_agent()['id']
+        # Deleted through another server
+        with self.adminContext.session.begin():
+            self.adminContext.session.query(agents_db.Agent).filter_by(
+                id=agent_id).delete()
+        self._report_state(dhcp_hosta)
+        agents_db.HEARTBEATS.flush()
+        self.assertTrue(agents_db.HEARTBEATS.is_deleted(agent_id))
+
+        self._report_state(dhcp_hosta)
+        self.assertNotEqual(agent_id, self._get_dhcp_agent()['id'])
+        self.assertFalse(agents_db.HEARTBEATS.is_deleted(agent_id))
+
+    def test_deleted_agents_forgotten_after_agent_down_time(self):
+        self._coalesce_heartbeats()
+        heartbeats = agents_db.HEARTBEATS
+        heartbeats.record('agent-id', timeutils.utcnow())
+        heartbeats.flush()
+        self.assertTrue(heartbeats.is_deleted('agent-id'))
+        later = time.time() + cfg.CONF.agent_down_time + 1
+        with mock.patch.object(agents_db.time, 'time', return_value=later):
+            heartbeats.flush()
+        self.assertFalse(heartbeats.is_deleted('agent-id'))
+
+    def test_delete_agent_removes_heartbeats(self):
+        self._coalesce_heartbeats()
+        dhcp_hosta = self._register_agent_states()[2]
+        agent_id = self._get_dhcp_agent()['id']
+        self._report_state(dhcp_hosta)
+        self.assertIn(agent_id, agents_db.HEARTBEATS._pending)
+        self._delete('agents', agent_id)
+        self.assertIsNone(agents_db.HEARTBEATS.get(agent_id))
+        self.assertNotIn(agent_id, agents_db.HEARTBEATS._pending)
+
 
 class AgentDBTestCaseXML(AgentDBTestCase):
     fmt = 'xml'
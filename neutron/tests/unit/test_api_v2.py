@@ -569,6 +569,19 @@ class JSONV2TestCase(APIv2TestBase, testlib_api.WebTestCase):
         tenant_id = _uuid()
         self._test_list(tenant_id + "bad", tenant_id)
 
+    def test_list_policy_error_mapped(self):
+        instance = self.plugin.return_value
+        instance.get_networks.return_value = [{'id': _uuid(),
+                                               'tenant_id': _uuid()}]
+        env = {'neutron.context': context.Context('', _uuid())}
+        # The items are checked before the response is sent, so that errors
+        # are mapped rather than truncating the response
+        with mock.patch('neutron.policy.check',
+                        side_effect=q_exc.Conflict()):
+            res = self.api.get(_get_path('networks', fmt=self.fmt),
+                               extra_environ=env, expect_errors=True)
+        self.assertEqual(res.status_int, exc.HTTPConflict.code)
+
     def test_list_pagination(self):
         id1 = str(_uuid())
         id2 = str(_uuid())
@@ -1069,6 +1082,20 @@ class JSONV2TestCase(APIv2TestBase, testlib_api.WebTestCase):
         finally:
             del common_policy._rules['get_network:name']
 
+    def test_get_keystone_strip_owner_only_attribute(self):
+        tenant_id = _uuid()
+        # Inject a rule which can be decided only by looking at the item
+        common_policy._rules['get_network:shared'] = common_policy.parse_rule(
+            "rule:admin_or_owner")
+        try:
+            res = self.deserialize(self._test_get(tenant_id, tenant_id, 200))
+            self.assertIn('shared', res['network'])
+            res = self.deserialize(self._test_get(tenant_id + "another",
+                                                  tenant_id, 200))
+            self.assertNotIn('shared', res['network'])
+        finally:
+            del common_policy._rules['get_network:shared']
+
     def _test_update(self, req_tenant_id, real_tenant_id, expected_code,
                      expect_errors=False):
         env = {}
@@ -1253,6 +1280,162 @@ class V2Views(base.BaseTestCase):
         self._view(keys, 'subnets', 'subnet')
 
 
+class NativeListPlugin(object):
+    __native_pagination_support = True
+    __native_sorting_support = True
+
+    def get_networks(self, context, filters=None, fields=None, sorts=None,
+                     limit=None, marker=None, page_reverse=False):
+        return []
+
+    def get_ports(self, context, filters=None, fields=None, sorts=None,
+                  limit=None, marker=None, page_reverse=False):
+        return []
+
+
+class DerivedListPlugin(NativeListPlugin):
+
+    def get_ports(self, context, filters=None, fields=None):
+        return []
+
+
+class DeclaredListPlugin(DerivedListPlugin):
+    __native_pagination_support = False
+    __native_sorting_support = False
+
+
+class RevisionPlugin(object):
+
+    def get_networks(self, context, filters=None, fields=None):
+        return []
+
+    def get_ports(self, context, filters=None, fields=None):
+        return []
+
+    def get_network(self, context, id, fields=None):
+        return {}
+
+    def get_port(self, context, id, fields=None):
+        return {}
+
+    def get_networks_revision(self, context, filters=None):
+        return '0-0'
+
+    def get_ports_revision(self, context, filters=None):
+        return '0-0'
+
+
+class DerivedRevisionPlugin(RevisionPlugin):
+
+    def get_port(self, context, id, fields=None):
+        return {}
+
+
+class NativeListSupportTestCase(base.BaseTestCase):
+
+    def _get_controller(self, plugin, collection, resource):
+        attr_info = attributes.RESOURCE_ATTRIBUTE_MAP[collection]
+        return v2_base.Controller(plugin, collection, resource, attr_info,
+                                  allow_pagination=True, allow_sorting=True)
+
+    def _assert_native(self, plugin, collection, resource, native):
+        controller = self._get_controller(plugin, collection, resource)
+        self.assertEqual(controller._native_pagination, native)
+        self.assertEqual(controller._native_sorting, native)
+
+    def test_declared_by_plugin_class(self):
+        self._assert_native(NativeListPlugin(), 'ports', 'port', True)
+
+    def test_inherited_list_method(self):
+        self._assert_native(DerivedListPlugin(), 'networks', 'network',
+                            True)
+
+    def test_overridden_list_method(self):
+        self._assert_native(DerivedListPlugin(), 'ports', 'port', False)
+
+    def test_declaration_overrides_inherited_list_method(self):
+        self._assert_native(DeclaredListPlugin(), 'networks', 'network',
+                            False)
+
+
+class RevisionGetterTestCase(base.BaseTestCase):
+
+    def _get_revision_getter(self, plugin, collection, resource):
+        attr_info = attributes.RESOURCE_ATTRIBUTE_MAP[collection]
+        controller = v2_base.Controller(plugin, collection, resource,
+                                        attr_info)
+        return controller._revision_getter
+
+    def test_defined_with_list_and_show_methods(self):
+        plugin = DerivedRevisionPlugin()
+        self.assertEqual(
+            self._get_revision_getter(plugin, 'networks', 'network'),
+            plugin.get_networks_revision)
+
+    def test_overridden_show_method(self):
+        self.assertIsNone(self._get_revision_getter(
+            DerivedRevisionPlugin(), 'ports', 'port'))
+
+    def test_not_defined(self):
+        self.assertIsNone(self._get_revision_getter(
+            NativeListPlugin(), 'networks', 'network'))
+
+
+class BodyChecksTestCase(base.BaseTestCase):
+
+    ATTR_INFO = {'name': {'allow_post': True, 'allow_put': True,
+                          'validate': {'type:string': None}},
+                 'size': {'allow_post': True, 'allow_put': True,
+                          'default': '1',
+                          'convert_to': attributes.convert_to_int,
+                          'validate': {'type:non_negative': None}},
+                 'status': {'allow_post': False, 'allow_put': False}}
+
+    def _check(self, res_dict, is_create=True, attr_info=None):
+        body_checks = v2_base.compile_body_checks(attr_info or self.ATTR_INFO,
+                                                  is_create)
+        body_checks(res_dict)
+        return res_dict
+
+    def test_create_defaults_and_conversions(self):
+        self.assertEqual(self._check({'name': 'foo'}),
+                         {'name': 'foo', 'size': 1})
+        self.assertEqual(self._check({'name': 'foo', 'size': '4'}),
+                         {'name': 'foo', 'size': 4})
+
+    def test_create_missing_required(self):
+        self.assertRaises(exc.HTTPBadRequest, self._check, {'size': '4'})
+
+    def test_create_not_allowed(self):
+        self.assertRaises(exc.HTTPBadRequest, self._check,
+                          {'name': 'foo', 'status': 'UP'})
+
+    def test_update_read_only(self):
+        self.assertEqual(self._check({'size': '2'}, is_create=False),
+                         {'size': 2})
+        self.assertRaises(exc.HTTPBadRequest, self._check,
+                          {'status': 'UP'}, is_create=False)
+
+    def test_unrecognized_attribute(self):
+        self.assertRaises(exc.HTTPBadRequest, self._check,
+                          {'name': 'foo', 'color': 'red'})
+
+    def test_invalid_value(self):
+        self.assertRaises(exc.HTTPBadRequest, self._check,
+                          {'name': 'foo', 'size': '-1'})
+
+    def test_validator_registered_after_compiling(self):
+        attr_info = {'name': {'allow_post': True, 'allow_put': True,
+                              'validate': {'type:not_foo': None}}}
+        body_checks = v2_base.compile_body_checks(attr_info, True)
+        validator = mock.Mock(return_value='foo not allowed')
+        with mock.patch.dict(attributes.validators,
+                             {'type:not_foo': validator}):
+            self.assertRaises(exc.HTTPBadRequest, body_checks,
+                              {'name': 'foo'})
+        validator.assert_called_once_with('foo', None)
+
+
 class NotificationTest(APIv2TestBase):
     def _resource_op_notifier(self, opname, resource, expected_errors=False,
                               notification_level='INFO'):
@@ -19,9 +19,11 @@
 #
 
 import mock
+import webob
 from webob import exc
 import webtest
 
+from neutron.api.v2 import attributes
 from neutron.api.v2 import resource as wsgi_resource
 from neutron.common import exceptions as q_exc
 from neutron import context
@@ -314,6 +316,35 @@ class ResourceTestCase(base.BaseTestCase):
         res = resource.get('', extra_environ=environ, expect_errors=True)
         self.assertEqual(res.status_int, 200)
 
+    def test_status_200_streamed(self):
+        controller = mock.MagicMock()
+        controller.test = lambda request: {'foo': (i for i in range(3))}
+
+        resource = wsgi_resource.Resource(controller)
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'test'})}
+        status, headers, app_iter = webob.Request.blank(
+            '', environ=environ).call_application(resource)
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('Content-Length', dict(headers))
+        self.assertNotIsInstance(app_iter, list)
+        self.assertEqual(
+            wsgi.JSONDeserializer().deserialize(''.join(app_iter)),
+            {'body': {'foo': [0, 1, 2]}})
+
+    def test_status_200_streamed_with_xml(self):
+        controller = mock.MagicMock()
+        controller.test = lambda request: {'foo': (i for i in ['a', 'b'])}
+
+        resource = webtest.TestApp(wsgi_resource.Resource(controller))
+
+        environ = {'wsgiorg.routing_args': (None, {'action': 'test',
+                                                   'format': 'xml'})}
+        res = resource.get('', extra_environ=environ)
+        self.assertEqual(res.status_int, 200)
+        serializer = wsgi.XMLDictSerializer(attributes.get_attr_metadata())
+        self.assertEqual(res.body, serializer.serialize({'foo': ['a', 'b']}))
+
     def test_status_204(self):
         controller = mock.MagicMock()
         controller.test = lambda request: {'foo': 'bar'}
@@ -160,6 +160,11 @@ class TestAttributes(base.BaseTestCase):
         msg = attributes._validate_mac_address(mac_addr)
         self.assertEqual(msg, "'%s' is not a valid MAC address" % mac_addr)
 
+        # Other forms than the canonical one are parsed
+        mac_addr = "ff-16-3e-4f-00-00"
+        msg = attributes._validate_mac_address(mac_addr)
+        self.assertIsNone(msg)
+
     def test_validate_ip_address(self):
         ip_addr = '1.1.1.1'
         msg = attributes._validate_ip_address(ip_addr)
@@ -496,6 +501,13 @@ class TestAttributes(base.BaseTestCase):
         msg = attributes._validate_uuid('00000000-ffff-ffff-ffff-000000000000')
         self.assertIsNone(msg)
 
+        msg = attributes._validate_uuid('00000000-FFFF-ffff-ffff-000000000000')
+        self.assertEqual(msg, "'00000000-FFFF-ffff-ffff-000000000000' is not "
+                              "a valid UUID")
+
+        msg = attributes._validate_uuid(123)
+        self.assertEqual(msg, "'123' is not a valid UUID")
+
     def test_validate_uuid_list(self):
         # check not a list
         uuids = [None,
@@ -0,0 +1,100 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo.config import cfg
+
+from neutron.db import api as db_api
+from neutron.db import models_v2
+from neutron.openstack.common.db.sqlalchemy import session
+from neutron.tests import base
+
+
+class ReplicaSessionTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(ReplicaSessionTestCase, self).setUp()
+        cfg.CONF.set_override('connection', 'sqlite://', 'database')
+        cfg.CONF.set_override('slave_connection', 'sqlite://', 'database')
+        db_api.configure_db()
+        self.addCleanup(db_api.clear_db)
+        self.primary = session.get_engine(sqlite_fk=True)
+        self.replica = session.get_engine(sqlite_fk=True, slave_engine=True)
+        self.session = db_api.get_session(use_replica=True)
+
+    def test_reads_from_replica(self):
+        self.assertNotEqual(self.primary, self.replica)
+        self.assertEqual(self.session.get_bind(), self.replica)
+
+    def test_transactions_use_primary(self):
+        with self.session.begin():
+            self.assertEqual(self.session.get_bind(), self.primary)
+        self.assertEqual(self.session.get_bind(), self.replica)
+
+    def test_reads_own_writes(self):
+        with self.session.begin():
+            self.session.add(models_v2.Network(name='net1',
+                                               admin_state_up=True))
+        self.assertEqual(self.session.get_bind(), self.primary)
+        self.assertEqual(self.session.query(models_v2.Network).count(), 1)
+
+    def test_without_slave_connection(self):
+        cfg.CONF.set_override('slave_connection', '', 'database')
+        self.assertNotIsInstance(db_api.get_session(use_replica=True),
+                                 db_api.ReplicaSession)
+
+
+class SqlStatsTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(SqlStatsTestCase, self).setUp()
+        cfg.CONF.set_override('connection', 'sqlite://', 'database')
+        db_api.configure_db()
+        self.addCleanup(db_api.clear_db)
+        self.session = db_api.get_session()
+
+    def test_collect_sql_stats(self):
+        with db_api.collect_sql_stats('test') as stats:
+            self.session.query(models_v2.Network).all()
+            self.session.query(models_v2.Port).all()
+        self.assertEqual(stats.count, 2)
+        self.assertGreater(stats.time, 0)
+        self.assertGreaterEqual(stats.checkout_wait, 0)
+        # Statements run afterwards are not counted
+        self.session.query(models_v2.Network).all()
+        self.assertEqual(stats.count, 2)
+
+    def test_nested_collect_sql_stats(self):
+        with db_api.collect_sql_stats('outer') as outer:
+            with db_api.collect_sql_stats('inner') as inner:
+                self.session.query(models_v2.Network).all()
+            self.session.query(models_v2.Network).all()
+        self.assertEqual(inner.count, 1)
+        self.assertEqual(outer.count, 1)
+
+    def test_slow_query_log(self):
+        cfg.CONF.set_override('slow_query_threshold', 1e-9, 'database')
+        with mock.patch.object(db_api.LOG, 'warning') as warning:
+            self.session.query(models_v2.Network).all()
+        self.assertEqual(warning.call_count, 1)
+        values = warning.call_args[0][1]
+        self.assertIn('networks', values['statement'])
+        self.assertIn('test_slow_query_log', values['caller'])
+
+    def test_slow_query_log_disabled(self):
+        with mock.patch.object(db_api.LOG, 'warning') as warning:
+            self.session.query(models_v2.Network).all()
+        self.assertFalse(warning.called)
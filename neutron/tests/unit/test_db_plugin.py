@@ -40,6 +40,7 @@ from neutron import context
 from neutron.db import api as db
 from neutron.db import db_base_plugin_v2
 from neutron.db import models_v2
+from neutron.db import sqlalchemyutils
 from neutron.manager import NeutronManager
 from neutron.openstack.common import importutils
 from neutron.openstack.common import timeutils
@@ -484,6 +485,25 @@ class NeutronDbPluginV2TestCase(testlib_api.WebTestCase):
         self.assertEqual(res.status_int, webob.exc.HTTPOk.code)
         return self.deserialize(fmt, res)
 
+    def _count_list_statements(self, resource):
+        with testlib_api.SqlStatementCounter() as counter:
+            self._list(resource)
+        return counter.count
+
+    def _assert_list_statements_constant(self, resource, make_item):
+        """Fail if listing more items issues more SQL statements.
+
+        make_item must return a context manager creating one item of the
+        listed resource.
+        """
+        # Items created with default arguments share the same CIDR
+        cfg.CONF.set_override('allow_overlapping_ips', True)
+        with make_item():
+            expected = self._count_list_statements(resource)
+            with contextlib.nested(make_item(), make_item()):
+                self.assertEqual(expected,
+                                 self._count_list_statements(resource))
+
     def _do_side_effect(self, patched_plugin, orig, *args, **kwargs):
         """Invoked by test cases for injecting failures in plugin."""
         def second_call(*args, **kwargs):
@@ -859,6 +879,27 @@ class TestPortsV2(NeutronDbPluginV2TestCase):
             for p in self.deserialize(self.fmt, res)['ports']:
                 self._delete('ports', p['id'])
 
+    def test_create_ports_bulk_native_allocates_addresses(self):
+        if self._skip_native_bulk:
+            self.skipTest("Plugin does not support native bulk port create")
+        with self.subnet() as subnet:
+            res = self._create_port_bulk(self.fmt, 3,
+                                         subnet['subnet']['network_id'],
+                                         'test', True)
+            self.assertEqual(res.status_int, webob.exc.HTTPCreated.code)
+            ports = self.deserialize(self.fmt, res)['ports']
+            macs = set(p['mac_address'] for p in ports)
+            self.assertEqual(len(macs), 3)
+            ips = set()
+            for p in ports:
+                self.assertEqual(len(p['fixed_ips']), 1)
+                self.assertEqual(p['fixed_ips'][0]['subnet_id'],
+                                 subnet['subnet']['id'])
+                ips.add(p['fixed_ips'][0]['ip_address'])
+            self.assertEqual(ips, set(['10.0.0.2', '10.0.0.3', '10.0.0.4']))
+            for p in ports:
+                self._delete('ports', p['id'])
+
     def test_create_ports_bulk_emulated(self):
         real_has_attr = hasattr
 
@@ -961,6 +1002,34 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
             self._test_list_resources('port', [port1],
                                       query_params=query_params)
 
+    def test_list_ports_with_fields_reads_columns_only(self):
+        fields = ['id', 'device_id', 'fixed_ips']
+        with self.network() as network:
+            with contextlib.nested(
+                self.subnet(network=network),
+                self.subnet(network=network, cidr='10.0.1.0/24')
+            ) as (subnet1, subnet2):
+                subnet_ids = [subnet1['subnet']['id'], subnet2['subnet']['id']]
+                fixed_ips = [{'subnet_id': subnet_id}
+                             for subnet_id in subnet_ids]
+                with self.port(subnet=subnet1, fixed_ips=fixed_ips) as port:
+                    plugin = NeutronManager.get_plugin()
+                    # Ports joined to both of their IPs must be listed once
+                    filters = {'fixed_ips': {'subnet_id': subnet_ids}}
+                    with mock.patch.object(plugin,
+                                           '_make_port_dict') as make_dict:
+                        ports = db_base_plugin_v2.NeutronDbPluginV2.get_ports(
+                            plugin, context.get_admin_context(),
+                            filters=filters, fields=fields)
+                    self.assertFalse(make_dict.called)
+                    self.assertEqual(1, len(ports))
+                    self.assertEqual(['device_id', 'fixed_ips', 'id'],
+                                     sorted(ports[0]))
+                    self.assertEqual(port['port']['id'], ports[0]['id'])
+                    self.assertEqual(
+                        sorted(port['port']['fixed_ips']),
+                        sorted(ports[0]['fixed_ips']))
+
     def test_list_ports_public_network(self):
         with self.network(shared=True) as network:
             with self.subnet(network) as subnet:
@@ -1409,6 +1478,70 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
                 self._delete('ports', port3['port']['id'])
                 self._delete('ports', port4['port']['id'])
 
+    def _test_allocation_retried_on_concurrent_update(self, fixed_ip):
+        plugin = db_base_plugin_v2.NeutronDbPluginV2
+        swap_ip_range = plugin._swap_ip_range
+        get_ip_ranges_query = plugin._get_ip_ranges_query
+        outcomes = [False]
+
+        def _swap_ip_range(*args, **kwargs):
+            # Simulate another allocation changing the range first
+            if outcomes:
+                return outcomes.pop()
+            return swap_ip_range(*args, **kwargs)
+
+        with self.subnet() as subnet:
+            if fixed_ip:
+                fixed_ip['subnet_id'] = subnet['subnet']['id']
+            else:
+                fixed_ip = {'subnet_id': subnet['subnet']['id']}
+            with contextlib.nested(
+                mock.patch.object(plugin, '_swap_ip_range',
+                                  side_effect=_swap_ip_range),
+                mock.patch.object(plugin, '_get_ip_ranges_query',
+                                  side_effect=get_ip_ranges_query)
+            ) as (swap, query):
+                with self.port(subnet=subnet, fixed_ips=[fixed_ip]) as port:
+                    ips = port['port']['fixed_ips']
+                    self.assertEqual(len(ips), 1)
+                    self.assertEqual(ips[0]['ip_address'], '10.0.0.2')
+                    self.assertEqual(swap.call_count, 2)
+                    self.assertEqual([False, True],
+                                     [c[1]['locked'] for c in
+                                      query.call_args_list])
+
+    def test_generate_ip_retried_on_concurrent_update(self):
+        self._test_allocation_retried_on_concurrent_update(None)
+
+    def test_allocate_specific_ip_retried_on_concurrent_update(self):
+        self._test_allocation_retried_on_concurrent_update(
+            {'ip_address': '10.0.0.2'})
+
+    def _test_allocation_conflict_on_concurrent_updates(self, fixed_ip):
+        plugin = db_base_plugin_v2.NeutronDbPluginV2
+        with self.subnet() as subnet:
+            fixed_ip['subnet_id'] = subnet['subnet']['id']
+            # Every attempt loses the race with another allocation
+            with mock.patch.object(plugin, '_swap_ip_range',
+                                   return_value=False) as swap:
+                res = self._create_port(self.fmt,
+                                        subnet['subnet']['network_id'],
+                                        fixed_ips=[fixed_ip])
+            data = self.deserialize(self.fmt, res)
+            msg = str(q_exc.IpAddressAllocationConflict(
+                subnet_id=subnet['subnet']['id']))
+            self.assertEqual(data['NeutronError']['message'], msg)
+            self.assertEqual(res.status_int, webob.exc.HTTPConflict.code)
+            self.assertEqual(swap.call_count,
+                             cfg.CONF.ip_allocation_retries + 1)
+
+    def test_generate_ip_conflict_on_concurrent_updates(self):
+        self._test_allocation_conflict_on_concurrent_updates({})
+
+    def test_allocate_specific_ip_conflict_on_concurrent_updates(self):
+        self._test_allocation_conflict_on_concurrent_updates(
+            {'ip_address': '10.0.0.2'})
+
     def test_range_allocation(self):
         with self.subnet(gateway_ip='10.0.0.3',
                          cidr='10.0.0.0/29') as subnet:
@@ -1723,6 +1856,49 @@ fixed_ips=ip_address%%3D%s&fixed_ips=ip_address%%3D%s&fixed_ips=subnet_id%%3D%s
             allocation_pools=[{'start': '10.0.0.20',
                                'end': '10.0.0.20'}])
 
+    def test_recycle_ip_address_merges_ranges(self):
+        allocation_pools = [{'start': '10.0.0.10', 'end': '10.0.0.50'}]
+        with self.subnet(cidr='10.0.0.0/24',
+                         allocation_pools=allocation_pools) as subnet:
+            fixed_ips = [{'subnet_id': subnet['subnet']['id'],
+                          'ip_address': '10.0.0.20'}]
+            with self.port(subnet=subnet, fixed_ips=fixed_ips):
+                pass
+            ctx = context.get_admin_context()
+            q = ctx.session.query(models_v2.IPAvailabilityRange)
+            self.assertEqual([('10.0.0.10', '10.0.0.50')],
+                             [(r.first_ip, r.last_ip) for r in q])
+
+    def test_allocate_ips_from_fragmented_ranges(self):
+        allocation_pools = [{'start': '10.0.0.10', 'end': '10.0.0.50'}]
+        with self.subnet(cidr='10.0.0.0/24',
+                         allocation_pools=allocation_pools) as subnet:
+            subnet_id = subnet['subnet']['id']
+            with contextlib.nested(
+                self.port(subnet=subnet, fixed_ips=[
+                    {'subnet_id': subnet_id, 'ip_address': '10.0.0.30'}]),
+                self.port(subnet=subnet, fixed_ips=[
+                    {'subnet_id': subnet_id, 'ip_address': '10.0.0.45'}]),
+                self.port(subnet=subnet, fixed_ips=[
+                    {'subnet_id': subnet_id, 'ip_address': '10.0.0.20'}]),
+                self.port(subnet=subnet)
+            ) as (port1, port2, port3, port4):
+                # The lowest free IP is given out first
+                self.assertEqual('10.0.0.10',
+                                 port4['port']['fixed_ips'][0]['ip_address'])
+                ctx = context.get_admin_context()
+                q = ctx.session.query(models_v2.IPAvailabilityRange)
+                ranges = sorted((models_v2.ip_sort_key(r.first_ip),
+                                 r.first_ip_key, r.first_ip, r.last_ip)
+                                for r in q)
+                self.assertEqual([('10.0.0.11', '10.0.0.19'),
+                                  ('10.0.0.21', '10.0.0.29'),
+                                  ('10.0.0.31', '10.0.0.44'),
+                                  ('10.0.0.46', '10.0.0.50')],
+                                 [r[2:] for r in ranges])
+                self.assertEqual([r[0] for r in ranges],
+                                 [r[1] for r in ranges])
+
     def test_max_fixed_ips_exceeded(self):
         with self.subnet(gateway_ip='10.0.0.3',
                          cidr='10.0.0.0/24') as subnet:
@@ -2213,6 +2389,19 @@ class TestNetworksV2(NeutronDbPluginV2TestCase):
                              net1['network']['name'])
             self.assertIsNone(res['networks'][0].get('id'))
 
+    def test_list_networks_with_fields_reads_columns_only(self):
+        with self.subnet() as subnet:
+            plugin = NeutronManager.get_plugin()
+            with mock.patch.object(plugin,
+                                   '_make_network_dict') as make_dict:
+                networks = db_base_plugin_v2.NeutronDbPluginV2.get_networks(
+                    plugin, context.get_admin_context(),
+                    fields=['name', 'subnets'])
+            self.assertFalse(make_dict.called)
+            self.assertEqual([{'name': 'net1',
+                               'subnets': [subnet['subnet']['id']]}],
+                             networks)
+
     def test_list_networks_with_parameters_invalid_values(self):
         with contextlib.nested(self.network(name='net1',
                                             admin_state_up=False),
@@ -2393,6 +2582,13 @@ class TestSubnetsV2(NeutronDbPluginV2TestCase):
         self.assertEqual(ctx_manager.exception.code,
                          webob.exc.HTTPClientError.code)
 
+    def test_create_v4_and_v6_subnets_overlapping_ips_not_allowed(self):
+        cfg.CONF.set_override('allow_overlapping_ips', False)
+        with contextlib.nested(self.subnet(cidr='0.0.0.0/24'),
+                               self.subnet(cidr='::/120', ip_version=6,
+                                           gateway_ip='::1')):
+            pass
+
     def test_create_subnets_bulk_native(self):
         if self._skip_native_bulk:
             self.skipTest("Plugin does not support native bulk subnet create")
@@ -2876,6 +3072,38 @@ class TestSubnetsV2(NeutronDbPluginV2TestCase):
         self.assertEqual(ctx_manager.exception.code,
                          webob.exc.HTTPConflict.code)
 
+    def test_create_subnet_nested_allocation_pools_returns_409(self):
+        gateway_ip = '10.0.0.1'
+        cidr = '10.0.0.0/24'
+        allocation_pools = [{'start': '10.0.0.2',
+                             'end': '10.0.0.150'},
+                            {'start': '10.0.0.160',
+                             'end': '10.0.0.170'},
+                            {'start': '10.0.0.10',
+                             'end': '10.0.0.20'}]
+        with testlib_api.ExpectedException(
+                webob.exc.HTTPClientError) as ctx_manager:
+            self._test_create_subnet(gateway_ip=gateway_ip,
+                                     cidr=cidr,
+                                     allocation_pools=allocation_pools)
+        self.assertEqual(ctx_manager.exception.code,
+                         webob.exc.HTTPConflict.code)
+
+    def test_create_subnet_overlapping_v6_allocation_pools_returns_409(self):
+        gateway_ip = 'fe80::1'
+        cidr = 'fe80::/64'
+        allocation_pools = [{'start': 'fe80::2',
+                             'end': 'fe80::ffff:ffff:ffff:fff0'},
+                            {'start': 'fe80::ffff:0:0:1',
+                             'end': 'fe80::ffff:ffff:ffff:fffe'}]
+        with testlib_api.ExpectedException(
+                webob.exc.HTTPClientError) as ctx_manager:
+            self._test_create_subnet(gateway_ip=gateway_ip,
+                                     cidr=cidr, ip_version=6,
+                                     allocation_pools=allocation_pools)
+        self.assertEqual(ctx_manager.exception.code,
+                         webob.exc.HTTPConflict.code)
+
     def test_create_subnet_invalid_allocation_pool_returns_400(self):
         gateway_ip = '10.0.0.1'
         cidr = '10.0.0.0/24'
@@ -3175,6 +3403,25 @@ class TestSubnetsV2(NeutronDbPluginV2TestCase):
                                                cidr='10.0.2.0/24')) as subnets:
                 self._test_list_resources('subnet', subnets)
 
+    def test_list_subnets_with_fields_reads_columns_only(self):
+        fields = ['cidr', 'allocation_pools', 'dns_nameservers',
+                  'host_routes']
+        host_routes = [{'destination': '12.0.0.0/8', 'nexthop': '10.0.0.3'}]
+        with self.subnet(dns_nameservers=['1.2.3.4', '5.6.7.8'],
+                         host_routes=host_routes) as subnet:
+            plugin = NeutronManager.get_plugin()
+            with mock.patch.object(plugin,
+                                   '_make_subnet_dict') as make_dict:
+                subnets = db_base_plugin_v2.NeutronDbPluginV2.get_subnets(
+                    plugin, context.get_admin_context(), fields=fields)
+            self.assertFalse(make_dict.called)
+            self.assertEqual(1, len(subnets))
+            self.assertEqual(sorted(fields), sorted(subnets[0]))
+            self.assertEqual(subnet['subnet']['cidr'], subnets[0]['cidr'])
+            for field in fields[1:]:
+                self.assertEqual(sorted(subnet['subnet'][field]),
+                                 sorted(subnets[0][field]))
+
     def test_list_subnets_shared(self):
         with self.network(shared=True) as network:
             with self.subnet(network=network, cidr='10.0.0.0/24') as subnet:
@@ -3585,6 +3832,212 @@ class TestSubnetsV2(NeutronDbPluginV2TestCase):
             q_exc.HostRoutesExhausted)
 
 
+class TestListStatementsV2(NeutronDbPluginV2TestCase):
+    """Listing resources must not issue SQL statements per item."""
+
+    def test_list_networks(self):
+        self._assert_list_statements_constant('networks', self.subnet)
+
+    def test_list_subnets(self):
+        def make_subnet():
+            return self.subnet(dns_nameservers=['1.2.3.4'],
+                               host_routes=[{'destination': '12.0.0.0/8',
+                                             'nexthop': '10.0.0.3'}])
+        self._assert_list_statements_constant('subnets', make_subnet)
+
+    def test_list_ports(self):
+        self._assert_list_statements_constant('ports', self.port)
+
+
+class TestRevisionsV2(NeutronDbPluginV2TestCase):
+
+    def _get(self, req, etag=None):
+        if etag:
+            req.headers['If-None-Match'] = '"%s"' % etag
+        return req.get_response(self.api)
+
+    def test_list_networks_not_modified(self):
+        with self.network() as net:
+            res = self._get(self.new_list_request('networks'))
+            self.assertEqual(res.status_int, 200)
+            etag = res.etag
+            self.assertTrue(etag)
+            res = self._get(self.new_list_request('networks'), etag)
+            self.assertEqual(res.status_int, 304)
+            self.assertEqual(res.etag, etag)
+            self.assertFalse(res.body)
+
+            data = {'network': {'name': 'renamed'}}
+            self.new_update_request('networks', data,
+                                    net['network']['id']).get_response(
+                                        self.api)
+            res = self._get(self.new_list_request('networks'), etag)
+            self.assertEqual(res.status_int, 200)
+            self.assertNotEqual(res.etag, etag)
+
+    def test_list_networks_etag_depends_on_query(self):
+        with self.network():
+            etag = self._get(self.new_list_request('networks')).etag
+            res = self._get(self.new_list_request('networks',
+                                                  params='name=other'),
+                            etag)
+            self.assertEqual(res.status_int, 200)
+            self.assertNotEqual(res.etag, etag)
+
+    def test_list_networks_changes_on_delete(self):
+        with self.network():
+            with self.network(do_delete=False) as net:
+                etag = self._get(self.new_list_request('networks')).etag
+                self._delete('networks', net['network']['id'])
+                res = self._get(self.new_list_request('networks'), etag)
+                self.assertEqual(res.status_int, 200)
+
+    def test_show_port_changes_with_fixed_ips(self):
+        with self.subnet() as subnet:
+            with self.port(subnet=subnet) as port:
+                port_id = port['port']['id']
+                res = self._get(self.new_show_request('ports', port_id))
+                etag = res.etag
+                res = self._get(self.new_show_request('ports', port_id),
+                                etag)
+                self.assertEqual(res.status_int, 304)
+
+                # Changes of the IP allocations of a port are changes of
+                # the port
+                data = {'port': {'fixed_ips': [
+                    {'subnet_id': subnet['subnet']['id'],
+                     'ip_address': '10.0.0.10'}]}}
+                self.new_update_request('ports', data, port_id).get_response(
+                    self.api)
+                res = self._get(self.new_show_request('ports', port_id),
+                                etag)
+                self.assertEqual(res.status_int, 200)
+
+    def test_list_networks_changes_on_update_of_older_network(self):
+        with contextlib.nested(self.network(),
+                               self.network()) as (net, other):
+            etag = self._get(self.new_list_request('networks')).etag
+            data = {'network': {'name': 'renamed'}}
+            with mock.patch('time.time', return_value=0):
+                self.new_update_request('networks', data,
+                                        net['network']['id']).get_response(
+                                            self.api)
+            res = self._get(self.new_list_request('networks'), etag)
+            self.assertEqual(res.status_int, 200)
+
+    def test_next_revision_starts_above_existing_revisions(self):
+        with self.network() as net:
+            ctx = context.get_admin_context()
+            revision = NeutronManager.get_plugin()._get_network(
+                ctx, net['network']['id']).revision
+            with ctx.session.begin(subtransactions=True):
+                ctx.session.query(models_v2.RevisionCounter).delete()
+                first = models_v2.next_revision(ctx.session,
+                                                models_v2.Network)
+                second = models_v2.next_revision(ctx.session,
+                                                 models_v2.Network)
+            self.assertGreater(first, revision)
+            self.assertEqual(second, first + 1)
+
+    def test_update_subnet_dns_nameservers_changes_revision(self):
+        with self.subnet() as subnet:
+            subnet_id = subnet['subnet']['id']
+            network_id = subnet['subnet']['network_id']
+            ctx = context.get_admin_context()
+            plugin = NeutronManager.get_plugin()
+            subnet_revision = plugin._get_subnet(ctx, subnet_id).revision
+            network_revision = plugin._get_network(ctx, network_id).revision
+            data = {'subnet': {'dns_nameservers': ['1.2.3.4']}}
+            self.new_update_request('subnets', data, subnet_id).get_response(
+                self.api)
+            ctx = context.get_admin_context()
+            self.assertGreater(plugin._get_subnet(ctx, subnet_id).revision,
+                               subnet_revision)
+            self.assertGreater(plugin._get_network(ctx, network_id).revision,
+                               network_revision)
+
+
+class TestPaginationV2(NeutronDbPluginV2TestCase):
+
+    def test_list_networks_with_pagination_marker_not_loaded(self):
+        with contextlib.nested(self.network(name='net1'),
+                               self.network(name='net2'),
+                               self.network(name='net3')
+                               ) as (net1, net2, net3):
+            plugin = NeutronManager.get_plugin()
+            with mock.patch.object(plugin, '_get_network') as get:
+                self._test_list_with_pagination('network',
+                                                (net1, net2, net3),
+                                                ('name', 'asc'), 2, 2)
+                self._test_list_with_pagination_reverse('network',
+                                                        (net1, net2, net3),
+                                                        ('name', 'asc'),
+                                                        2, 2)
+            self.assertFalse(get.called)
+
+    def _list_networks_after_marker(self, marker, tenant_id=None):
+        req = self.new_list_request('networks',
+                                    params='limit=1&marker=%s' % marker)
+        if tenant_id:
+            req.environ['neutron.context'] = context.Context('', tenant_id)
+        return req.get_response(self.api)
+
+    def test_list_networks_with_pagination_unknown_marker(self):
+        with self.network():
+            res = self._list_networks_after_marker('unknown-id')
+            self.assertEqual(res.status_int, webob.exc.HTTPNotFound.code)
+
+    def test_list_networks_with_pagination_other_tenant_marker(self):
+        with contextlib.nested(self.network(name='net1'),
+                               self.network(name='net2',
+                                            tenant_id='other-tenant')
+                               ) as (net1, net2):
+            res = self._list_networks_after_marker(net1['network']['id'],
+                                                   tenant_id='other-tenant')
+            self.assertEqual(res.status_int, webob.exc.HTTPNotFound.code)
+            res = self._list_networks_after_marker(net2['network']['id'],
+                                                   tenant_id='other-tenant')
+            self.assertEqual(res.status_int, webob.exc.HTTPOk.code)
+
+    def test_list_networks_with_pagination_row_values(self):
+        with mock.patch.object(sqlalchemyutils, 'ROW_VALUE_DIALECTS',
+                               new=('sqlite',)):
+            with contextlib.nested(self.network(name='net1'),
+                                   self.network(name='net2'),
+                                   self.network(name='net3')
+                                   ) as (net1, net2, net3):
+                self._test_list_with_pagination('network',
+                                                (net1, net2, net3),
+                                                ('name', 'asc'), 2, 2)
+                self._test_list_with_pagination_reverse('network',
+                                                        (net1, net2, net3),
+                                                        ('name', 'asc'),
+                                                        2, 2)
+
+    def _get_paginated_statement(self, sorts):
+        query = context.get_admin_context().session.query(models_v2.Network)
+        query = sqlalchemyutils.paginate_query(
+            query, models_v2.Network, 2, sorts,
+            marker_obj=models_v2.Network(id='marker-id', name='marker'))
+        return str(query.statement).replace('\n', '')
+
+    def test_paginate_query_row_values(self):
+        with mock.patch.object(sqlalchemyutils, 'ROW_VALUE_DIALECTS',
+                               new=('sqlite',)):
+            statement = self._get_paginated_statement([('name', False),
+                                                       ('id', False)])
+        self.assertIn('(networks.name, networks.id) < (:', statement)
+        self.assertNotIn(' OR ', statement)
+
+    def test_paginate_query_mixed_directions(self):
+        with mock.patch.object(sqlalchemyutils, 'ROW_VALUE_DIALECTS',
+                               new=('sqlite',)):
+            statement = self._get_paginated_statement([('name', False),
+                                                       ('id', True)])
+        self.assertIn('networks.name < :', statement)
+        self.assertIn(' OR ', statement)
+
+
 class DbModelTestCase(base.BaseTestCase):
     """DB model tests."""
     def test_repr(self):
@@ -3594,7 +4047,7 @@ class DbModelTestCase(base.BaseTestCase):
         actual_repr_output = repr(network)
         exp_start_with = "<neutron.db.models_v2.Network"
         exp_middle = "[object at %x]" % id(network)
-        exp_end_with = (" {tenant_id=None, id=None, "
+        exp_end_with = (" {tenant_id=None, id=None, revision=None, "
                         "name='net_net', status='OK', "
                         "admin_state_up=True, shared=None}>")
         final_exp = exp_start_with + exp_middle + exp_end_with
@@ -15,6 +15,7 @@
 
 import mock
 
+from neutron.db import db_base_plugin_v2
 from neutron.db import dhcp_rpc_base
 from neutron.tests import base
 
@@ -49,6 +50,46 @@ class TestDhcpRpcCallackMixin(base.BaseTestCase):
 
         self.assertEqual(len(self.log.mock_calls), 1)
 
+    def test_get_active_networks_info(self):
+        self.plugin.get_networks.return_value = [dict(id='a'), dict(id='b')]
+        self.plugin.get_subnets.return_value = [dict(id='s1', network_id='a')]
+        self.plugin.get_ports.return_value = [dict(id='p1', network_id='a'),
+                                              dict(id='p2', network_id='b')]
+
+        networks = self.callbacks.get_active_networks_info(mock.Mock(),
+                                                           host='host')
+
+        self.assertEqual(networks[0]['subnets'],
+                         [dict(id='s1', network_id='a')])
+        self.assertEqual(networks[0]['ports'],
+                         [dict(id='p1', network_id='a')])
+        self.assertEqual(networks[1]['subnets'], [])
+        self.assertEqual(networks[1]['ports'],
+                         [dict(id='p2', network_id='b')])
+        self.plugin.assert_has_calls([
+            mock.call.get_subnets(
+                mock.ANY,
+                filters=dict(network_id=['a', 'b'], enable_dhcp=[True]),
+                fields=dhcp_rpc_base.DHCP_SUBNET_FIELDS),
+            mock.call.get_ports(
+                mock.ANY, filters=dict(network_id=['a', 'b']),
+                fields=dhcp_rpc_base.DHCP_PORT_FIELDS)])
+
+    def test_get_dhcp_ports_overridden_get_ports(self):
+        class DbPlugin(db_base_plugin_v2.NeutronDbPluginV2):
+            pass
+
+        class OverridingPlugin(db_base_plugin_v2.NeutronDbPluginV2):
+            def get_ports(self, context, filters=None, fields=None):
+                return [dict(id='p1', network_id=filters['network_id'][0])]
+
+        self.assertTrue(self.callbacks._has_db_get_ports(
+            DbPlugin.__new__(DbPlugin)))
+        plugin = OverridingPlugin.__new__(OverridingPlugin)
+        self.assertEqual([dict(id='p1', network_id='a')],
+                         self.callbacks._get_dhcp_ports(mock.Mock(), plugin,
+                                                        ['a']))
+
     def test_get_network_info(self):
         network_retval = dict(id='a')
 
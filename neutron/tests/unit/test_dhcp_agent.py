@@ -1403,7 +1403,43 @@ class TestDictModel(base.BaseTestCase):
         self.assertEqual(m.a[1].c, 3)
 
 
+class TestSlotsModel(base.BaseTestCase):
+    def test_port_model(self):
+        port = dhcp.PortModel(dict(id=u'port-id', name='dropped',
+                                   network_id=u'net-id',
+                                   mac_address=u'aa:bb:cc:dd:ee:ff',
+                                   fixed_ips=[dict(subnet_id=u'subnet-id',
+                                                   ip_address='10.0.0.2')]))
+        self.assertEqual(port.id, 'port-id')
+        self.assertIsInstance(port.id, str)
+        self.assertIs(port.network_id, intern('net-id'))
+        self.assertEqual(port.fixed_ips[0].ip_address, '10.0.0.2')
+        self.assertIsNone(port.device_owner)
+        self.assertEqual(port.extra_dhcp_opts, [])
+        self.assertFalse(hasattr(port, 'name'))
+        self.assertFalse(hasattr(port, '__dict__'))
+
+    def test_port_model_non_ascii_id(self):
+        port = dhcp.PortModel(dict(id=u'\u00e9'))
+        self.assertEqual(port.id, u'\u00e9')
+
+    def test_subnet_model_host_routes(self):
+        subnet = dhcp.SubnetModel(
+            dict(id='subnet-id', host_routes=[dict(destination='0.0.0.0/0',
+                                                   nexthop='10.0.0.1')]))
+        self.assertEqual(subnet.host_routes[0].nexthop, '10.0.0.1')
+
+
 class TestNetModel(base.BaseTestCase):
+    def test_subnets_and_ports_models(self):
+        network = dhcp.NetModel(True, dict(id='foo',
+                                           subnets=[dict(id='subnet-id')],
+                                           ports=[dict(id='port-id'),
+                                                  fake_port1]))
+        self.assertIsInstance(network.subnets[0], dhcp.SubnetModel)
+        self.assertIsInstance(network.ports[0], dhcp.PortModel)
+        self.assertIs(network.ports[1], fake_port1)
+
     def test_ns_name(self):
         network = dhcp.NetModel(True, {'id': 'foo'})
         self.assertEqual(network.namespace, 'qdhcp-foo')
@@ -18,7 +18,11 @@
 
 import copy
 
+import mock
+
+from neutron import context
 from neutron.db import db_base_plugin_v2
+from neutron.db import dhcp_rpc_base
 from neutron.db import extradhcpopt_db as edo_db
 from neutron.extensions import extra_dhcp_opt as edo_ext
 from neutron.openstack.common import log as logging
@@ -171,3 +175,29 @@ class TestExtraDhcpOpt(ExtraDhcpOptDBTestCase):
             port = self.deserialize('json', req.get_response(self.api))
             self._check_opts(opt_dict,
                              port['port'][edo_ext.EXTRADHCPOPTS])
+
+    def test_get_active_networks_info_with_extradhcpopts(self):
+        opt_dict = [{'opt_name': 'bootfile-name', 'opt_value': 'pxelinux.0'}]
+        params = {edo_ext.EXTRADHCPOPTS: opt_dict,
+                  'arg_list': (edo_ext.EXTRADHCPOPTS,)}
+        with self.port(**params) as port:
+            callbacks = dhcp_rpc_base.DhcpRpcCallbackMixin()
+            ctx = context.get_admin_context()
+            # Plugins with DHCP agent scheduling would need a registered
+            # agent, so hand over the networks directly.
+            with mock.patch.object(callbacks, '_get_active_networks',
+                                   return_value=self._list(
+                                       'networks')['networks']):
+                networks = callbacks.get_active_networks_info(ctx,
+                                                              host='host')
+            self.assertEqual(1, len(networks))
+            self.assertEqual(1, len(networks[0]['subnets']))
+            self.assertEqual(1, len(networks[0]['ports']))
+            dhcp_port = networks[0]['ports'][0]
+            self.assertEqual(sorted(dhcp_rpc_base.DHCP_PORT_FIELDS),
+                             sorted(dhcp_port.keys()))
+            self.assertEqual(port['port']['mac_address'],
+                             dhcp_port['mac_address'])
+            self.assertEqual(port['port']['fixed_ips'],
+                             dhcp_port['fixed_ips'])
+            self._check_opts(opt_dict, dhcp_port[edo_ext.EXTRADHCPOPTS])
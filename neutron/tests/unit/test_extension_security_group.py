@@ -1313,5 +1313,13 @@ class TestSecurityGroups(SecurityGroupDBTestCase):
                 self.assertEqual(res.status_int, webob.exc.HTTPBadRequest.code)
 
 
+class TestSecurityGroupsListStatements(SecurityGroupDBTestCase):
+    """Listing security groups must not issue SQL statements per group."""
+
+    def test_list_security_groups(self):
+        self._assert_list_statements_constant('security-groups',
+                                              self.security_group)
+
+
 class TestSecurityGroupsXML(TestSecurityGroups):
     fmt = 'xml'
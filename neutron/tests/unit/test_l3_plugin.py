@@ -1812,6 +1812,18 @@ class L3NatDBSepTestCase(L3BaseForSepTests, L3NatTestCaseBase):
     pass
 
 
+class L3NatDBListStatementsTestCase(L3BaseForIntTests, L3NatTestCaseMixin):
+    """Listing routers must not issue SQL statements per router."""
+
+    def test_router_list(self):
+        with self.subnet() as s:
+            self._set_net_external(s['subnet']['network_id'])
+            gw_info = {'network_id': s['subnet']['network_id']}
+            self._assert_list_statements_constant(
+                'routers',
+                lambda: self.router(external_gateway_info=gw_info))
+
+
 class L3NatDBIntTestCaseXML(L3NatDBIntTestCase):
     fmt = 'xml'
 
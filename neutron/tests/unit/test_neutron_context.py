@@ -70,3 +70,9 @@ class TestNeutronContext(base.BaseTestCase):
     def test_neutron_context_with_load_roles_false(self):
         ctx = context.get_admin_context(load_admin_roles=False)
         self.assertFalse(ctx.roles)
+
+    def test_neutron_context_use_replica(self):
+        ctx = context.Context('user_id', 'tenant_id')
+        ctx.use_replica()
+        ctx.session
+        self.db_api_session.assert_called_once_with(use_replica=True)
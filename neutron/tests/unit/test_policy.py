@@ -15,6 +15,7 @@
 
 """Test of Policy Engine For Neutron"""
 
+import contextlib
 import json
 import StringIO
 import urllib2
@@ -395,6 +396,51 @@ class NeutronPolicyTestCase(base.BaseTestCase):
         result = policy.enforce(self.context, action, target)
         self.assertTrue(result)
 
+    def test_check_credentials_only_admin(self):
+        admin_context = context.get_admin_context()
+        self.assertTrue(policy.check_credentials_only(admin_context,
+                                                      "get_network"))
+
+    def test_check_credentials_only_needs_target(self):
+        self.assertIsNone(policy.check_credentials_only(self.context,
+                                                        "get_network"))
+
+    def test_check_credentials_only_nonadmin_on_admin_only(self):
+        self.rules['get_network:shared'] = common_policy.parse_rule(
+            "rule:admin_only")
+        self.assertFalse(policy.check_credentials_only(self.context,
+                                                       "get_network:shared"))
+
+    def test_check_credentials_only_nonexistent_action_raises(self):
+        self.assertRaises(exceptions.PolicyRuleNotFound,
+                          policy.check_credentials_only,
+                          self.context, "get_something_else")
+
+    def test_check_credentials_only_ignores_write_actions(self):
+        admin_context = context.get_admin_context()
+        self.assertIsNone(policy.check_credentials_only(admin_context,
+                                                        "create_network"))
+
+    def test_check_memoizes_target_independent_decisions(self):
+        admin_context = context.get_admin_context()
+        common_policy.set_rules(common_policy.Rules(self.rules))
+        with contextlib.nested(
+            mock.patch.object(policy, 'init'),
+            mock.patch.object(policy, '_check_credentials',
+                              wraps=policy._check_credentials)
+        ) as (init, check_credentials):
+            self.assertTrue(policy.check(admin_context, "get_network",
+                                         {'tenant_id': 'somebody'}))
+            call_count = check_credentials.call_count
+            self.assertTrue(policy.check(admin_context, "get_network",
+                                         {'tenant_id': 'somebody_else'}))
+            self.assertEqual(check_credentials.call_count, call_count)
+            # Decisions are not shared across contexts
+            self.assertTrue(policy.check(context.get_admin_context(),
+                                         "get_network",
+                                         {'tenant_id': 'somebody'}))
+            self.assertEqual(check_credentials.call_count, 2 * call_count)
+
     def test_enforce_firewall_policy_shared(self):
         action = "get_firewall_policy"
         target = {'shared': True, 'tenant_id': 'somebody_else'}
@@ -28,6 +28,7 @@ import webob.exc
 from neutron.api.v2 import attributes
 from neutron.common import constants
 from neutron.common import exceptions as exception
+from neutron.openstack.common import jsonutils
 from neutron.tests import base
 from neutron import wsgi
 
@@ -604,6 +605,31 @@ class JSONDictSerializerTest(base.BaseTestCase):
 
         self.assertEqual(result, expected_json)
 
+    def test_json_iter(self):
+        items = [{'id': i, 'name': u'\u7f51%d' % i} for i in range(5)]
+        input_dict = {'servers': (item for item in items),
+                      'servers_links': [{'rel': 'next'}]}
+        serializer = wsgi.JSONDictSerializer()
+        serializer.ITEMS_PER_CHUNK = 2
+        chunks = list(serializer.serialize_iter(input_dict))
+
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(jsonutils.loads(''.join(chunks)),
+                         {'servers': items,
+                          'servers_links': [{'rel': 'next'}]})
+
+    def test_json_iter_empty(self):
+        serializer = wsgi.JSONDictSerializer()
+        result = ''.join(serializer.serialize_iter(
+            {'servers': (item for item in [])}))
+
+        self.assertEqual(jsonutils.loads(result), {'servers': []})
+
+    def test_is_streamed(self):
+        self.assertTrue(wsgi.is_streamed({'a': 1, 'b': (i for i in [])}))
+        self.assertFalse(wsgi.is_streamed({'a': 1, 'b': []}))
+        self.assertFalse(wsgi.is_streamed([i for i in []]))
+
 
 class TextDeserializerTest(base.BaseTestCase):
 
@@ -879,6 +905,14 @@ class FaultTest(base.BaseTestCase):
 
 
 class XMLDictSerializerTest(base.BaseTestCase):
+    def test_xml_iter(self):
+        serializer = wsgi.XMLDictSerializer()
+        data = {'networks': [{'name': 'net1'}, {'name': 'net2'}]}
+        result = serializer.serialize_iter(
+            {'networks': (net for net in data['networks'])})
+
+        self.assertEqual(result, [serializer.serialize(data)])
+
     def test_xml(self):
         NETWORK = {'network': {'test': None,
                                'tenant_id': 'test-tenant',
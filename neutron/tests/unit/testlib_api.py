@@ -13,9 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import fixtures
+from sqlalchemy import event
 import testtools
 
 from neutron.api.v2 import attributes
+from neutron.openstack.common.db.sqlalchemy import session
 from neutron.tests import base
 from neutron import wsgi
 
@@ -33,6 +36,24 @@ class ExpectedException(testtools.ExpectedException):
         return False
 
 
+class SqlStatementCounter(fixtures.Fixture):
+    """Count the SQL statements sent to the database."""
+
+    def setUp(self):
+        super(SqlStatementCounter, self).setUp()
+        self.count = 0
+        self._counting = True
+        engine = session.get_engine(sqlite_fk=True)
+        # Listeners cannot be removed with SQLAlchemy 0.7, stop counting
+        # instead
+        event.listen(engine, 'before_cursor_execute', self._count)
+        self.addCleanup(setattr, self, '_counting', False)
+
+    def _count(self, *args):
+        if self._counting:
+            self.count += 1
+
+
 def create_request(path, body, content_type, method='GET',
                    query_string=None, context=None):
     if query_string:
@@ -26,6 +26,7 @@ import socket
 import ssl
 import sys
 import time
+import types
 from xml.etree import ElementTree as etree
 from xml.parsers import expat
 
@@ -375,12 +376,30 @@ class ActionDispatcher(object):
         raise NotImplementedError()
 
 
+def is_streamed(data):
+    """Return True if some values of the data dict are generators."""
+    return (isinstance(data, dict) and
+            any(isinstance(value, types.GeneratorType)
+                for value in data.itervalues()))
+
+
 class DictSerializer(ActionDispatcher):
     """Default request body serialization."""
 
     def serialize(self, data, action='default'):
         return self.dispatch(data, action=action)
 
+    def serialize_iter(self, data, action='default'):
+        """Serialize a dict whose values may be generators.
+
+        Return an iterable of strings. Generators are consumed into lists
+        and data is serialized at once, unless a subclass can do better.
+        """
+        data = dict((key, list(value)
+                     if isinstance(value, types.GeneratorType) else value)
+                    for key, value in data.iteritems())
+        return [self.serialize(data, action)]
+
     def default(self, data):
         return ""
 
@@ -388,10 +407,49 @@ class DictSerializer(ActionDispatcher):
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization."""
 
+    # Number of items of a generator serialized in each string
+    ITEMS_PER_CHUNK = 100
+
     def default(self, data):
-        def sanitizer(obj):
-            return unicode(obj)
-        return jsonutils.dumps(data, default=sanitizer)
+        return jsonutils.dumps(data, default=self._sanitizer)
+
+    def serialize_iter(self, data, action='default'):
+        """Serialize a dict whose values may be generators.
+
+        Generators are serialized as lists, ITEMS_PER_CHUNK items at a
+        time, so that neither their items nor the whole document are held
+        in memory at once.
+        """
+        if action != 'default':
+            return super(JSONDictSerializer, self).serialize_iter(data,
+                                                                  action)
+        return self._serialize_iter(data)
+
+    def _serialize_iter(self, data):
+        dumps = lambda obj: jsonutils.dumps(obj, default=self._sanitizer)
+        chunk = ['{']
+        for index, (key, value) in enumerate(data.iteritems()):
+            if index:
+                chunk.append(', ')
+            chunk.append('%s: ' % dumps(key))
+            if not isinstance(value, types.GeneratorType):
+                chunk.append(dumps(value))
+                continue
+            chunk.append('[')
+            for count, item in enumerate(value):
+                if count:
+                    chunk.append(', ')
+                chunk.append(dumps(item))
+                if not (count + 1) % self.ITEMS_PER_CHUNK:
+                    yield ''.join(chunk)
+                    chunk = []
+            chunk.append(']')
+        chunk.append('}')
+        yield ''.join(chunk)
+
+    @staticmethod
+    def _sanitizer(obj):
+        return unicode(obj)
 
 
 class XMLDictSerializer(DictSerializer):